@@ -0,0 +1,225 @@
+"""
+Offline end-to-end benchmark of the deep research pipeline (`generate_report`).
+
+Everything external is replaced locally:
+- the LLMs by a fake chat model with configurable latency and output size,
+- Tavily by a stub search backend returning URLs of a local HTTP server,
+- websites by that server, which serves recorded HTML pages from a directory
+  (or generated articles when none is given) with a configurable delay.
+
+Runs `generate_report` for several questions under the given concurrency and
+reports p50/p95 latency per report, a per-stage latency breakdown, and the
+number of LLM calls and tokens per report. Exits with an error if a batch
+summary fell back to one request per page, since the fake model always
+answers batches completely.
+
+Requires the same `.env` as the app; the page cache and research memory are
+bypassed so every run does the full work.
+
+Usage:
+    python -m benchmarks.deep_research --runs 8 --concurrency 4
+    python -m benchmarks.deep_research --pages saved_pages/ --llm-latency 2 --page-latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import statistics
+import time
+
+from collections import Counter
+from pathlib import Path
+from typing import Any, List, Optional
+from aiohttp import web
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.agents import deep_search
+from src.services import search_backends
+from src.services.search_and_scrape import close_scrape_session
+from src.services.html_extraction import close_extraction_pool
+from src.services.passage_ranking import estimate_tokens
+from src.utils import page_cache
+from src.utils.metrics import get_counter, get_histogram
+
+HOST = "127.0.0.1"
+# The batch prompt indents the first source marker, so leading whitespace is allowed
+SOURCE_MARKER = re.compile(r"^\s*\[\[SOURCE (\d+)\]\]\nQuestion:", re.MULTILINE)
+WORDS = (
+    "policy energy market growth data model network research battery solar storage grid climate "
+    "investment regulation technology report analysis results study impact cost efficiency"
+).split()
+
+# LLM calls and tokens of the fake model, by kind of request
+llm_calls: Counter = Counter()
+llm_tokens: Counter = Counter()
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers deep research prompts after a fixed delay, without any API call."""
+    latency: float = 1.0
+    output_tokens: int = 300
+    num_queries: int = 3
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"latency": self.latency, "output_tokens": self.output_tokens}
+
+    def _reply(self, prompt: str) -> tuple:
+        words = " ".join(random.choice(WORDS) for _ in range(self.output_tokens * 3 // 4))
+        if "search queries" in prompt:
+            topic = re.search(r'task: "(.*?)"', prompt, re.DOTALL)
+            topic = topic.group(1) if topic else "topic"
+            return "queries", json.dumps([f"{topic} aspect {i}" for i in range(self.num_queries)])
+        sources = SOURCE_MARKER.findall(prompt)
+        if sources:
+            return "batch_summary", "\n".join(f"[[SOURCE {n}]]\n{words}" for n in sources)
+        if "Using the above text" in prompt:
+            return "summary", words
+        return "report", words
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        prompt = "\n".join(str(message.content) for message in messages)
+        kind, content = self._reply(prompt)
+        llm_calls[kind] += 1
+        llm_tokens["input"] += estimate_tokens(prompt)
+        llm_tokens["output"] += estimate_tokens(content)
+        message = AIMessage(content=content)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+
+class StubTavilyBackend(search_backends.SearchBackend):
+    """Search backend returning pages of the local server, with overlap between queries."""
+    name = "tavily"
+
+    def __init__(self, base_url: str, num_pages: int, latency: float):
+        self.base_url = base_url
+        self.num_pages = num_pages
+        self.latency = latency
+
+    async def search(self, query: str, num_results: int) -> List[str]:
+        await asyncio.sleep(self.latency)
+        rng = random.Random(query)
+        return [f"{self.base_url}/page/{rng.randrange(self.num_pages)}" for _ in range(num_results)]
+
+
+def _generated_page(index: int) -> bytes:
+    rng = random.Random(index)
+    paragraphs = "".join(
+        f"<p>{' '.join(rng.choice(WORDS) for _ in range(rng.randint(40, 120)))}.</p>" for _ in range(rng.randint(10, 40))
+    )
+    nav = "".join(f"<li><a href='/page/{i}'>Link {i}</a></li>" for i in range(20))
+    return f"<html><body><nav><ul>{nav}</ul></nav><article><h1>Article {index}</h1>{paragraphs}</article><footer>Footer</footer></body></html>".encode()
+
+async def _start_server(pages: List[bytes], latency: float) -> web.AppRunner:
+    async def serve(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        index = int(request.match_info["index"])
+        return web.Response(body=pages[index % len(pages)], content_type="text/html")
+
+    app = web.Application()
+    app.add_routes([web.get("/page/{index}", serve)])
+    runner = web.AppRunner(app)
+    await runner.setup()
+    return runner
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+def _stage_report() -> None:
+    print("\nstage breakdown (mean / calls):")
+    for stage in ("queries", "search", "scrape", "summarize", "report"):
+        histogram = get_histogram("research_stage_latency_seconds", stage=stage)
+        if histogram and histogram.count:
+            print(f"  {stage:<10} {histogram.sum / histogram.count * 1000:9.1f} ms  x{histogram.count}")
+
+def _batch_report() -> int:
+    """Prints the outcome of the batch summaries and returns the pages that fell back to single summaries."""
+    complete = get_counter("summary_batches_total", outcome="complete")
+    fallback = get_counter("summary_batches_total", outcome="fallback")
+    fallback_pages = get_counter("summary_batch_fallback_pages_total")
+    print(f"\nbatch summaries: complete={complete:.0f} fallback={fallback:.0f} (pages summarized alone={fallback_pages:.0f})")
+    return int(fallback_pages)
+
+async def main(args: argparse.Namespace) -> None:
+    if args.pages:
+        pages = [path.read_bytes() for path in sorted(args.pages.rglob("*.htm*"))]
+    else:
+        pages = [_generated_page(index) for index in range(args.num_pages)]
+
+    runner = await _start_server(pages, args.page_latency)
+    site = web.TCPSite(runner, HOST, 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    # Local stand-ins for the LLMs, Tavily and the caches
+    model = FakeChatModel(latency=args.llm_latency, output_tokens=args.llm_tokens, num_queries=args.queries)
+    async def fake_llm(**kwargs) -> FakeChatModel:
+        return model
+    deep_search.get_gemini_llm = deep_search.get_openrouter_llm = fake_llm
+    search_backends._search = search_backends.FanoutSearch(
+        [StubTavilyBackend(f"http://{HOST}:{port}", len(pages), args.search_latency)]
+    )
+    page_cache.PAGE_CACHE_ENABLED = False
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    async def run(index: int) -> float:
+        async with semaphore:
+            start = time.perf_counter()
+            await deep_search.generate_report(f"Benchmark question {index}")
+            return time.perf_counter() - start
+
+    try:
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(run(index) for index in range(args.runs)))
+        elapsed = time.perf_counter() - start
+    finally:
+        await close_scrape_session()
+        close_extraction_pool()
+        await runner.cleanup()
+
+    print(
+        f"reports={args.runs} concurrency={args.concurrency} wall={elapsed:.2f} s  "
+        f"p50={statistics.median(latencies):.2f} s  p95={_percentile(latencies, 95):.2f} s  "
+        f"max={max(latencies):.2f} s"
+    )
+    _stage_report()
+    fallback_pages = _batch_report()
+    print(
+        f"\nLLM calls per report: {sum(llm_calls.values()) / args.runs:.1f} "
+        f"({', '.join(f'{kind}={count}' for kind, count in sorted(llm_calls.items()))})"
+    )
+    print(
+        f"LLM tokens per report: input={llm_tokens['input'] / args.runs:.0f} "
+        f"output={llm_tokens['output'] / args.runs:.0f}"
+    )
+    if fallback_pages:
+        raise SystemExit(f"{fallback_pages} pages fell back to single summaries; the fake model's batch replies did not parse")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=8, help="Number of reports to generate")
+    parser.add_argument("--concurrency", type=int, default=4, help="Reports generated at the same time")
+    parser.add_argument("--pages", type=Path, help="Directory of recorded HTML pages; generated pages otherwise")
+    parser.add_argument("--num-pages", type=int, default=50, help="Number of generated pages")
+    parser.add_argument("--queries", type=int, default=3, help="Search queries generated per report")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Seconds per fake LLM call")
+    parser.add_argument("--llm-tokens", type=int, default=300, help="Output tokens per fake LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.2, help="Seconds per stub search")
+    parser.add_argument("--page-latency", type=float, default=0.1, help="Seconds before the server answers")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+"""
+Compares the per-turn graph overhead of `build_graph()` (new connection and
+graph compile on every message) with the process-wide `get_graph()`.
+
+Each turn reads the checkpoint of a thread, which is the only database work
+the graph does before the supervisor runs. No LLM calls are made.
+
+Requires the same `.env` as the app, with `MEMORY_DATABASE` pointing to a
+reachable Postgres instance.
+
+Usage:
+    python -m benchmarks.graph_overhead --turns 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from src.core.graph_builder import build_graph, get_graph, close_graph
+
+
+def _report(label: str, samples: list) -> None:
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.95))]
+    print(
+        f"{label:<12} turns={len(samples_ms):<4} "
+        f"mean={statistics.mean(samples_ms):8.2f} ms  "
+        f"p50={statistics.median(samples_ms):8.2f} ms  "
+        f"p95={p95:8.2f} ms"
+    )
+
+async def _turn_before(config: dict) -> float:
+    start = time.perf_counter()
+    async with build_graph() as app:
+        await app.aget_state(config)
+    return time.perf_counter() - start
+
+async def _turn_after(config: dict) -> float:
+    start = time.perf_counter()
+    app = await get_graph()
+    await app.aget_state(config)
+    return time.perf_counter() - start
+
+async def main(turns: int) -> None:
+    config = {"configurable": {"thread_id": f"benchmark-{uuid.uuid4()}"}}
+
+    before = [await _turn_before(config) for _ in range(turns)]
+
+    # Warmup happens at app startup, so it is not part of the per-turn cost
+    await get_graph()
+    after = [await _turn_after(config) for _ in range(turns)]
+    await close_graph()
+
+    _report("build_graph", before)
+    _report("get_graph", after)
+    print(f"speedup (mean): {statistics.mean(before) / statistics.mean(after):.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50, help="Number of turns to measure per variant")
+    args = parser.parse_args()
+    asyncio.run(main(args.turns))
@@ -0,0 +1,67 @@
+"""
+Compares the HTML-to-text extraction of scraped pages: the previous
+BeautifulSoup `html.parser` + `get_text()` against the lxml main-content
+extractor, on a directory of saved HTML pages. Defaults to the pages in
+`benchmarks/fixtures/html/`.
+
+Reports throughput (pages and MB per second, single process) and the size of
+the extracted text, which is what ends up in LLM prompts.
+
+Requires the same `.env` as the app. No network or LLM calls are made.
+
+Usage:
+    python -m benchmarks.html_extraction
+    python -m benchmarks.html_extraction --fixtures saved_pages/ --repeat 3
+"""
+import argparse
+import statistics
+import time
+
+from pathlib import Path
+from typing import Callable, List
+from bs4 import BeautifulSoup
+from src.services.html_extraction import extract_main_content
+from src.services.passage_ranking import estimate_tokens
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "html"
+
+def beautifulsoup_text(html: bytes) -> str:
+    """Extraction used by the scraper before the lxml extractor."""
+    return BeautifulSoup(html, "html.parser").get_text(separator=" ", strip=True)
+
+def lxml_markdown(html: bytes) -> str:
+    return extract_main_content(html)
+
+def _measure(label: str, extract: Callable[[bytes], str], pages: List[bytes], repeat: int) -> float:
+    timings, outputs = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outputs = [extract(html) for html in pages]
+        timings.append(time.perf_counter() - start)
+
+    elapsed = statistics.median(timings)
+    megabytes = sum(len(html) for html in pages) / 1e6
+    tokens = [estimate_tokens(text) for text in outputs]
+    print(
+        f"{label:<14} {len(pages) / elapsed:8.1f} pages/s  {megabytes / elapsed:6.2f} MB/s  "
+        f"output mean={statistics.mean(tokens):7.0f} tokens  total={sum(tokens)} tokens"
+    )
+    return elapsed
+
+def main(fixtures: Path, repeat: int) -> None:
+    pages = [path.read_bytes() for path in sorted(fixtures.rglob("*.htm*"))]
+    if not pages:
+        print(f"No HTML pages found in {fixtures}.")
+        return
+    print(f"{len(pages)} pages, {sum(len(html) for html in pages) / 1e6:.2f} MB of HTML\n")
+
+    before = _measure("beautifulsoup", beautifulsoup_text, pages, repeat)
+    after = _measure("lxml", lxml_markdown, pages, repeat)
+    print(f"\nspeedup: {before / after:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES_DIR, help="Directory of saved HTML pages")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per extractor; the median is reported")
+    args = parser.parse_args()
+    main(args.fixtures, args.repeat)
@@ -0,0 +1,106 @@
+"""
+Reports the LLM input tokens saved per page by relevance-ranked passage
+selection, compared with the previous `text[:10000]` truncation, and how many
+of the facts each page's query needs are kept by either.
+
+The corpus is a directory of saved pages (`.html` or `.txt`), by default
+`benchmarks/fixtures/html/`. HTML pages go through the scraper's main-content
+extractor first. Each page is ranked against the query listed for it in an
+optional `queries.json` file (`{"page.html": {"query": "...", "facts": [...]}}`),
+or against its file name otherwise. With `--page-cache`, the pages in the
+on-disk page cache are used instead, with no query or facts.
+
+Requires the same `.env` as the app. No network or LLM calls are made.
+
+Usage:
+    python -m benchmarks.passage_ranking
+    python -m benchmarks.passage_ranking --corpus saved_pages/ --budget 1000
+    python -m benchmarks.passage_ranking --page-cache
+"""
+import argparse
+import json
+import statistics
+import time
+
+from pathlib import Path
+from typing import Iterator, List, Tuple
+from src.services.html_extraction import extract_main_content
+from src.services.passage_ranking import estimate_tokens, select_passages
+from src.utils.page_cache import get_page_cache
+from src.utils.config import PASSAGE_TOKEN_BUDGET
+
+# Characters kept per page before passage ranking
+TRUNCATION_CHARS = 10000
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "html"
+
+
+def _corpus_pages(corpus: Path) -> Iterator[Tuple[str, str, str, List[str]]]:
+    """Yields the name, extracted text, query and expected facts of each saved page."""
+    queries_path = corpus / "queries.json"
+    queries = json.loads(queries_path.read_text()) if queries_path.exists() else {}
+    for path in sorted(corpus.iterdir()):
+        if path.suffix not in (".html", ".htm", ".txt"):
+            continue
+        if path.suffix == ".txt":
+            content = path.read_text(errors="replace")
+        else:
+            content = extract_main_content(path.read_bytes())
+        entry = queries.get(path.name, {})
+        query = entry.get("query", path.stem.replace("-", " ").replace("_", " "))
+        yield path.name, content, query, entry.get("facts", [])
+
+def _cached_pages() -> Iterator[Tuple[str, str, str, List[str]]]:
+    """Yields the pages stored in the on-disk page cache."""
+    cache = get_page_cache()
+    if cache is None:
+        return
+    for url in cache.urls():
+        page = cache.get(url)
+        if page:
+            yield url, page.text, "", []
+
+def _facts_kept(text: str, facts: List[str]) -> int:
+    """Counts the facts found in a text, ignoring differences in whitespace."""
+    text = " ".join(text.split())
+    return sum(" ".join(fact.split()) in text for fact in facts)
+
+def main(corpus: Path, budget: int, page_cache: bool = False) -> None:
+    pages = _cached_pages() if page_cache else _corpus_pages(corpus)
+
+    before, after, elapsed = [], [], []
+    facts = kept_before = kept_after = 0
+    for name, text, query, page_facts in pages:
+        start = time.perf_counter()
+        selected = select_passages(text, query, max_tokens=budget)
+        elapsed.append(time.perf_counter() - start)
+
+        truncated = text[:TRUNCATION_CHARS]
+        before.append(estimate_tokens(truncated))
+        after.append(estimate_tokens(selected))
+        facts += len(page_facts)
+        kept_before += _facts_kept(truncated, page_facts)
+        kept_after += _facts_kept(selected, page_facts)
+        print(f"{name[:60]:<60} truncated={before[-1]:6d}  ranked={after[-1]:6d}  tokens")
+
+    if not before:
+        print("No pages found in the corpus.")
+        return
+
+    saved = sum(before) - sum(after)
+    print(
+        f"\npages={len(before)}  tokens truncated={sum(before)}  ranked={sum(after)}  "
+        f"saved={saved} ({saved / max(sum(before), 1):.0%})"
+    )
+    print(f"mean tokens per page: {statistics.mean(before):.0f} -> {statistics.mean(after):.0f}")
+    if facts:
+        print(f"facts kept: truncated={kept_before}/{facts}  ranked={kept_after}/{facts}")
+    print(f"ranking time per page: mean={statistics.mean(elapsed) * 1000:.1f} ms  max={max(elapsed) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=FIXTURES_DIR, help="Directory of saved pages")
+    parser.add_argument("--page-cache", action="store_true", help="Use the pages of the on-disk page cache instead")
+    parser.add_argument("--budget", type=int, default=PASSAGE_TOKEN_BUDGET, help="Token budget per page")
+    args = parser.parse_args()
+    main(args.corpus, args.budget, args.page_cache)
@@ -0,0 +1,89 @@
+"""
+Measures the per-turn overhead of the supervisor node without network time:
+building the Gemini chat models and binding the agent tools on every turn
+(as before the model registry) against reusing them from `model_registry`.
+
+The Gemini API call is replaced by a canned tool call answer and the rate
+limiters are bypassed, so what remains is client construction, tool schema
+conversion, message formatting and LangChain bookkeeping.
+
+Requires the same `.env` as the app. No network or LLM calls are made.
+
+Usage:
+    python -m benchmarks.supervisor_overhead --turns 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from typing import Any, Awaitable, Callable, List
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from src.core.supervisor import supervisor_agent, get_model_with_tools
+from src.utils.llm_setup import model_registry, refresh_models
+from src.utils.rate_limiter import BucketRateLimiter
+
+
+async def _canned_answer(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+    message = AIMessage(
+        content="",
+        tool_calls=[{"name": "general_question_answer", "args": {"user_message": "hello"}, "id": "call-1"}],
+    )
+    return ChatResult(generations=[ChatGeneration(message=message)])
+
+async def _no_wait(self, *, blocking: bool = True) -> bool:
+    return True
+
+def _report(label: str, samples: List[float]) -> None:
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.95))]
+    print(
+        f"{label:<30} turns={len(samples_ms):<5} "
+        f"mean={statistics.mean(samples_ms):8.3f} ms  "
+        f"p50={statistics.median(samples_ms):8.3f} ms  "
+        f"p95={p95:8.3f} ms"
+    )
+
+async def _measure(turns: int, step: Callable[[], Awaitable[Any]], rebuild: bool) -> List[float]:
+    samples = []
+    for _ in range(turns):
+        if rebuild:
+            # Every turn starts without built models, as each turn used to build its own
+            refresh_models()
+        start = time.perf_counter()
+        await step()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+async def main(turns: int) -> None:
+    ChatGoogleGenerativeAI._agenerate = _canned_answer
+    BucketRateLimiter.aacquire = _no_wait
+    state = {"messages": [HumanMessage(content="What is the capital of France?")]}
+
+    async def supervisor_step() -> None:
+        await supervisor_agent(state)
+
+    # Warm up imports and lazy initialization outside the measurements
+    await supervisor_step()
+
+    results = {}
+    for label, step in (("get_model_with_tools", get_model_with_tools), ("supervisor_agent", supervisor_step)):
+        results[label] = (
+            await _measure(turns, step, rebuild=True),
+            await _measure(turns, step, rebuild=False),
+        )
+
+    for label, (before, after) in results.items():
+        _report(f"{label} rebuild", before)
+        _report(f"{label} registry", after)
+        print(f"speedup (mean): {statistics.mean(before) / statistics.mean(after):.1f}x\n")
+    print(f"registry entries: {len(model_registry)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200, help="Number of turns to measure per variant")
+    args = parser.parse_args()
+    asyncio.run(main(args.turns))
@@ -0,0 +1,138 @@
+"""
+Compares the tool schemas the supervisor LLM receives on every call: the
+current ones generated from the tool docstrings against the compact
+descriptions of `src/agents/tool_descriptions.py`, which the tools switch to
+once a recorded run shows they route as accurately.
+
+Always prints the estimated tokens of each tool schema. With `--routing`,
+also sends every prompt of a labeled set to the supervisor model with each
+set of schemas and reports the routing accuracy, the misrouted prompts, the
+input tokens reported by the API and the latency. Routing makes real Gemini
+calls, without running the tools.
+
+`--record` saves the routing answers of a run to a JSONL file, and
+`--replay` reports on a saved file offline, e.g. to review a run made with
+API keys on another machine or to compare runs before and after a change.
+
+Requires the same `.env` as the app.
+
+Usage:
+    python -m benchmarks.tool_descriptions
+    python -m benchmarks.tool_descriptions --routing --samples benchmarks/routing_samples.jsonl
+    python -m benchmarks.tool_descriptions --routing --record routing_run.jsonl
+    python -m benchmarks.tool_descriptions --replay routing_run.jsonl
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from pathlib import Path
+from typing import Dict, List
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.agents.tool_descriptions import compact_tool
+from src.core.supervisor import get_agent_tools
+from src.services.passage_ranking import estimate_tokens
+from src.utils.llm_setup import get_gemini_llm
+
+# Label of the prompts the supervisor should answer without calling a tool
+NO_TOOL = "none"
+
+
+def schema_tokens(tool: BaseTool) -> int:
+    return estimate_tokens(json.dumps(convert_to_openai_tool(tool)))
+
+def _token_report(compact: List[BaseTool], verbose: List[BaseTool]) -> None:
+    print(f"{'tool':<26} {'docstring':>10} {'compact':>8}  tokens")
+    for before, after in zip(verbose, compact):
+        print(f"{after.name:<26} {schema_tokens(before):>10} {schema_tokens(after):>8}")
+    total_before = sum(schema_tokens(tool) for tool in verbose)
+    total_after = sum(schema_tokens(tool) for tool in compact)
+    print(f"{'total per supervisor call':<26} {total_before:>10} {total_after:>8}  ({total_before / total_after:.1f}x fewer)\n")
+
+async def _route(model, prompt: str) -> Dict:
+    start = time.perf_counter()
+    message = await model.ainvoke([HumanMessage(content=prompt)])
+    usage = message.usage_metadata or {}
+    return {
+        "tool": message.tool_calls[0]["name"] if message.tool_calls else NO_TOOL,
+        "input_tokens": usage.get("input_tokens", 0),
+        "latency": time.perf_counter() - start,
+    }
+
+async def _route_samples(tools: List[BaseTool], samples: List[Dict], concurrency: int) -> List[Dict]:
+    llm = await get_gemini_llm()
+    model = llm.bind_tools(tools, parallel_tool_calls=False)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def route(sample: Dict) -> Dict:
+        async with semaphore:
+            return await _route(model, sample["prompt"])
+
+    return await asyncio.gather(*(route(sample) for sample in samples))
+
+def routing_report(label: str, samples: List[Dict], results: List[Dict]) -> float:
+    """Prints the accuracy, tokens and latency of routed samples, and returns the accuracy."""
+    misrouted = [(sample, result) for sample, result in zip(samples, results) if result["tool"] != sample["tool"]]
+    accuracy = 1 - len(misrouted) / len(samples)
+    print(
+        f"{label:<10} accuracy={accuracy:6.1%}  "
+        f"input tokens mean={statistics.mean(result['input_tokens'] for result in results):7.0f}  "
+        f"latency p50={statistics.median(result['latency'] for result in results):5.2f} s"
+    )
+    for sample, result in misrouted:
+        print(f"    expected {sample['tool']}, got {result['tool']}: {sample['prompt']}")
+    return accuracy
+
+def read_jsonl(path: Path) -> List[Dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+def replay(path: Path) -> Dict[str, float]:
+    """Reports on the routing answers saved with `--record`, by schema set, without any API call."""
+    runs: Dict[str, List[Dict]] = {}
+    for record in read_jsonl(path):
+        runs.setdefault(record["schemas"], []).append(record)
+    return {
+        label: routing_report(label, [{"prompt": r["prompt"], "tool": r["expected"]} for r in records], records)
+        for label, records in runs.items()
+    }
+
+async def main(args: argparse.Namespace) -> None:
+    if args.replay:
+        replay(args.replay)
+        return
+
+    verbose = await get_agent_tools()
+    compact = [compact_tool(tool) for tool in verbose]
+    _token_report(compact, verbose)
+
+    if args.routing:
+        samples = read_jsonl(args.samples)
+        print(f"routing {len(samples)} labeled prompts")
+        records = []
+        for label, tools in (("docstring", verbose), ("compact", compact)):
+            results = await _route_samples(tools, samples, args.concurrency)
+            routing_report(label, samples, results)
+            records += [
+                {"schemas": label, "prompt": sample["prompt"], "expected": sample["tool"], **result}
+                for sample, result in zip(samples, results)
+            ]
+        if args.record:
+            args.record.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+            print(f"recorded {len(records)} routing answers to {args.record}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routing", action="store_true", help="Check routing accuracy with the supervisor model")
+    parser.add_argument(
+        "--samples", type=Path, default=Path(__file__).with_name("routing_samples.jsonl"),
+        help="JSONL file of {\"prompt\", \"tool\"} labeled prompts",
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="Prompts routed at the same time")
+    parser.add_argument("--record", type=Path, help="Save the routing answers to this JSONL file")
+    parser.add_argument("--replay", type=Path, help="Report on routing answers saved with --record, offline")
+    asyncio.run(main(parser.parse_args()))
@@ -1,6 +1,7 @@
 import chainlit as cl
 
 from mcp import ClientSession
+from chainlit.server import app as server_app
 from typing import Dict, Optional
 from chainlit.types import ThreadDict
 from src.ui.starters import select_starter
@@ -8,6 +9,31 @@ from src.ui.commands import command_list
 from src.utils.persistent_data_layer import get_persistent_data_layer
 from src.services.speech_processing import run_audio_chunk, run_audio_workflow
 from src.workflow import run_agent_workflow
+from src.core.graph_builder import init_graph, close_graph
+from src.utils.llm_setup import close_gemini_clients
+from src.services.search_and_scrape import close_scrape_session
+from src.services.html_extraction import close_extraction_pool
+from src.ui.routes import register_routes
+
+# Prometheus metrics and graph health check on the Chainlit server
+register_routes(server_app)
+
+@cl.on_app_startup
+async def on_app_startup():
+    """Compiles the agent graph and warms up the checkpointer pool once per process."""
+    try:
+        await init_graph()
+    except Exception as e:
+        # The graph is initialized lazily on the first message if warmup fails
+        print(f"Error warming up the agent graph: {e}")
+
+@cl.on_app_shutdown
+async def on_app_shutdown():
+    """Closes the checkpointer connection pool, the shared HTTP clients and worker processes."""
+    await close_graph()
+    await close_gemini_clients()
+    await close_scrape_session()
+    close_extraction_pool()
 
 @cl.oauth_callback
 def oauth_callback(
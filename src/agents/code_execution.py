@@ -2,7 +2,7 @@ import chainlit as cl
 
 # from google.genai import types
 # from google.genai.types import GenerateContentResponse
-from src.utils.llm_setup import get_gemini_client, get_llm_coder
+from src.utils.llm_setup import get_gemini_client, get_llm_coder, coalesced_ainvoke, STREAM_TAG
 from src.utils.config import GEMINI_2_5_MODEL, PROMPT_CODER
 # from langchain_core.messages import HumanMessage, SystemMessage
 from langchain.prompts import ChatPromptTemplate
@@ -55,7 +55,7 @@ async def code_generation(user_message: str) -> str:
     """
     await cl.Message(content="Code execution Selected!\nPlease wait while I work on it!").send()
 
-    coder = await get_llm_coder()
+    coder = await get_llm_coder(cache="code")
 
     prompt_coder = ChatPromptTemplate.from_messages(
         [
@@ -66,7 +66,7 @@ async def code_generation(user_message: str) -> str:
 
     prompt = await prompt_coder.ainvoke({"text": user_message})
 
-    response = await coder.ainvoke(prompt)
+    response = await coalesced_ainvoke(coder.with_config(tags=[STREAM_TAG]), prompt)
 
     return response.content
 
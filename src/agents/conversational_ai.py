@@ -1,5 +1,6 @@
 import chainlit as cl
-from src.utils.llm_setup import get_openrouter_llm
+from src.utils.llm_setup import get_openrouter_llm, get_gemini_llm, coalesced_ainvoke, STREAM_TAG
+from src.utils.hedging import HedgedModel
 from langchain_core.tools import tool
 
 @tool
@@ -49,6 +50,10 @@ async def general_question_answer(user_message: str):
     """
     await cl.Message(content="Conversational AI Selected!\nPlease wait while I work on it!").send()
 
-    model = await get_openrouter_llm()
-    response = await model.ainvoke(user_message)
+    model = await get_openrouter_llm(cache="conversation")
+    backup = await get_gemini_llm(cache="conversation")
+
+    # Only the primary streams to the UI; a winning backup answer replaces it at the end
+    hedged = HedgedModel("general_question_answer", model.with_config(tags=[STREAM_TAG]), backup)
+    response = await coalesced_ainvoke(hedged, user_message)
     return response.content
\ No newline at end of file
@@ -1,30 +1,58 @@
 import chainlit as cl
 import asyncio
+import re
+import time
 
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 from langchain.prompts import ChatPromptTemplate
-from src.utils.llm_setup import get_gemini_llm, get_gemini_llm_v2
+from src.utils.llm_setup import get_gemini_llm, get_openrouter_llm, coalesced_ainvoke, STREAM_TAG
+from src.utils.hedging import HedgedModel
 from src.utils.prompts import (
     generate_critical_thinker_prompt, 
     generate_research_report_prompt, 
     generate_search_queries_prompt,
     generate_webpage_summary_template,
+    generate_batch_summary_template,
 )
 from src.utils.helpers import json_loads
+from src.utils.rate_limiter import Priority
+from src.utils.metrics import increment, observe
+from src.utils.config import (
+    DEEP_RESEARCH_DEADLINE,
+    RESEARCH_QUERY_TIMEOUT,
+    RESEARCH_SEARCH_TIMEOUT,
+    RESEARCH_SCRAPE_TIMEOUT,
+    RESEARCH_SUMMARY_TIMEOUT,
+    RESEARCH_SEARCH_CONCURRENCY,
+    RESEARCH_SCRAPE_CONCURRENCY,
+    RESEARCH_SUMMARY_CONCURRENCY,
+    SUMMARY_BATCH_SIZE,
+    SUMMARY_BATCH_TOKENS,
+    SUMMARY_BATCH_WAIT,
+    PASSAGE_TOKEN_BUDGET,
+    RESEARCH_MEMORY_MIN_SCORE,
+    RESEARCH_MEMORY_MAX_REUSED,
+)
 from src.services.search_and_scrape import (
-    web_search_with_tavily, 
+    web_search_fanout,
     scrape_link_async, 
-    flatten_list_of_list
+    SCRAPE_FAILED_PREFIX,
 )
+from src.services.passage_ranking import aselect_passages, estimate_tokens, rank_passages
+from src.utils.research_memory import ResearchNote, get_research_memory
+from src.services.deduplication import NearDuplicateIndex, canonical_url
 
 @tool
-async def deep_research_report(user_message: str):
+async def deep_research_report(user_message: str, config: RunnableConfig):
 	"""
     Conducts comprehensive web research using a multi-stage pipeline to generate detailed reports.
     
     This tool employs a sophisticated 4-stage research process:
     1. Query Generation: Creates optimized search queries from user questions
-    2. Web Search: Executes parallel searches using Tavily API
+    2. Web Search: Executes parallel searches across the configured backends (Tavily, DuckDuckGo)
     3. Content Processing: Scrapes, summarizes, and analyzes web content
     4. Report Synthesis: Compiles findings into a cohesive research report
     
@@ -78,16 +106,37 @@ async def deep_research_report(user_message: str):
 	await cl.Message(content="Search on the Web Browser Selected!\nPlease wait while I work on it!").send()
 
 	# question = "Encuentra informacion sobre RAG (Retrieval-Augmented Generation)"
-	results = await generate_report(user_message)
+	async with cl.Step(name="Deep research", type="tool") as step:
+		async def on_progress(update: str) -> None:
+			await step.stream_token(f"{update}\n")
+
+		# Follow-up research in the same thread reuses what earlier runs found
+		thread_id = config.get("configurable", {}).get("thread_id")
+		results = await generate_report(user_message, on_progress=on_progress, thread_id=thread_id)
 	# print(f"\n\n{results}\n")
 	return results.content
 
-async def generate_report(question):
-    """Generates a research report based on the provided question."""
-    research_results = await process_search_questions(question)
-    context = flatten_list_of_list(research_results)
-    gemini_llm_v2 = await get_gemini_llm_v2()
-    report = await gemini_llm_v2.ainvoke(prompt.format(context=context, question=question))
+ProgressCallback = Optional[Callable[[str], Awaitable[None]]]
+
+async def generate_report(question, on_progress: ProgressCallback = None, thread_id: Optional[str] = None):
+    """
+    Generates a research report based on the provided question.
+
+    Summaries are collected until `DEEP_RESEARCH_DEADLINE`; the report is written
+    from whatever finished by then. With a `thread_id`, research from earlier
+    turns of the thread is reused.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + DEEP_RESEARCH_DEADLINE
+
+    summaries = await process_search_questions(question, deadline, on_progress, thread_id)
+    context = "\n\n".join(summaries)
+
+    await _notify(on_progress, f"Writing the report from {len(summaries)} sources...")
+    start = time.perf_counter()
+    gemini_llm = await get_gemini_llm(priority=Priority.DEFAULT, cache="research_report")
+    report = await coalesced_ainvoke(gemini_llm.with_config(tags=[STREAM_TAG]), prompt.format(context=context, question=question))
+    observe("research_stage_latency_seconds", time.perf_counter() - start, stage="report")
     return report
 
 prompt = ChatPromptTemplate.from_messages(
@@ -97,14 +146,240 @@ prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-async def process_search_questions(question):
-    """Processes a search question by generating search queries and scraping results."""
-    gemini_llm = await get_gemini_llm()
-    search_output = await gemini_llm.ainvoke(SEARCH_PROMPT.format(question=question))
+async def _notify(on_progress: ProgressCallback, update: str) -> None:
+    print(f"\n{update}\n")
+    if on_progress:
+        await on_progress(update)
+
+async def _run_stage(stage: str, semaphore: asyncio.Semaphore, timeout: float, coro):
+    """Runs one unit of a pipeline stage under the stage concurrency limit and timeout."""
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(coro, timeout=timeout)
+        finally:
+            observe("research_stage_latency_seconds", time.perf_counter() - start, stage=stage)
+
+async def generate_search_queries(question):
+    """
+    Generates the search queries for a research question.
+
+    Models with tool calling are made to answer with a `search_queries` call,
+    so no JSON has to be parsed; otherwise, and when the model answers in
+    text anyway, the JSON list of the reply is parsed.
+    """
+    # Background research calls yield to interactive chat turns on the shared buckets
+    gemini_llm = await get_gemini_llm(priority=Priority.BACKGROUND, cache="research_queries")
+    try:
+        llm = gemini_llm.bind_tools([SEARCH_QUERIES_TOOL], tool_choice="any")
+    except NotImplementedError:
+        llm = gemini_llm
+    search_output = await coalesced_ainvoke(llm, SEARCH_PROMPT.format(question=question))
+
+    for tool_call in getattr(search_output, "tool_calls", None) or []:
+        queries = tool_call["args"].get("queries")
+        if tool_call["name"] == SEARCH_QUERIES_TOOL["name"] and isinstance(queries, list):
+            increment("json_parse_total", method="structured")
+            return [query for query in queries if isinstance(query, str) and query.strip()]
+
     print(f"\nRaw output from LLM: {search_output.content.strip()}\n")
-    queries = await json_loads(search_output.content.strip())
-    tasks = [process_search_results({"question": q}) for q in queries]
-    return await asyncio.gather(*tasks)
+    return await json_loads(search_output.content.strip())
+
+def relevant_notes(notes: List[ResearchNote], question: str) -> List[ResearchNote]:
+    """Earlier summaries of the thread relevant to a new question, most relevant first."""
+    if not notes:
+        return []
+    scores = rank_passages([f"{note.question} {note.summary}" for note in notes], question)
+    ranked = sorted(zip(scores, range(len(notes))), reverse=True)
+    return [notes[index] for score, index in ranked if score >= RESEARCH_MEMORY_MIN_SCORE][:RESEARCH_MEMORY_MAX_REUSED]
+
+async def process_search_questions(
+    question, deadline: float, on_progress: ProgressCallback = None, thread_id: Optional[str] = None
+):
+    """
+    Runs the query generation -> search -> scrape -> summarize stages as a stream.
+
+    Each search, scrape and summary starts as soon as its input is ready, with
+    bounded concurrency and a timeout per stage, so a slow site only delays its
+    own branch. Work still pending at `deadline` is cancelled and dropped.
+
+    Links to an already seen page are not scraped again, and near-duplicate
+    pages (mirrors, syndicated copies) are summarized once with all their URLs
+    kept as sources. Pages are summarized in batches, sent when full, after
+    `SUMMARY_BATCH_WAIT` or when no other page is on its way.
+
+    With a `thread_id`, the research memory of the thread is used: earlier
+    summaries relevant to the question are reused, queries searched before are
+    not searched again and pages summarized before are not scraped again.
+    Returns the summaries that finished in time.
+    """
+    loop = asyncio.get_running_loop()
+    limits = {
+        "queries": asyncio.Semaphore(1),
+        "search": asyncio.Semaphore(RESEARCH_SEARCH_CONCURRENCY),
+        "scrape": asyncio.Semaphore(RESEARCH_SCRAPE_CONCURRENCY),
+        "summarize": asyncio.Semaphore(RESEARCH_SUMMARY_CONCURRENCY),
+    }
+    timeouts = {
+        "queries": RESEARCH_QUERY_TIMEOUT,
+        "search": RESEARCH_SEARCH_TIMEOUT,
+        "scrape": RESEARCH_SCRAPE_TIMEOUT,
+        "summarize": RESEARCH_SUMMARY_TIMEOUT,
+    }
+
+    memory = get_research_memory() if thread_id else None
+    reused: List[ResearchNote] = []
+    seen_urls = set()
+    if memory:
+        reused = relevant_notes(await memory.anotes(thread_id), question)
+        for note in reused:
+            seen_urls.update(canonical_url(url) for url in note.sources)
+        if reused:
+            await _notify(on_progress, f"Reusing {len(reused)} summaries from earlier research in this thread")
+
+    async def search(query: str) -> Tuple[List[str], Dict[str, ResearchNote]]:
+        """Finds the URLs of a query, and the earlier summaries of those pages."""
+        urls = await memory.aquery_urls(thread_id, query) if memory else None
+        if urls is None:
+            urls = await web_search_fanout(query)
+            if memory and urls:
+                await memory.asave_query(thread_id, query, urls)
+        notes = {}
+        if memory:
+            for url in urls:
+                note = await memory.anote_for(thread_id, canonical_url(url))
+                if note:
+                    notes[url] = note
+        return urls, notes
+
+    await _notify(on_progress, "Generating search queries...")
+    try:
+        queries = await _run_stage(
+            "queries", limits["queries"], min(timeouts["queries"], max(deadline - loop.time(), 0)),
+            generate_search_queries(question),
+        )
+    except Exception as e:
+        # Degrade to searching the question itself rather than aborting the report
+        increment("research_stage_failures_total", stage="queries")
+        print(f"Research queries failed, searching the question instead: {e!r}")
+        queries = []
+    queries = queries or [question]
+    await _notify(on_progress, f"Searching the web for {len(queries)} queries: {', '.join(queries)}")
+
+    # task -> (stage, query, url)
+    pending: Dict[asyncio.Task, Tuple[str, str, Optional[str]]] = {}
+    duplicates = NearDuplicateIndex()
+    # Source URLs and summary of each distinct page content, by duplicate group
+    groups: Dict[str, int] = {}
+    sources: Dict[int, List[str]] = {}
+    questions: Dict[int, str] = {}
+    summaries: Dict[int, str] = {}
+    # Pages waiting for a summary batch, and the pages of each batch being summarized
+    buffer: List[dict] = []
+    flush_at = 0.0
+    batches: Dict[asyncio.Task, List[dict]] = {}
+
+    def start(stage: str, query: str, url: Optional[str], coro) -> asyncio.Task:
+        task = asyncio.ensure_future(_run_stage(stage, limits[stage], timeouts[stage], coro))
+        pending[task] = (stage, query, url)
+        return task
+
+    def flush() -> None:
+        pages = buffer[:]
+        buffer.clear()
+        urls = ", ".join(page["url"] for page in pages)
+        batches[start("summarize", pages[0]["question"], urls, summarize_pages(pages))] = pages
+
+    def buffer_page(page: dict) -> None:
+        nonlocal flush_at
+        tokens = sum(min(estimate_tokens(p["text"]), PASSAGE_TOKEN_BUDGET) for p in buffer + [page])
+        if buffer and tokens > SUMMARY_BATCH_TOKENS:
+            flush()
+        if not buffer:
+            flush_at = loop.time() + SUMMARY_BATCH_WAIT
+        buffer.append(page)
+        if len(buffer) >= SUMMARY_BATCH_SIZE:
+            flush()
+
+    for query in queries:
+        start("search", query, None, search(query))
+
+    try:
+        while pending or buffer:
+            upstream = any(stage in ("search", "scrape") for stage, _, _ in pending.values())
+            if buffer and (not upstream or loop.time() >= flush_at):
+                flush()
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            if buffer:
+                remaining = min(remaining, max(flush_at - loop.time(), 0))
+            done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                stage, query, url = pending.pop(task)
+                pages = batches.pop(task, [])
+                if task.exception() is not None:
+                    increment("research_stage_failures_total", stage=stage)
+                    print(f"Research {stage} failed for {url or query}: {task.exception()!r}")
+                    continue
+
+                result = task.result()
+                if stage == "search":
+                    found_urls, notes = result
+                    if not found_urls:
+                        print(f"No results could be obtained for the search: {query}")
+                    for found_url in found_urls:
+                        if canonical_url(found_url) in seen_urls:
+                            increment("research_duplicates_total", kind="url")
+                            continue
+                        seen_urls.add(canonical_url(found_url))
+                        if found_url in notes:
+                            # Summarized in an earlier turn of the thread
+                            reused.append(notes[found_url])
+                            seen_urls.update(canonical_url(url) for url in notes[found_url].sources)
+                            continue
+                        start("scrape", query, found_url, scrape_link_async(found_url))
+
+                elif stage == "scrape":
+                    if not result or result.startswith(SCRAPE_FAILED_PREFIX):
+                        increment("research_stage_failures_total", stage=stage)
+                        continue
+                    group = duplicates.add(result)
+                    if group is not None:
+                        increment("research_duplicates_total", kind="content")
+                        sources[group].append(url)
+                        print(f"Skipped near-duplicate page {url} of {sources[group][0]}")
+                        continue
+                    groups[url] = len(duplicates) - 1
+                    sources[groups[url]] = [url]
+                    questions[groups[url]] = query
+                    buffer_page({"question": query, "url": url, "text": result})
+
+                else:
+                    for page, summary in zip(pages, result):
+                        if summary:
+                            summaries[groups[page["url"]]] = summary
+                    await _notify(on_progress, f"Summarized {url}")
+    finally:
+        # Stragglers past the deadline are dropped; the report uses what finished
+        expired = loop.time() >= deadline
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if expired:
+            for stage, _, _ in pending.values():
+                increment("research_dropped_total", stage=stage)
+            if buffer:
+                increment("research_dropped_total", value=len(buffer), stage="summarize")
+
+    notes = [ResearchNote(sources[group], questions[group], summary) for group, summary in summaries.items()]
+    if memory:
+        for note in notes:
+            await memory.asave_note(thread_id, [canonical_url(url) for url in note.sources], note)
+
+    return [f"URL: {', '.join(note.sources)}\n\nSummary: {note.summary}" for note in reused + notes]
 
 SEARCH_PROMPT = ChatPromptTemplate.from_messages(
     [
@@ -114,35 +389,93 @@ SEARCH_PROMPT = ChatPromptTemplate.from_messages(
     ]
 )
 
-async def process_search_results(data):
+# Function schema the query generation model must call, instead of writing JSON in text
+SEARCH_QUERIES_TOOL = {
+    "name": "search_queries",
+    "description": "Returns the Google search queries for the research task.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "queries": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Search queries, in the same language as the task",
+            },
+        },
+        "required": ["queries"],
+    },
+}
+
+def parse_batch_summary(content: str, count: int) -> Dict[int, str]:
     """
-    Processes search results by scraping and summarizing each URL.
+    Splits a batch summary reply into the non-empty section of each source, by index.
+
+    Returns no sections unless the reply has exactly one marker for each of
+    the `count` sources, since a skipped or repeated number may shift the
+    summaries onto the wrong pages.
     """
-    urls = await web_search_with_tavily(data["question"])
-    if not urls:
-        print(f"No results could be obtained for the search: {data['question']}")
-        return []
+    parts = BATCH_SECTION.split(content)
+    # parts alternates: text before the first marker, then source number and section text
+    numbers = [int(number) for number in parts[1::2]]
+    if sorted(numbers) != list(range(1, count + 1)):
+        return {}
+    return {number - 1: text.strip() for number, text in zip(numbers, parts[2::2]) if text.strip()}
+
+async def summarize_pages(pages: List[dict]) -> List[Optional[str]]:
+    """
+    Summarizes several pages in one LLM request, with one output section per page.
 
-    tasks = []
-    for url in urls:
-        # summary = await scrape_and_summarize({"question": data["question"], "url": url})
-        tasks.append(scrape_and_summarize({"question": data["question"], "url": url}))
+    Pages whose section is empty, or all of them if the request fails or the
+    sections of the reply do not match the pages, are summarized with one
+    request each. Returns the summary
+    of each page, or None when it could not be summarized.
+    """
+    if len(pages) == 1:
+        return [await summarize_page(pages[0])]
+
+    texts = await asyncio.gather(*(aselect_passages(page["text"], page["question"]) for page in pages))
+    sources = "\n\n".join(
+        f"[[SOURCE {number}]]\nQuestion: {page['question']}\n\n{text}"
+        for number, (page, text) in enumerate(zip(pages, texts), start=1)
+    )
+    gemini_llm = await get_gemini_llm(priority=Priority.BACKGROUND, cache="page_summary")
+    openrouter_llm = await get_openrouter_llm(priority=Priority.BACKGROUND, cache="page_summary")
+    hedged = HedgedModel("summarize_pages", gemini_llm, openrouter_llm)
 
+    sections = {}
     try:
-        return await asyncio.gather(*tasks)
+        reply = await coalesced_ainvoke(hedged, BATCH_SUMMARY_PROMPT.format(sources=sources, count=len(pages)))
+        sections = parse_batch_summary(reply.content, len(pages))
     except Exception as e:
-        print(f"Error processing results: {e}")
-        return []
-    
-async def scrape_and_summarize(url_data):
-    """Scrapes the content of a URL and summarizes it using an LLM."""
-    text = await scrape_link_async(url_data["url"])
-    text = text[:10000]
-    gemini_llm_v2 = await get_gemini_llm_v2()
-    summary = await gemini_llm_v2.ainvoke(SUMMARY_PROMPT.format(text=text, question=url_data["question"]))
+        print(f"Batch summary of {len(pages)} pages failed: {e!r}")
+    increment("summary_batches_total", outcome="complete" if len(sections) == len(pages) else "fallback")
+
+    missing = [index for index in range(len(pages)) if index not in sections]
+    if missing:
+        increment("summary_batch_fallback_pages_total", value=len(missing))
+        fallback = await asyncio.gather(*(summarize_page(pages[index]) for index in missing), return_exceptions=True)
+        for index, summary in zip(missing, fallback):
+            if isinstance(summary, Exception):
+                print(f"Summary of {pages[index]['url']} failed: {summary!r}")
+            else:
+                sections[index] = summary
+    return [sections.get(index) for index in range(len(pages))]
+
+async def summarize_page(page_data):
+    """Summarizes the passages of a page most relevant to the query using an LLM."""
+    text = await aselect_passages(page_data["text"], page_data["question"])
+    gemini_llm = await get_gemini_llm(priority=Priority.BACKGROUND, cache="page_summary")
+    openrouter_llm = await get_openrouter_llm(priority=Priority.BACKGROUND, cache="page_summary")
+    hedged = HedgedModel("summarize_page", gemini_llm, openrouter_llm)
+    summary = await coalesced_ainvoke(hedged, SUMMARY_PROMPT.format(text=text, question=page_data["question"]))
     if summary:
         print("\nSummary content successfuly!\n")
-    return f"URL: {url_data['url']}\n\nSummary: {summary}"
+    return summary.content
 
 SUMMARY_TEMPLATE = generate_webpage_summary_template()
-SUMMARY_PROMPT = ChatPromptTemplate.from_template(SUMMARY_TEMPLATE)
\ No newline at end of file
+SUMMARY_PROMPT = ChatPromptTemplate.from_template(SUMMARY_TEMPLATE)
+
+BATCH_SUMMARY_PROMPT = ChatPromptTemplate.from_template(generate_batch_summary_template())
+# A section marker on its own line, also when the model adds markdown around it,
+# changes its case or starts the summary on the same line
+BATCH_SECTION = re.compile(r"^[ \t>#*_`]*\[\[\s*SOURCE\s+(\d+)\s*\]\][*_`:]*[ \t]*", re.MULTILINE | re.IGNORECASE)
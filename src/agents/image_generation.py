@@ -80,9 +80,7 @@ async def generate_image(user_message: str) -> str:
 
     string_path = str(image_path)
 
-    print("\nGenerate Image Metadata:")
-    print(response.usage_metadata)
-
+    # Token usage is recorded by the model metrics callback (see /metrics)
     return string_path
 
 def get_image_base64(response: AIMessage) -> None:
@@ -1,11 +1,14 @@
 import chainlit as cl
-import re
 
-from langchain_community.document_loaders import WebBaseLoader
+from langchain_core.documents import Document
 from langchain_core.tools import tool
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from src.utils.llm_setup import get_gemini_llm, get_gemini_url_context
+from src.services.search_and_scrape import scrape_link_async, SCRAPE_FAILED_PREFIX
+from src.services.passage_ranking import aselect_passages
+from src.utils.metrics import increment
+from src.utils.url_extraction import extract_context_and_url
 
 @tool
 async def scrape_link(user_message: str) -> str:
@@ -13,15 +16,15 @@ async def scrape_link(user_message: str) -> str:
     Advanced web content extraction system with intelligent URL handling.
     
     This tool provides robust web scraping capabilities with:
-    1. Smart URL-context separation using regex parsing
+    1. Smart URL-context separation with the shared URL extractor
     2. Dual scraping methods for different use cases
     3. Context-aware content processing
     4. Automatic Markdown conversion
     5. Gemini API integration for enhanced content extraction
     
     Workflow:
-    - Extracts URL and context from user message using regex:
-        pattern = r"(?ix)(?P<context>.*?)(?P<url>https?://[^\s]+)(?P<context_after>.*)?"
+    - Extracts URL and context from user message with `extract_context_and_url`
+      (precompiled pattern, trailing punctuation stripped)
     - Routes to appropriate scraping method:
         A) With context: Uses Gemini's UrlContext for AI-powered extraction
         B) Without context: Traditional scraping + Markdown conversion
@@ -44,10 +47,10 @@ async def scrape_link(user_message: str) -> str:
        - Preserves contextual relevance
     
     2. Traditional Scraping Method:
-       - Uses WebBaseLoader for content extraction
+       - Uses the shared scraper and its page cache for content extraction
        - Processes content through LLM chain:
            prompt = 'Summarize this content in markdown format: {context}'
-       - Handles large documents (first 10,000 characters)
+       - Handles large documents by keeping their most representative passages
     
     Error Handling:
     --------------
@@ -66,12 +69,13 @@ async def scrape_link(user_message: str) -> str:
     """
     await cl.Message(content="You've chosen to scrape a link.\nPlease hold on while I work on it!").send()
 
-    context_and_url = await extract_context_and_url(user_message)
+    context_and_url = extract_context_and_url(user_message)
+    increment("url_extraction_total", tool="scrape_link", method="rules")
     print(f"\nExtracted context and URL: {context_and_url}\n")
     if len(context_and_url) == 2:
         answer = await url_context(user_message)
     else:
-        answer = await scrape_web_async(user_message)
+        answer = await scrape_web_async(context_and_url[0])
     return answer
 
 async def url_context(user_message: str) -> str:
@@ -96,23 +100,26 @@ async def scrape_web_async(user_message: str) -> str:
     Scrapes the content of a URL, converts it to Markdown format, 
     and returns the processed content.
     """
-    loader = WebBaseLoader(user_message)
-    # docs = loader.load()
-    docs = []
-    async for doc in loader.alazy_load():
-        docs.append(doc)
+    url = user_message.strip()
+    # Goes through the page cache, so recently scraped pages skip the network
+    text = await scrape_link_async(url)
+    if text.startswith(SCRAPE_FAILED_PREFIX):
+        print(f"Error scraping URL {url}: {text}")
+        return "I encountered an error while processing the URL (e.g., malformed URL). Please try again later!"
+    # Without a question, passages closest to the page as a whole are kept, which drops boilerplate
+    docs = [Document(page_content=await aselect_passages(text), metadata={"source": url})]
 
     # Define prompt
     prompt = ChatPromptTemplate.from_template('''Summarize this content in markdown format: {context}''')
 
     # Get the LLM
-    llm = await get_gemini_llm()
+    llm = await get_gemini_llm(cache="page_summary")
 
     # Instantiate chain
     chain = create_stuff_documents_chain(llm, prompt)
 
     # Invoke chain
-    result = await chain.ainvoke({"context": docs[:10000]})
+    result = await chain.ainvoke({"context": docs})
 
     try:
         if result:
@@ -121,27 +128,3 @@ async def scrape_web_async(user_message: str) -> str:
     except Exception as e:
         print(f"Error processing URL {user_message}: {e}")
         return "I encountered an error while processing the URL (e.g., malformed URL). Please try again later!"
-
-async def extract_context_and_url(user_message: str):
-    """Extracts context and URL from a user message."""
-    pattern = re.compile(r"""(?ix)
-        (?P<context>.*?)
-        (?P<url>https?://[^\s]+)
-        (?P<context_after>.*)?
-    """)
-
-    match = pattern.search(user_message.strip())
-
-    if not match:
-        return [user_message.strip()]
-   
-    url = match.group("url").strip()
-    before = match.group("context").strip()
-    after = match.group("context_after").strip() if match.group("context_after") else ""
-
-    context = f"{before} {after}".strip()
-
-    if context:
-        return [context, url]
-    else:
-        return [url]
\ No newline at end of file
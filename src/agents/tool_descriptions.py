@@ -0,0 +1,54 @@
+"""
+Compact model-facing descriptions and argument schema of the agent tools.
+
+The supervisor LLM receives the schema of every tool on each call, so these
+only say when to pick a tool. The tools still send their docstrings: they
+switch to these descriptions once a routing run recorded with
+`python -m benchmarks.tool_descriptions --routing --record` shows no loss of
+accuracy against the docstring schemas. Until then `compact_tool` builds the
+compact variant for the benchmark.
+"""
+from langchain_core.tools import BaseTool, StructuredTool
+from pydantic import BaseModel, Field
+
+
+class UserMessageInput(BaseModel):
+    user_message: str = Field(description="The user's request, verbatim, including any URL")
+
+
+GENERATE_IMAGE = "Creates an image from a text description. Use when the user asks to draw, generate or design a picture."
+
+SCRAPE_LINK = "Reads a web page from a URL (not YouTube) and summarizes it or answers questions about it."
+
+DEEP_RESEARCH_REPORT = (
+    "Searches the web and writes a detailed report with sources. Use for research, comparisons, "
+    "news and questions that need current information."
+)
+
+CODE_GENERATION = "Writes, explains, reviews or fixes code in any programming language."
+
+GENERAL_QUESTION_ANSWER = (
+    "Answers general knowledge questions, explanations, writing tasks and small talk "
+    "that need no web search, code, image or URL."
+)
+
+YOUTUBE_TRANSCRIBE = "Transcribes, summarizes or answers questions about a YouTube video from its URL."
+
+DESCRIPTIONS = {
+    "generate_image": GENERATE_IMAGE,
+    "scrape_link": SCRAPE_LINK,
+    "deep_research_report": DEEP_RESEARCH_REPORT,
+    "code_generation": CODE_GENERATION,
+    "general_question_answer": GENERAL_QUESTION_ANSWER,
+    "youtube_transcribe": YOUTUBE_TRANSCRIBE,
+}
+
+
+def compact_tool(tool: BaseTool) -> StructuredTool:
+    """The tool with its compact description and the shared `UserMessageInput` schema."""
+    return StructuredTool.from_function(
+        coroutine=tool.coroutine,
+        name=tool.name,
+        description=DESCRIPTIONS[tool.name],
+        args_schema=UserMessageInput,
+    )
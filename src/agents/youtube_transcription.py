@@ -7,7 +7,14 @@ from src.utils.prompts import (
     generate_youtube_transcribe_prompt, 
     generate_context_and_url_prompt
 )
-from src.utils.llm_setup import get_gemini_llm_for_youtube, get_gemini_llm_v2
+from src.utils.llm_setup import get_gemini_llm_for_youtube, get_gemini_llm
+from src.utils.metrics import increment
+from src.utils.url_extraction import (
+    split_context_and_urls,
+    youtube_video_id,
+    youtube_start_seconds,
+    normalize_youtube_url,
+)
 
 PROMPT = generate_youtube_transcribe_prompt()
 
@@ -25,14 +32,15 @@ async def youtube_transcribe(user_message: str):
     Transcribes YouTube videos using Gemini AI with intelligent context extraction.
     
     This tool:
-    1. Intelligently extracts YouTube URLs and context from user messages
-    2. Validates YouTube URLs
+    1. Extracts the YouTube URL and context from user messages with a local parser
+    2. Normalizes YouTube URLs (watch, youtu.be, shorts, embed) and keeps the start time
     3. Uses Gemini's multimodal capabilities for transcription
     4. Implements robust JSON error recovery
     5. Handles API errors gracefully
     
     Workflow:
-    - First extracts context and URL from the user message using Gemini
+    - First extracts context and URL from the user message; Gemini is only
+      asked when the message has no YouTube URL or several different videos
     - Validates the extracted YouTube URL
     - If no valid URL found, returns an error message
     - Sends video URL and context to Gemini for transcription
@@ -61,22 +69,19 @@ async def youtube_transcribe(user_message: str):
     """
     await cl.Message(content="Transcribe YouTube video Selected!\nPlease hold on while I work on it!").send()
 
-    extracted_data = await extract_context_and_url(user_message)
-    if len(extracted_data) == 2:
-        context, url = extracted_data
-    else:
-        url = extracted_data[0]
-        if not url.startswith("https://www.youtube.com/watch?v=") or not url.startswith("https://youtu.be/"):
-            return "No YouTube URL provided. Please check the URL and try again."
-        context = PROMPT
-        
+    context, url = await extract_youtube_context_and_url(user_message)
+    if not url:
+        return "No YouTube URL provided. Please check the URL and try again."
+    start_seconds = youtube_start_seconds(url)
+    url = normalize_youtube_url(url)
+    context = context or PROMPT
+
     try:
-        response = await get_gemini_llm_for_youtube(url, context)
+        response = await get_gemini_llm_for_youtube(url, context, start_seconds)
 
         if response.text:
+            # Token usage is recorded by `generate_gemini_content` (see /metrics)
             print("\nTranscription successful!")
-            print("\nYouTube Transcription Metadata:")
-            print(response.usage_metadata)
         
         return [response.text, url]
 
@@ -84,22 +89,33 @@ async def youtube_transcribe(user_message: str):
         print(f"An error occurred while processing the YouTube video: {e}")
         return "Error processing the video (e.g., malformed URL). Please check the URL and try again."
 
-async def extract_context_and_url(user_message: str):
+async def extract_youtube_context_and_url(user_message: str) -> tuple:
+    """
+    Returns the `(context, url)` of a message, with `url` None when it has no YouTube URL.
+
+    The message is parsed locally; the LLM extraction only runs when the parse
+    is ambiguous, i.e. no YouTube URL or links to more than one video.
+    """
+    context, urls = split_context_and_urls(user_message)
+    youtube_urls = [url for url in urls if youtube_video_id(url)]
+    if len({youtube_video_id(url) for url in youtube_urls}) == 1:
+        increment("url_extraction_total", tool="youtube_transcribe", method="rules")
+        return context, youtube_urls[0]
+
+    increment("url_extraction_total", tool="youtube_transcribe", method="llm")
+    extracted_data = await extract_context_and_url_with_llm(user_message)
+    if not isinstance(extracted_data, list) or not extracted_data:
+        return "", None
+    url = str(extracted_data[-1]).strip()
+    context = str(extracted_data[0]).strip() if len(extracted_data) == 2 else ""
+    return context, url if youtube_video_id(url) else None
+
+async def extract_context_and_url_with_llm(user_message: str):
     """
     This function extracts context and URL from the user message using the Gemini model.
     """
-    gemini_llm_v2 = await get_gemini_llm_v2()
-    context_url = await gemini_llm_v2.ainvoke(EXTRACT_CONTEXT_URL.format(input=user_message))
+    gemini_llm = await get_gemini_llm()
+    context_url = await gemini_llm.ainvoke(EXTRACT_CONTEXT_URL.format(input=user_message))
     print(f"\nExtracted context and URL: {context_url.content}")
     json_data = await safe_json_loads(context_url.content.strip())
-    # print(f"\nParsed JSON data: {json_data}")
-    # if len(json_data) == 2:
-    #     print(f"\nJSON data context: {json_data[0]}")
-    #     print(f"\nJSON data url: {json_data[1]}")
-    # else:
-    #     print(f"\nJSON data url: {json_data[0]}")
     return json_data
-
-# user_message = "https://youtu.be/dQw4w9WgXcQ?si=123456789 resume el video de youtube en 3 lineas"
-# if __name__ == "__main__":
-#   asyncio.run(extract_context_and_url(user_message))
\ No newline at end of file
@@ -2,14 +2,25 @@ import asyncio
 import platform
 
 from contextlib import asynccontextmanager
+from typing import Optional
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 from langgraph.prebuilt import ToolNode
-from langgraph.graph import MessagesState
+from langgraph.graph.state import CompiledStateGraph
 # from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from langgraph.prebuilt import tools_condition
 from langgraph.graph import START, END, StateGraph
 from .supervisor import supervisor_agent, get_agent_tools
-from src.utils.config import MEMORY_DATABASE 
+from .router import router_agent, route_after_router
+from .history import manage_history
+from .state import AgentState
+from src.utils.config import (
+    MEMORY_DATABASE,
+    MEMORY_POOL_MIN_SIZE,
+    MEMORY_POOL_MAX_SIZE,
+    MEMORY_POOL_TIMEOUT,
+)
 
 # Set the correct event loop policy for Windows
 if platform.system() == "Windows":
@@ -17,19 +28,34 @@ if platform.system() == "Windows":
         asyncio.WindowsSelectorEventLoopPolicy()
     )
 
+# Process-wide connection pool and compiled graph, created once by `init_graph`
+_pool: Optional[AsyncConnectionPool] = None
+_graph: Optional[CompiledStateGraph] = None
+_graph_lock = asyncio.Lock()
+
 async def _build_base_graph():
     """Build and return the base state graph with all nodes and edges."""
     tools = await get_agent_tools()
 
     # Graph
-    builder = StateGraph(MessagesState)
+    builder = StateGraph(AgentState)
 
     # Define nodes: these do the work
+    builder.add_node("history", manage_history)
+    builder.add_node("router", router_agent)
     builder.add_node("supervisor", supervisor_agent)
     builder.add_node("tools", ToolNode(tools))
 
     # Define edges: these determine how the control flow moves
-    builder.add_edge(START, "supervisor")
+    # Earlier turns are bounded (stubs and rolling summary) before the new one is routed
+    builder.add_edge(START, "history")
+    builder.add_edge("history", "router")
+    builder.add_conditional_edges(
+        "router",
+        # Commands and unambiguous inputs go straight to the tools, the rest to the supervisor LLM
+        route_after_router,
+        ["tools", "supervisor"],
+    )
     builder.add_conditional_edges(
         "supervisor",
         # If the latest message (result) from assistant is a tool call -> tools_condition routes to tools
@@ -42,7 +68,12 @@ async def _build_base_graph():
 
 @asynccontextmanager
 async def build_graph():
-    """Build and return the agent workflow graph with memory."""
+    """
+    Build and return the agent workflow graph with a dedicated connection.
+
+    Opens a new Postgres connection and recompiles the graph on every call.
+    Prefer `get_graph()`, which reuses a process-wide compiled graph.
+    """
     # use persistent memory to save conversation history
     # TODO: be compatible with SQLite / PostgreSQL
     # checkpointer = InMemorySaver()
@@ -54,4 +85,83 @@ async def build_graph():
     
         graph = builder.compile(checkpointer=checkpointer)
 
-        yield graph
\ No newline at end of file
+        yield graph
+
+def _create_pool() -> AsyncConnectionPool:
+    """Creates a bounded async connection pool for the checkpointer."""
+    return AsyncConnectionPool(
+        conninfo=MEMORY_DATABASE,
+        min_size=MEMORY_POOL_MIN_SIZE,
+        max_size=MEMORY_POOL_MAX_SIZE,
+        timeout=MEMORY_POOL_TIMEOUT,
+        # Validate connections before handing them out, so a dropped
+        # connection is replaced instead of failing the turn
+        check=AsyncConnectionPool.check_connection,
+        # Same connection settings used by `AsyncPostgresSaver.from_conn_string`
+        kwargs={
+            "autocommit": True,
+            "prepare_threshold": 0,
+            "row_factory": dict_row,
+        },
+        name="langgraph-checkpointer",
+        open=False,
+    )
+
+async def init_graph() -> CompiledStateGraph:
+    """
+    Warms up the checkpointer pool and compiles the graph once per process.
+
+    Safe to call several times; only the first call does any work.
+    """
+    global _pool, _graph
+
+    async with _graph_lock:
+        if _graph is not None:
+            return _graph
+
+        pool = _create_pool()
+        try:
+            # Wait until `min_size` connections are established so the first turn
+            # does not pay the TCP + auth handshake
+            await pool.open(wait=True, timeout=MEMORY_POOL_TIMEOUT)
+
+            checkpointer = AsyncPostgresSaver(pool)
+            # await checkpointer.setup()
+
+            builder = await _build_base_graph()
+            graph = builder.compile(checkpointer=checkpointer)
+        except BaseException:
+            # Also covers a failed or cancelled `open`, which leaves the pool workers running
+            await pool.close()
+            raise
+
+        _pool, _graph = pool, graph
+        print(f"\nAgent graph compiled, checkpointer pool stats: {pool.get_stats()}\n")
+        return _graph
+
+async def get_graph() -> CompiledStateGraph:
+    """Returns the process-wide compiled graph, initializing it on first use."""
+    if _graph is not None:
+        return _graph
+    return await init_graph()
+
+async def check_graph_health() -> bool:
+    """Checks that the checkpointer pool can serve a working connection."""
+    if _pool is None or _pool.closed:
+        return False
+    try:
+        async with _pool.connection(timeout=MEMORY_POOL_TIMEOUT) as conn:
+            await conn.execute("SELECT 1")
+        return True
+    except Exception as e:
+        print(f"Checkpointer health check failed: {e}")
+        return False
+
+async def close_graph() -> None:
+    """Releases the compiled graph and closes the checkpointer pool."""
+    global _pool, _graph
+
+    async with _graph_lock:
+        pool, _pool, _graph = _pool, None, None
+        if pool is not None:
+            await pool.close()
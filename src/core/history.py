@@ -0,0 +1,217 @@
+import asyncio
+import time
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage, ToolMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
+from src.utils.llm_setup import get_gemini_llm
+from src.utils.prompts import generate_history_summary_template
+from src.utils.rate_limiter import Priority
+from src.utils.metrics import increment, observe
+from src.utils.config import (
+    HISTORY_KEEP_TURNS,
+    HISTORY_MAX_TURNS,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_TOOL_OUTPUT_TOKENS,
+    HISTORY_SUMMARY_WORDS,
+)
+from src.services.passage_ranking import estimate_tokens
+from .state import AgentState
+
+# Characters of a stubbed tool output kept as a preview
+STUB_PREVIEW_CHARS = 300
+
+# Seconds after which a fold that was never applied, e.g. of an abandoned thread, is dropped
+PENDING_FOLD_TTL = 600
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_template(generate_history_summary_template())
+
+def message_tokens(message: BaseMessage) -> int:
+    """Estimated tokens of a message, including the arguments of its tool calls."""
+    tokens = estimate_tokens(message.content if isinstance(message.content, str) else str(message.content))
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += estimate_tokens(str(tool_call["args"]))
+    return tokens
+
+def split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Splits a conversation into turns, each starting with a user message."""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+def trim_to_budget(messages: List[BaseMessage], summary: str = "") -> List[BaseMessage]:
+    """
+    Keeps the current turn and the most recent earlier turns that fit HISTORY_TOKEN_BUDGET with the summary.
+
+    Turns over the budget are folded into the summary in the background by
+    `manage_history`; until that is applied, they are left out of the model
+    input rather than sending the whole history.
+    """
+    if not messages:
+        return messages
+    *previous, current = split_turns(messages)
+    tokens = estimate_tokens(summary)
+    kept = 0
+    for turn in reversed(previous):
+        tokens += sum(message_tokens(message) for message in turn)
+        if tokens > HISTORY_TOKEN_BUDGET:
+            break
+        kept += 1
+    trimmed = len(previous) - kept
+    if not trimmed:
+        return messages
+    increment("history_turns_trimmed_total", value=trimmed)
+    return [message for turn in [*previous[trimmed:], current] for message in turn]
+
+def stub_tool_output(message: ToolMessage) -> ToolMessage:
+    """Replaces a large tool output with a short preview, keeping its id so it replaces the original."""
+    preview = " ".join(str(message.content).split())[:STUB_PREVIEW_CHARS]
+    return ToolMessage(
+        content=(
+            f"[Output of {message.name} from an earlier turn, about {message_tokens(message)} tokens, "
+            f"omitted from the history. It began: {preview}...]"
+        ),
+        tool_call_id=message.tool_call_id,
+        name=message.name,
+        id=message.id,
+    )
+
+def _transcript(turns: List[List[BaseMessage]]) -> str:
+    lines = []
+    for message in (message for turn in turns for message in turn):
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {message.content}")
+        elif isinstance(message, ToolMessage):
+            lines.append(f"Tool {message.name}: {message.content}")
+        elif isinstance(message, AIMessage):
+            calls = ", ".join(tool_call["name"] for tool_call in message.tool_calls)
+            if message.content:
+                lines.append(f"Assistant: {message.content}")
+            if calls:
+                lines.append(f"Assistant called: {calls}")
+    return "\n".join(lines)
+
+async def summarize_turns(summary: str, turns: List[List[BaseMessage]]) -> str:
+    """Folds turns into the rolling summary of the conversation."""
+    llm = await get_gemini_llm(priority=Priority.BACKGROUND)
+    response = await llm.ainvoke(
+        SUMMARY_PROMPT.format(
+            summary=summary or "(empty)",
+            conversation=_transcript(turns),
+            max_words=HISTORY_SUMMARY_WORDS,
+        )
+    )
+    return response.content.strip()
+
+@dataclass
+class PendingFold:
+    """A summary being written in the background, applied on a later turn of the thread."""
+    summary: str
+    message_ids: List[str]
+    turns: int
+    task: asyncio.Task
+    started_at: float
+
+# Folds still running or not yet applied, by thread
+_pending_folds: Dict[str, PendingFold] = {}
+
+def _record_fold_outcome(task: asyncio.Task) -> None:
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        increment("history_summaries_total", outcome="error")
+        print(f"Failed to summarize the conversation history: {task.exception()!r}")
+    else:
+        increment("history_summaries_total", outcome="success")
+
+def _start_fold(thread_id: str, summary: str, turns: List[List[BaseMessage]]) -> None:
+    task = asyncio.ensure_future(summarize_turns(summary, turns))
+    task.add_done_callback(_record_fold_outcome)
+    message_ids = [message.id for turn in turns for message in turn if message.id]
+    _pending_folds[thread_id] = PendingFold(summary, message_ids, len(turns), task, time.monotonic())
+
+def _expire_folds() -> None:
+    """Drops the folds started more than PENDING_FOLD_TTL seconds ago, cancelling those still running."""
+    now = time.monotonic()
+    for thread_id, pending in list(_pending_folds.items()):
+        if now - pending.started_at > PENDING_FOLD_TTL:
+            pending.task.cancel()
+            del _pending_folds[thread_id]
+            increment("history_summaries_total", outcome="expired")
+
+def _finished_fold(thread_id: str, summary: str, message_ids: set) -> Optional[PendingFold]:
+    """
+    Takes the finished fold of a thread, if it still applies to the history.
+
+    A failed fold, or one started from another summary or for messages no
+    longer in the history, is dropped; the turns are folded again later.
+    """
+    pending = _pending_folds.get(thread_id)
+    if pending is None or not pending.task.done():
+        return None
+    del _pending_folds[thread_id]
+    if pending.task.cancelled() or pending.task.exception() is not None:
+        return None
+    if pending.summary != summary or not set(pending.message_ids) <= message_ids:
+        return None
+    return pending
+
+# Node
+async def manage_history(state: AgentState, config: RunnableConfig):
+    """
+    Bounds the conversation history before the turn is routed.
+
+    Tool outputs of earlier turns larger than HISTORY_TOOL_OUTPUT_TOKENS are
+    replaced with stubs. Once there are more than HISTORY_MAX_TURNS earlier
+    turns, or they exceed HISTORY_TOKEN_BUDGET, the oldest are folded into the
+    rolling `summary`, keeping the last HISTORY_KEEP_TURNS verbatim (fewer if
+    over budget). The summary is written in the background so the turn is
+    not delayed; the folded turns are removed on the first turn after it is
+    done, and kept with the previous summary if it fails. Meanwhile the
+    supervisor only sees the turns that fit the budget (`trim_to_budget`).
+    Folds not applied within PENDING_FOLD_TTL seconds are dropped. The current
+    turn is never changed.
+    """
+    thread_id = config.get("configurable", {}).get("thread_id", "")
+    _expire_folds()
+    *previous, _current = split_turns(state["messages"])
+    summary = state.get("summary") or ""
+    updates: List[BaseMessage] = []
+
+    fold = _finished_fold(thread_id, summary, {message.id for turn in previous for message in turn})
+    if fold:
+        summary = fold.task.result()
+        folded = set(fold.message_ids)
+        updates += [RemoveMessage(id=message_id) for message_id in fold.message_ids]
+        previous = [turn for turn in previous if any(message.id not in folded for message in turn)]
+        increment("history_turns_folded_total", value=fold.turns)
+        print(f"\nFolded {fold.turns} turns into the conversation summary\n")
+
+    stubs = 0
+    for turn in previous:
+        for index, message in enumerate(turn):
+            if isinstance(message, ToolMessage) and message.id and message_tokens(message) > HISTORY_TOOL_OUTPUT_TOKENS:
+                turn[index] = stub_tool_output(message)
+                updates.append(turn[index])
+                stubs += 1
+    if stubs:
+        increment("history_tool_outputs_stubbed_total", value=stubs)
+
+    if thread_id not in _pending_folds:
+        count = len(previous) - HISTORY_KEEP_TURNS if len(previous) > HISTORY_MAX_TURNS else 0
+        tokens = estimate_tokens(summary) + sum(message_tokens(message) for turn in previous[count:] for message in turn)
+        while count < len(previous) and tokens > HISTORY_TOKEN_BUDGET:
+            tokens -= sum(message_tokens(message) for message in previous[count])
+            count += 1
+        if count:
+            _start_fold(thread_id, summary, previous[:count])
+
+    observe("history_tokens", estimate_tokens(summary) + sum(message_tokens(message) for turn in previous for message in turn))
+    if not updates:
+        return {}
+    return {"messages": updates, "summary": summary} if fold else {"messages": updates}
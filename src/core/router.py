@@ -0,0 +1,78 @@
+import uuid
+
+from typing import Optional
+from langchain_core.messages import AIMessage
+from src.agents.image_generation import generate_image
+from src.agents.link_scraping import scrape_link
+from src.agents.deep_search import deep_research_report
+from src.agents.code_execution import code_generation
+from src.agents.youtube_transcription import youtube_transcribe
+from src.utils.metrics import increment
+from src.utils.url_extraction import split_context_and_urls, youtube_video_id
+from .state import AgentState
+
+# Chainlit command ids from `src/ui/commands.py` -> tool that handles them
+COMMAND_TOOLS = {
+    "Picture": generate_image.name,
+    "Scrape": scrape_link.name,
+    "Search": deep_research_report.name,
+    # The Chat command is offered as a coding assistant (see its description)
+    "Chat": code_generation.name,
+    "YouTube": youtube_transcribe.name,
+}
+
+def route_message(content: str, command: Optional[str] = None) -> Optional[tuple]:
+    """
+    Picks a tool without calling the supervisor LLM.
+
+    Returns a `(tool_name, route)` tuple, where `route` is "command" or "rules",
+    or None when the input is ambiguous and the supervisor must decide.
+    """
+    if command in COMMAND_TOOLS:
+        return COMMAND_TOOLS[command], "command"
+
+    text = content.strip() if isinstance(content, str) else ""
+
+    # A message that is only a URL has a single sensible tool
+    context, urls = split_context_and_urls(text)
+    if not context and len(urls) == 1:
+        if youtube_video_id(urls[0]):
+            return youtube_transcribe.name, "rules"
+        return scrape_link.name, "rules"
+
+    return None
+
+# Node
+async def router_agent(state: AgentState):
+    """
+    Routes commands and unambiguous inputs straight to a tool.
+
+    Emits a synthetic tool call so the `tools` node runs the selected tool,
+    or leaves the state untouched so the supervisor LLM decides.
+    """
+    last_message = state["messages"][-1]
+    decision = route_message(last_message.content, state.get("command"))
+
+    if decision is None:
+        increment("router_decisions_total", route="supervisor")
+        return {}
+
+    tool_name, route = decision
+    increment("router_decisions_total", route=route, tool=tool_name)
+    increment("supervisor_llm_calls_saved_total")
+    print(f"\nRouted to {tool_name} by {route}\n")
+
+    tool_call = {
+        "name": tool_name,
+        "args": {"user_message": last_message.content},
+        "id": f"call_{uuid.uuid4().hex}",
+        "type": "tool_call",
+    }
+    return {"messages": [AIMessage(content="", tool_calls=[tool_call])]}
+
+def route_after_router(state: AgentState) -> str:
+    """Sends the turn to the tools when the router picked one, else to the supervisor."""
+    last_message = state["messages"][-1]
+    if isinstance(last_message, AIMessage) and last_message.tool_calls:
+        return "tools"
+    return "supervisor"
@@ -0,0 +1,12 @@
+from typing import Optional
+from langgraph.graph import MessagesState
+
+
+class AgentState(MessagesState):
+    """
+    Graph state: the conversation messages plus the Chainlit command of the turn.
+
+    `summary` is the rolling summary of the turns folded out of `messages`.
+    """
+    command: Optional[str]
+    summary: Optional[str]
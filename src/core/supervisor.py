@@ -1,31 +1,57 @@
-from langgraph.graph import MessagesState
-from src.utils.llm_setup import get_gemini_llm
+from langchain_core.messages import SystemMessage
+from src.utils.llm_setup import get_gemini_llm, model_registry, STREAM_TAG
+from src.utils.metrics import instrument_tool
 from src.agents.image_generation import generate_image
 from src.agents.link_scraping import scrape_link
 from src.agents.deep_search import deep_research_report
 from src.agents.conversational_ai import general_question_answer
 from src.agents.youtube_transcription import youtube_transcribe
 from src.agents.code_execution import code_generation
+from .history import trim_to_budget
+from .state import AgentState
 
 
+_agent_tools: list = []
+
 async def get_agent_tools() -> list:
-    return [
-        generate_image,
-        scrape_link,
-        deep_research_report,
-        code_generation,
-        general_question_answer,
-        youtube_transcribe
-    ]
+    """Returns the tools of the agent, instrumented once per process."""
+    if not _agent_tools:
+        tools = [
+            generate_image,
+            scrape_link,
+            deep_research_report,
+            code_generation,
+            general_question_answer,
+            youtube_transcribe
+        ]
+        # Record latency and errors of every tool call
+        _agent_tools.extend(instrument_tool(tool) for tool in tools)
+    return _agent_tools
 
 async def get_model_with_tools():
+    """
+    Returns the supervisor model with the agent tools bound.
+
+    Converting the tool docstrings to schemas is costly, so the bound model
+    is built once and rebuilt only when the model or the tools change.
+    """
     llm = await get_gemini_llm()
     # Tool binding
     tools = await get_agent_tools()
-    return llm.bind_tools(tools, parallel_tool_calls=False)
+    settings = (id(llm), [tool.name for tool in tools])
+    return model_registry.get(
+        ("supervisor",),
+        settings,
+        lambda: llm.bind_tools(tools, parallel_tool_calls=False).with_config(tags=[STREAM_TAG]),
+    )
 
 # Node
-async def supervisor_agent(state: MessagesState):
+async def supervisor_agent(state: AgentState):
    model_with_tools = await get_model_with_tools()
-   message = await model_with_tools.ainvoke(state["messages"])
+   # Earlier turns over the budget are left out, even while their summary is still being written
+   messages = trim_to_budget(state["messages"], state.get("summary") or "")
+   # Turns folded out of the history by `manage_history` are only in the summary
+   if state.get("summary"):
+       messages = [SystemMessage(content=f"Summary of the earlier conversation:\n{state['summary']}"), *messages]
+   message = await model_with_tools.ainvoke(messages)
    return {"messages": [message]}
\ No newline at end of file
@@ -0,0 +1,74 @@
+import hashlib
+import re
+import numpy as np
+
+from typing import List, Optional
+from urllib.parse import urlsplit
+from src.utils.config import NEAR_DUPLICATE_SIMILARITY
+from src.utils.page_cache import normalize_url
+
+FINGERPRINT_BITS = 64
+SHINGLE_WORDS = 3
+
+WORD = re.compile(r"\w+")
+BIT_POSITIONS = np.arange(FINGERPRINT_BITS, dtype=np.uint64)
+
+def canonical_url(url: str) -> str:
+    """
+    Canonical form of a URL used to spot the same page behind different links.
+
+    Builds on the page cache normalization and also ignores the scheme and a
+    leading `www.`, so http/https and www/bare-domain variants match.
+    """
+    parts = urlsplit(normalize_url(url))
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    return f"{host}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+def simhash(text: str) -> int:
+    """
+    64-bit SimHash of the word shingles of a text.
+
+    Texts that share most of their shingles get fingerprints that differ in
+    only a few bits, whatever their length.
+    """
+    words = WORD.findall(text.lower())
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(len(words) - SHINGLE_WORDS + 1, 1))}
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in shingles],
+        dtype=np.uint64,
+    )
+    # Each shingle votes +1/-1 per bit; the sign of the total gives the fingerprint bit
+    bits = (hashes[:, None] >> BIT_POSITIONS) & np.uint64(1)
+    votes = (2 * bits.astype(np.int64) - 1).sum(axis=0)
+    return int(sum(1 << i for i in range(FINGERPRINT_BITS) if votes[i] > 0))
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateIndex:
+    """
+    Groups pages whose content fingerprints are within a similarity threshold.
+
+    `similarity` is the share of equal fingerprint bits above which two pages
+    are considered the same content, e.g. 0.95 allows 3 differing bits.
+    """
+    def __init__(self, similarity: float = NEAR_DUPLICATE_SIMILARITY):
+        self.max_distance = int((1 - similarity) * FINGERPRINT_BITS)
+        self._fingerprints: List[int] = []
+
+    def add(self, text: str) -> Optional[int]:
+        """
+        Indexes a page and returns the group of the page it duplicates, if any.
+
+        New content opens a group, whose number is `len(index) - 1`.
+        """
+        fingerprint = simhash(text)
+        for group, existing in enumerate(self._fingerprints):
+            if hamming_distance(fingerprint, existing) <= self.max_distance:
+                return group
+        self._fingerprints.append(fingerprint)
+        return None
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
@@ -0,0 +1,215 @@
+import re
+import asyncio
+import multiprocessing
+import lxml.html
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+from lxml import etree
+from src.utils.config import EXTRACTION_WORKERS
+from src.utils.metrics import increment
+
+# Elements that never hold readable content
+NOISE_TAGS = [
+    "script", "style", "noscript", "iframe", "svg", "canvas", "form", "button", "input",
+    "select", "textarea", "template", "nav", "footer", "aside", "dialog",
+]
+# class/id values of page furniture around the main content
+BOILERPLATE = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|footer|sidebar|cookie|consent|banner|breadcrumbs?|share|sharing|social|"
+    r"comments?|advert|ads?|promo|newsletter|subscribe|related|popup|modal|masthead)($|[\s_-])",
+    re.IGNORECASE,
+)
+HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+BLOCKS = {"p", "div", "section", "article", "main", "blockquote", "table", "thead", "tbody", "tr", "dl", "dt", "dd", "figure", "figcaption", "header"}
+# Children that make an element a container of blocks rather than a paragraph
+STRUCTURAL = BLOCKS | set(HEADINGS) | {"ul", "ol", "li", "pre"}
+# Share of link text above which a list or block is treated as navigation
+MAX_LINK_DENSITY = 0.6
+MIN_MAIN_CHARS = 250
+
+WHITESPACE = re.compile(r"\s+")
+
+def _text_length(element) -> int:
+    return len(WHITESPACE.sub(" ", element.text_content()).strip())
+
+def _link_density(element) -> float:
+    total = _text_length(element)
+    if not total:
+        return 0.0
+    return sum(_text_length(link) for link in element.iter("a")) / total
+
+def _strip_boilerplate(root) -> None:
+    etree.strip_elements(root, etree.Comment, *NOISE_TAGS, with_tail=False)
+    page_length = _text_length(root)
+    for element in list(root.iter()):
+        if not isinstance(element.tag, str) or element.getparent() is None:
+            continue
+        marker = f"{element.get('class', '')} {element.get('id', '')}"
+        if element.get("role") in ("navigation", "banner", "contentinfo") or (
+            BOILERPLATE.search(marker)
+            and element.tag not in ("body", "main", "article")
+            # Wrappers such as <div class="page has-sidebar"> hold the article itself
+            and _text_length(element) < page_length / 2
+        ):
+            element.drop_tree()
+        elif element.tag in ("ul", "ol") and len(element) > 3 and _link_density(element) > MAX_LINK_DENSITY:
+            element.drop_tree()
+
+def _main_content(root):
+    """
+    Picks the element holding the main content of the page.
+
+    Uses <article>/<main> when they hold enough text, otherwise the parent
+    with the most paragraph text, which is where articles usually live.
+    """
+    for path in ("//article", "//main", "//*[@role='main']"):
+        candidates = [element for element in root.xpath(path) if _text_length(element) >= MIN_MAIN_CHARS]
+        if candidates:
+            return max(candidates, key=_text_length)
+
+    scores = {}
+    for paragraph in root.iter("p"):
+        parent = paragraph.getparent()
+        if parent is not None:
+            scores[parent] = scores.get(parent, 0) + _text_length(paragraph)
+    if scores:
+        best = max(scores, key=scores.get)
+        if scores[best] >= MIN_MAIN_CHARS:
+            return best
+    body = root.find("body")
+    return body if body is not None else root
+
+def _inline(element) -> str:
+    """Renders the text of an element, with links and code as markdown."""
+    parts = [element.text or ""]
+    for child in element:
+        if not isinstance(child.tag, str):
+            parts.append(child.tail or "")
+            continue
+        raw = _inline(child)
+        text = WHITESPACE.sub(" ", raw).strip()
+        # Keep the spacing around the element, without adding any before punctuation
+        before = " " if raw[:1].isspace() or child.tag in BLOCKS else ""
+        after = " " if raw[-1:].isspace() or child.tag in BLOCKS else ""
+        if child.tag == "a" and text and (child.get("href") or "").startswith("http"):
+            parts.append(f"{before}[{text}]({child.get('href')}){after}")
+        elif child.tag == "code" and text:
+            parts.append(f"{before}`{text}`{after}")
+        elif child.tag in ("strong", "b") and text:
+            parts.append(f"{before}**{text}**{after}")
+        elif child.tag == "br":
+            parts.append("\n")
+        else:
+            parts.append(f"{before}{text}{after}")
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+def _render(element, blocks: List[str], depth: int = 0) -> None:
+    """Appends the markdown blocks of an element: headings, lists, code and paragraphs."""
+    tag = element.tag if isinstance(element.tag, str) else ""
+    if tag in HEADINGS:
+        text = WHITESPACE.sub(" ", _inline(element)).strip()
+        if text:
+            blocks.append(f"{'#' * HEADINGS[tag]} {text}")
+        return
+    if tag in ("ul", "ol"):
+        for index, item in enumerate(element.iterchildren("li"), start=1):
+            bullet = f"{index}." if tag == "ol" else "-"
+            nested = [child for child in item if child.tag in ("ul", "ol")]
+            for child in nested:
+                item.remove(child)
+            text = WHITESPACE.sub(" ", _inline(item)).strip()
+            if text:
+                blocks.append(f"{'  ' * depth}{bullet} {text}")
+            for child in nested:
+                _render(child, blocks, depth + 1)
+        return
+    if tag == "pre":
+        blocks.append(f"```\n{element.text_content().strip()}\n```")
+        return
+    if tag == "tr":
+        cells = [WHITESPACE.sub(" ", _inline(cell)).strip() for cell in element.iterchildren("td", "th")]
+        if any(cells):
+            blocks.append(f"| {' | '.join(cells)} |")
+        return
+
+    if not any(child.tag in STRUCTURAL for child in element if isinstance(child.tag, str)):
+        # Only inline content, e.g. a paragraph: render it as one block
+        text = WHITESPACE.sub(" ", _inline(element)).strip()
+        if text:
+            blocks.append(text)
+        return
+
+    if element.text and element.text.strip():
+        blocks.append(WHITESPACE.sub(" ", element.text).strip())
+    for child in element:
+        if isinstance(child.tag, str):
+            _render(child, blocks, depth)
+        if child.tail and child.tail.strip():
+            blocks.append(WHITESPACE.sub(" ", child.tail).strip())
+
+def extract_main_content(html: bytes, encoding: Optional[str] = None, url: Optional[str] = None) -> str:
+    """
+    Extracts the main content of an HTML page as markdown.
+
+    Scripts, styles, menus, footers, sidebars and link lists are stripped;
+    headings, lists, links, code blocks and tables are kept as markdown.
+    Links are made absolute when the page URL is given.
+    """
+    if not html.strip():
+        return ""
+    parser = lxml.html.HTMLParser(encoding=encoding, remove_comments=True)
+    root = lxml.html.document_fromstring(html, parser=parser)
+    if url:
+        root.make_links_absolute(url, handle_failures="discard")
+
+    _strip_boilerplate(root)
+    blocks: List[str] = []
+    _render(_main_content(root), blocks)
+    return "\n\n".join(blocks)
+
+
+# Forking the server process would copy its threads, locks and open sockets into
+# the workers; they are started from a clean interpreter instead
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_extraction_pool() -> Optional[ProcessPoolExecutor]:
+    """Returns the shared worker processes of HTML extraction, started on first use, or None to use a thread."""
+    global _pool
+    if EXTRACTION_WORKERS <= 0:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context(START_METHOD),
+        )
+    return _pool
+
+def close_extraction_pool() -> None:
+    """Stops the HTML extraction worker processes."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+async def aextract_main_content(html: bytes, encoding: Optional[str] = None, url: Optional[str] = None) -> str:
+    """
+    Runs `extract_main_content` off the event loop.
+
+    Parsing is CPU-bound, so it runs in the worker process pool; with
+    `EXTRACTION_WORKERS=0` it runs in a thread instead.
+    """
+    pool = get_extraction_pool()
+    if pool is None:
+        return await asyncio.to_thread(extract_main_content, html, encoding, url)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, extract_main_content, html, encoding, url)
+    except BrokenProcessPool:
+        # A crashed worker breaks the whole pool; start a new one for the next pages
+        increment("stage_errors_total", stage="html_extraction", reason="BrokenProcessPool")
+        close_extraction_pool()
+        raise
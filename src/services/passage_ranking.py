@@ -0,0 +1,94 @@
+import re
+import asyncio
+import numpy as np
+
+from typing import List
+from sklearn.feature_extraction.text import TfidfVectorizer
+from src.utils.config import PASSAGE_TOKEN_BUDGET, PASSAGE_WORDS
+from src.utils.metrics import increment
+
+# Rough size of a token for English prose, used to budget prompts without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Sentence ends, and line breaks between markdown blocks such as headings and list items
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of LLM tokens of a text."""
+    return len(text) // CHARS_PER_TOKEN
+
+def split_passages(text: str, max_words: int = PASSAGE_WORDS) -> List[str]:
+    """
+    Splits text into passages of whole sentences or lines of at most `max_words` words.
+
+    Sentences longer than `max_words`, such as navigation menus without
+    punctuation, are cut into `max_words` chunks.
+    """
+    passages, current, size = [], [], 0
+    for sentence in SENTENCE_END.split(text):
+        words = sentence.split()
+        while len(words) > max_words:
+            passages.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        if size + len(words) > max_words and current:
+            passages.append(" ".join(current))
+            current, size = [], 0
+        current.extend(words)
+        size += len(words)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+def rank_passages(passages: List[str], query: str) -> List[float]:
+    """
+    Scores passages by TF-IDF cosine similarity with the query.
+
+    Without a query, passages are scored against the page centroid, which
+    favours the main content over boilerplate such as menus and footers.
+    """
+    vectorizer = TfidfVectorizer(sublinear_tf=True, strip_accents="unicode")
+    try:
+        matrix = vectorizer.fit_transform(passages)
+    except ValueError:
+        # Passages without any word, e.g. only symbols
+        return [0.0] * len(passages)
+
+    if query.strip():
+        target = vectorizer.transform([query]).toarray()
+    else:
+        target = np.asarray(matrix.mean(axis=0))
+    # Rows are L2-normalized, so the dot product is the cosine similarity
+    return (matrix @ target.ravel()).tolist()
+
+def select_passages(text: str, query: str = "", max_tokens: int = PASSAGE_TOKEN_BUDGET) -> str:
+    """
+    Keeps the passages of a page most relevant to the query, within a token budget.
+
+    Passages are packed by descending score and returned in page order.
+    Texts that already fit the budget are returned unchanged.
+    """
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+
+    passages = split_passages(text)
+    scores = rank_passages(passages, query)
+    # Ties (e.g. no query term on the page) keep page order, like plain truncation
+    order = sorted(range(len(passages)), key=lambda i: (-scores[i], i))
+
+    selected, used = [], 0
+    for index in order:
+        cost = estimate_tokens(passages[index]) + 1
+        if used + cost > max_tokens:
+            continue
+        selected.append(index)
+        used += cost
+
+    result = "\n\n".join(passages[i] for i in sorted(selected))
+    increment("passage_tokens_total", tokens, kind="input")
+    increment("passage_tokens_total", estimate_tokens(result), kind="selected")
+    return result
+
+async def aselect_passages(text: str, query: str = "", max_tokens: int = PASSAGE_TOKEN_BUDGET) -> str:
+    """Runs `select_passages` in a worker thread so ranking does not block the event loop."""
+    return await asyncio.to_thread(select_passages, text, query, max_tokens)
@@ -5,7 +5,9 @@ import markdown
 
 from weasyprint import HTML
 from src.utils.config import EXTRACTED_DATA
+from src.utils.metrics import timed, increment
 
+@timed("stage", stage="content_as_pdf")
 async def content_as_pdf(content: str):
     """Generates a PDF from the provided markdown content."""
     # output_dir = Path("extracted_data")
@@ -13,6 +15,8 @@ async def content_as_pdf(content: str):
 
     pdf_bytes = await cl.make_async(_generate_pdf_bytes)(markdown_content=content)
 
+    increment("bytes_transferred_total", len(pdf_bytes), stage="content_as_pdf")
+
     pdf_file_path = EXTRACTED_DATA / 'research_report.pdf'
 
     async with aiofiles.open(pdf_file_path, mode="wb") as f:
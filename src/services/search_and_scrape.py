@@ -1,38 +1,157 @@
 import aiohttp
-import chainlit as cl
 
-from src.utils.config import TAVILY_KEY
-from ddgs import DDGS
-from langchain_community.utilities.tavily_search import TavilySearchAPIWrapper
-from bs4 import BeautifulSoup
+from typing import Optional
+from src.utils.config import (
+  SEARCH_RESULTS_PER_QUERY,
+  SCRAPE_MAX_CONNECTIONS,
+  SCRAPE_MAX_PER_HOST,
+  SCRAPE_DNS_CACHE_TTL,
+  SCRAPE_CONNECT_TIMEOUT,
+  SCRAPE_READ_TIMEOUT,
+  SCRAPE_TOTAL_TIMEOUT,
+  SCRAPE_MAX_BYTES,
+)
+from src.utils.singleflight import SingleFlight
+from src.utils.metrics import timed, increment
+from src.utils.page_cache import get_page_cache, hit_ratio
+from src.services.html_extraction import aextract_main_content
+from src.services.search_backends import DuckDuckGoSearchBackend, TavilySearchBackend, get_search
 
-RESULTS_PER_QUESTION = 1
+RESULTS_PER_QUESTION = SEARCH_RESULTS_PER_QUERY
 
-tavily_search = TavilySearchAPIWrapper(tavily_api_key=TAVILY_KEY)
+# Start of the message returned instead of the page text when scraping fails
+SCRAPE_FAILED_PREFIX = "Failed to scrape the webpage"
 
+tavily_search = TavilySearchBackend()
+duckduckgo_search = DuckDuckGoSearchBackend()
+
+# Concurrent identical scrapes and searches share one request
+scrape_flight = SingleFlight("scrape_link_async")
+tavily_flight = SingleFlight("web_search_with_tavily")
+search_flight = SingleFlight("web_search_fanout")
+
+# Content types worth extracting text from; anything else (PDFs, images, archives) is skipped
+TEXT_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+CHUNK_SIZE = 64 * 1024
+
+_session: Optional[aiohttp.ClientSession] = None
+
+def get_scrape_session() -> aiohttp.ClientSession:
+  """
+  Returns the process-wide HTTP session used for scraping.
+
+  The session keeps a connection pool with a per-host limit and a DNS cache,
+  and applies connect and read timeouts to every request.
+  """
+  global _session
+  if _session is None or _session.closed:
+    connector = aiohttp.TCPConnector(
+      limit=SCRAPE_MAX_CONNECTIONS,
+      limit_per_host=SCRAPE_MAX_PER_HOST,
+      ttl_dns_cache=SCRAPE_DNS_CACHE_TTL,
+    )
+    timeout = aiohttp.ClientTimeout(
+      total=SCRAPE_TOTAL_TIMEOUT,
+      sock_connect=SCRAPE_CONNECT_TIMEOUT,
+      sock_read=SCRAPE_READ_TIMEOUT,
+    )
+    _session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+  return _session
+
+async def close_scrape_session() -> None:
+  """Closes the shared scraping session and its pooled connections."""
+  global _session
+  if _session is not None:
+    await _session.close()
+    _session = None
+
+async def read_limited(response: aiohttp.ClientResponse, max_bytes: int = SCRAPE_MAX_BYTES) -> bytes:
+  """
+  Reads a response body until `max_bytes`, then stops downloading the rest.
+  """
+  body = bytearray()
+  async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+    body.extend(chunk)
+    if len(body) >= max_bytes:
+      increment("scrape_truncated_total")
+      break
+  return bytes(body[:max_bytes])
+
+@timed("stage", stage="scrape_link_async")
 async def scrape_link_async(url):
   """
   Asynchronously scrape a webpage and extract its text content.
+
+  Concurrent calls for the same URL share a single request, and pages are
+  served from the page cache while fresh.
+  """
+  return await scrape_flight.do(url, lambda: _scrape_link(url))
+
+async def _scrape_link(url):
   """
+  Fetches a webpage and extracts its text content.
+
+  Fresh cached pages skip the network; stale ones are revalidated with a
+  conditional GET and reused on 304 Not Modified or when the fetch fails.
+  """
+  cache = get_page_cache()
+  cached = await cache.aget(url) if cache else None
+  if cached and cached.fresh:
+    increment("page_cache_requests_total", result="hit")
+    print(f"\nPage cache hit for {url} (hit ratio {hit_ratio():.0%})\n")
+    return cached.text
+
+  headers = cached.conditional_headers() if cached else {}
   try:
-    async with aiohttp.ClientSession() as session:
-      async with session.get(url) as response:
-        if response.status == 200:
-          # Parse the content of the page using BeautifulSoup
-          html = await response.text()
-          soup = BeautifulSoup(html, 'html.parser')
-            
-          # Extract all text from the webpage
-          text = soup.get_text(separator=' ', strip=True)
-          if text:
-            print("\nText extracted successfuly!\n")
-
-          return text
-        else:
-          return f"Failed to scrape the webpage. Status code: {response.status}"
+    async with get_scrape_session().get(url, headers=headers) as response:
+      if response.status == 304 and cached:
+        increment("page_cache_requests_total", result="revalidated")
+        await cache.arefresh(url)
+        return cached.text
+
+      if response.status != 200:
+        increment("stage_errors_total", stage="scrape_link_async", reason=f"status_{response.status}")
+        _count_cache_error(cache, cached)
+        if cached:
+          # A failing origin degrades like a network error: the stale page is better than none
+          increment("page_cache_requests_total", result="stale_served")
+          return cached.text
+        return f"{SCRAPE_FAILED_PREFIX}. Status code: {response.status}"
+
+      # Binary responses are skipped before downloading their body
+      if response.content_type not in TEXT_CONTENT_TYPES:
+        increment("stage_errors_total", stage="scrape_link_async", reason="content_type")
+        _count_cache_error(cache, cached)
+        return f"{SCRAPE_FAILED_PREFIX}. Unsupported content type: {response.content_type}"
+
+      body = await read_limited(response)
+      increment("bytes_transferred_total", len(body), stage="scrape_link_async")
+
+    # Extract the main content of the page as markdown, off the event loop
+    text = await aextract_main_content(body, response.charset, url)
+    if text:
+      print("\nText extracted successfuly!\n")
+
+    if cache:
+      increment("page_cache_requests_total", result="stale" if cached else "miss")
+      if text:
+        await cache.aput(url, text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+    return text
   except Exception as e:
     print(f"An error occurred while I scrape the webpage: {e}")
-    return f"Failed to scrape the webpage. Error: {e}"
+    increment("stage_errors_total", stage="scrape_link_async", reason=type(e).__name__)
+    _count_cache_error(cache, cached)
+    if cached:
+      # A stale page is better than no page when the site is down
+      increment("page_cache_requests_total", result="stale_served")
+      return cached.text
+    return f"{SCRAPE_FAILED_PREFIX}. Error: {e}"
+
+def _count_cache_error(cache, cached) -> None:
+  """Counts a cache lookup whose fetch failed apart from the completed ones, so it does not skew the hit ratio."""
+  if cache:
+    increment("page_cache_fetch_errors_total", lookup="stale" if cached else "miss")
 
 def flatten_list_of_list(list_of_list):
   """
@@ -43,30 +162,52 @@ def flatten_list_of_list(list_of_list):
     content.append("\n\n".join(sublist))
   return "\n\n".join(content)
 
+@timed("stage", stage="web_search")
 async def web_search(query: str, num_results: int = RESULTS_PER_QUESTION):
   """
   Search the web using DuckDuckGo and return a list of URLs.
   """
   try:
-    results = await cl.make_async(DDGS().text)(keywords=query, max_results=num_results)
-    # print(f"\nresult is a list of dicts: \n{results}\n")
-    urls = [r["href"] for r in results]
+    urls = await duckduckgo_search.search(query, num_results)
     print(f"\nURLs found from ddgs: {urls}\n")
     return urls
   except Exception as e:
     print(f"An error occurred while I searched the query: {e}")
     return []
 
+@timed("stage", stage="web_search_with_tavily")
 async def web_search_with_tavily(query: str, num_results: int = RESULTS_PER_QUESTION):
   """
   Asynchronously search the web using Tavily and return a list of URLs.
+
+  Concurrent calls for the same query share a single request.
+  """
+  return await tavily_flight.do((query, num_results), lambda: _search_with_tavily(query, num_results))
+
+async def _search_with_tavily(query: str, num_results: int):
+  """
+  Searches the web using Tavily and returns a list of URLs.
   """
   try:
-    result = await tavily_search.results_async(query=query, max_results=num_results)
-    # print(f"\nresult is a list of dicts: \n{result}\n")
-    urls = [item["url"] for item in result if "url" in item]
+    urls = await tavily_search.search(query, num_results)
     print(f"\nURLs found from tavily: {urls}\n")
     return urls
   except Exception as e:
     print(f"An error occurred while I searched the query: {e}")
-    return []
\ No newline at end of file
+    return []
+
+@timed("stage", stage="web_search_fanout")
+async def web_search_fanout(query: str, num_results: int = RESULTS_PER_QUESTION):
+  """
+  Searches every backend in SEARCH_BACKENDS at once and returns the first unique URLs.
+
+  Failed or slow backends fall back to the others, results are cached per
+  query, and concurrent calls for the same query share a single search.
+  """
+  try:
+    urls = await search_flight.do((query, num_results), lambda: get_search().search(query, num_results))
+    print(f"\nURLs found: {urls}\n")
+    return urls
+  except Exception as e:
+    print(f"An error occurred while I searched the query: {e}")
+    return []
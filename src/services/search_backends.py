@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from ddgs import DDGS
+from langchain_community.utilities.tavily_search import TavilySearchAPIWrapper
+from src.utils.config import (
+    TAVILY_KEY,
+    SEARCH_BACKENDS,
+    SEARCH_BACKEND_TIMEOUT,
+    SEARCH_CACHE_TTL,
+    SEARCH_CACHE_ENTRIES,
+)
+from src.utils.metrics import increment, observe
+from src.services.deduplication import canonical_url
+
+
+class SearchBackend(ABC):
+    """A web search provider that returns the result URLs of a query."""
+    name = "backend"
+
+    @abstractmethod
+    async def search(self, query: str, num_results: int) -> List[str]:
+        """Returns up to `num_results` URLs; errors are raised so the caller can fall back."""
+
+
+class TavilySearchBackend(SearchBackend):
+    name = "tavily"
+
+    def __init__(self, api_key: str = TAVILY_KEY):
+        self._client = TavilySearchAPIWrapper(tavily_api_key=api_key)
+
+    async def search(self, query: str, num_results: int) -> List[str]:
+        result = await self._client.results_async(query=query, max_results=num_results)
+        return [item["url"] for item in result if "url" in item]
+
+
+class DuckDuckGoSearchBackend(SearchBackend):
+    name = "duckduckgo"
+
+    async def search(self, query: str, num_results: int) -> List[str]:
+        results = await asyncio.to_thread(DDGS().text, query, max_results=num_results)
+        return [item["href"] for item in results if "href" in item]
+
+
+class SearchResultCache:
+    """In-memory LRU of query results that expire after `ttl` seconds."""
+    def __init__(self, ttl: float, max_entries: int, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, List[str]]]" = OrderedDict()
+
+    @staticmethod
+    def _key(query: str, num_results: int) -> Tuple[str, int]:
+        return " ".join(query.lower().split()), num_results
+
+    def get(self, query: str, num_results: int) -> Optional[List[str]]:
+        key = self._key(query, num_results)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self._clock():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return list(entry[1])
+
+    def put(self, query: str, num_results: int, urls: List[str]) -> None:
+        key = self._key(query, num_results)
+        self._entries[key] = (self._clock() + self.ttl, list(urls))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class FanoutSearch:
+    """
+    Queries several search backends at once and keeps the first unique URLs.
+
+    Returns as soon as `num_results` distinct pages are found and cancels the
+    backends still running. A backend that fails or exceeds `timeout` is
+    skipped, so the others act as its fallback. Results are cached by query.
+    """
+    def __init__(
+        self,
+        backends: Sequence[SearchBackend],
+        cache: Optional[SearchResultCache] = None,
+        timeout: float = SEARCH_BACKEND_TIMEOUT,
+    ):
+        self.backends = list(backends)
+        self.cache = cache
+        self.timeout = timeout
+
+    async def _search_backend(self, backend: SearchBackend, query: str, num_results: int) -> List[str]:
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            urls = await asyncio.wait_for(backend.search(query, num_results), timeout=self.timeout)
+            outcome = "ok"
+            return urls
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        except asyncio.CancelledError:
+            # Another backend already found enough results
+            outcome = "cancelled"
+            raise
+        finally:
+            increment("search_backend_requests_total", backend=backend.name, outcome=outcome)
+            observe("search_backend_latency_seconds", time.perf_counter() - start, backend=backend.name)
+
+    async def search(self, query: str, num_results: int) -> List[str]:
+        if self.cache:
+            cached = self.cache.get(query, num_results)
+            if cached is not None:
+                increment("search_cache_requests_total", result="hit")
+                return cached
+            increment("search_cache_requests_total", result="miss")
+
+        tasks = {
+            asyncio.ensure_future(self._search_backend(backend, query, num_results)): backend
+            for backend in self.backends
+        }
+        urls: Dict[str, str] = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    found = await next_done
+                except Exception as e:
+                    print(f"Search backend failed for '{query}': {e!r}")
+                    continue
+                for url in found:
+                    urls.setdefault(canonical_url(url), url)
+                if len(urls) >= num_results:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        results = list(urls.values())[:num_results]
+        # Empty results are not cached, so the next call retries the backends
+        if self.cache and results:
+            self.cache.put(query, num_results, results)
+        return results
+
+
+# Backends that can be enabled with SEARCH_BACKENDS, by name
+SEARCH_BACKEND_FACTORIES: Dict[str, Callable[[], SearchBackend]] = {
+    "tavily": TavilySearchBackend,
+    "duckduckgo": DuckDuckGoSearchBackend,
+}
+
+def register_search_backend(name: str, factory: Callable[[], SearchBackend]) -> None:
+    """Makes a search backend available under `name` in SEARCH_BACKENDS."""
+    global _search
+    SEARCH_BACKEND_FACTORIES[name] = factory
+    _search = None
+
+_search: Optional[FanoutSearch] = None
+
+def get_search() -> FanoutSearch:
+    """Returns the shared fan-out search over the backends listed in SEARCH_BACKENDS."""
+    global _search
+    if _search is None:
+        unknown = [name for name in SEARCH_BACKENDS if name not in SEARCH_BACKEND_FACTORIES]
+        if unknown:
+            raise ValueError(f"Unknown search backends in SEARCH_BACKENDS: {', '.join(unknown)}")
+        cache = SearchResultCache(SEARCH_CACHE_TTL, SEARCH_CACHE_ENTRIES) if SEARCH_CACHE_TTL > 0 else None
+        _search = FanoutSearch([SEARCH_BACKEND_FACTORIES[name]() for name in SEARCH_BACKENDS], cache)
+    return _search
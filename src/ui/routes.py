@@ -0,0 +1,44 @@
+import hmac
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Response
+from fastapi.routing import APIRoute
+from typing import Optional
+from src.core.graph_builder import check_graph_health
+from src.utils.config import MONITORING_TOKEN
+from src.utils.metrics import render_prometheus
+
+async def require_monitoring_token(authorization: Optional[str] = Header(default=None)) -> None:
+    """Only lets through requests with `Authorization: Bearer <MONITORING_TOKEN>`."""
+    expected = f"Bearer {MONITORING_TOKEN}"
+    if not authorization or not hmac.compare_digest(authorization.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+async def metrics_endpoint() -> Response:
+    """Exposes the in-process metrics in the Prometheus text format."""
+    return Response(content=render_prometheus(), media_type="text/plain; version=0.0.4")
+
+async def graph_health_endpoint() -> Response:
+    """Reports whether the agent graph checkpointer can reach its database."""
+    healthy = await check_graph_health()
+    return Response(content="ok" if healthy else "unavailable", status_code=200 if healthy else 503)
+
+def register_routes(app: FastAPI) -> None:
+    """
+    Adds the monitoring routes to the Chainlit server.
+
+    Chainlit serves its frontend from a catch-all route, so the routes are
+    inserted ahead of it rather than appended. They are served on the public
+    server, so they are only added when MONITORING_TOKEN is set, and require
+    it as a bearer token.
+    """
+    if not MONITORING_TOKEN:
+        print("MONITORING_TOKEN is not set, /metrics and /health/graph are disabled")
+        return
+
+    dependencies = [Depends(require_monitoring_token)]
+    routes = [
+        APIRoute("/metrics", metrics_endpoint, methods=["GET"], dependencies=dependencies),
+        APIRoute("/health/graph", graph_health_endpoint, methods=["GET"], dependencies=dependencies),
+    ]
+    for route in reversed(routes):
+        app.router.routes.insert(0, route)
@@ -18,10 +18,48 @@ OPENROUTER_MODEL = os.environ["OPENROUTER_MODEL_NAME"]
 OPENROUTER_CODER = os.environ["OPENROUTER_CODER"]
 OPENROUTER_URL = os.environ["OPENROUTER_BASE_URL"]
 
+# Timeout, in seconds, of direct Gemini calls such as YouTube transcription and URL context
+GEMINI_REQUEST_TIMEOUT = float(os.getenv("GEMINI_REQUEST_TIMEOUT", "300"))
+
+# Hedged requests: send a backup request to the other provider when the primary is slow
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "10"))
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))
+
+# Extra comma-separated API keys added to the key pools, on top of the two keys above
+GEMINI_EXTRA_KEYS = [key.strip() for key in os.getenv("GEMINI_API_KEYS", "").split(",") if key.strip()]
+OPENROUTER_EXTRA_KEYS = [key.strip() for key in os.getenv("OPENROUTER_API_KEYS", "").split(",") if key.strip()]
+# Cooldown of a key after a 429/5xx, doubled on each consecutive failure
+KEY_COOLDOWN_SECONDS = float(os.getenv("KEY_COOLDOWN_SECONDS", "5"))
+KEY_MAX_COOLDOWN_SECONDS = float(os.getenv("KEY_MAX_COOLDOWN_SECONDS", "300"))
+
 PROMPT_CODER = os.environ["PROMPT_FILE_PATH"]
 
+# Rate limits, applied separately to each provider / API key / model
+GEMINI_REQUESTS_PER_SECOND = float(os.getenv("GEMINI_REQUESTS_PER_SECOND", "0.1"))
+GEMINI_MAX_BURST = int(os.getenv("GEMINI_MAX_BURST", "10"))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "0")) or None
+OPENROUTER_REQUESTS_PER_SECOND = float(os.getenv("OPENROUTER_REQUESTS_PER_SECOND", "0.1"))
+OPENROUTER_MAX_BURST = int(os.getenv("OPENROUTER_MAX_BURST", "10"))
+OPENROUTER_TOKENS_PER_MINUTE = int(os.getenv("OPENROUTER_TOKENS_PER_MINUTE", "0")) or None
+
 DATABASE_URL = os.environ["DATABASE_LOCAL_URL"]
 MEMORY_DATABASE = os.environ["MEMORY_DATABASE"]
+MEMORY_POOL_MIN_SIZE = int(os.getenv("MEMORY_POOL_MIN_SIZE", "1"))
+MEMORY_POOL_MAX_SIZE = int(os.getenv("MEMORY_POOL_MAX_SIZE", "10"))
+MEMORY_POOL_TIMEOUT = float(os.getenv("MEMORY_POOL_TIMEOUT", "30"))
+
+# Conversation history sent to the supervisor: previous turns kept verbatim, number of previous turns
+# that triggers folding the older ones into a rolling summary, token budget of the history and summary,
+# and size (tokens) above which old tool outputs are replaced with a short stub
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "12"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "8000"))
+HISTORY_TOOL_OUTPUT_TOKENS = int(os.getenv("HISTORY_TOOL_OUTPUT_TOKENS", "500"))
+HISTORY_SUMMARY_WORDS = int(os.getenv("HISTORY_SUMMARY_WORDS", "300"))
 
 AZURE_CONTAINER_NAME = os.environ["CONTAINER_NAME"]
 AZURE_STORAGE_ACCOUNT_NAME = os.environ["STORAGE_ACCOUNT_NAME"]
@@ -29,6 +67,67 @@ AZURE_STORAGE_KEY = os.environ["STORAGE_KEY"]
 
 TAVILY_KEY = os.environ["TAVILY_API_KEY"]
 
+# Shared scraping HTTP client: connection pool, timeouts (seconds) and body size cap (bytes)
+SCRAPE_MAX_CONNECTIONS = int(os.getenv("SCRAPE_MAX_CONNECTIONS", "50"))
+SCRAPE_MAX_PER_HOST = int(os.getenv("SCRAPE_MAX_PER_HOST", "4"))
+SCRAPE_DNS_CACHE_TTL = int(os.getenv("SCRAPE_DNS_CACHE_TTL", "300"))
+SCRAPE_CONNECT_TIMEOUT = float(os.getenv("SCRAPE_CONNECT_TIMEOUT", "5"))
+SCRAPE_READ_TIMEOUT = float(os.getenv("SCRAPE_READ_TIMEOUT", "10"))
+SCRAPE_TOTAL_TIMEOUT = float(os.getenv("SCRAPE_TOTAL_TIMEOUT", "20"))
+SCRAPE_MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", "2000000"))
+
+# On-disk cache of scraped page text: lifetime before revalidation (seconds) and compressed size cap (bytes)
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "86400"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Pages are cut to their most relevant passages before summarization: prompt budget (tokens) and passage size (words)
+PASSAGE_TOKEN_BUDGET = int(os.getenv("PASSAGE_TOKEN_BUDGET", "1500"))
+PASSAGE_WORDS = int(os.getenv("PASSAGE_WORDS", "80"))
+
+# Scraped pages whose content fingerprints are at least this similar (0-1) are summarized once
+NEAR_DUPLICATE_SIMILARITY = float(os.getenv("NEAR_DUPLICATE_SIMILARITY", "0.95"))
+
+# Worker processes that convert scraped HTML to markdown; 0 runs the conversion in a thread
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+
+# Web search: comma-separated backends queried in parallel, URLs kept per query, per-backend timeout and result cache
+SEARCH_BACKENDS = [name.strip() for name in os.getenv("SEARCH_BACKENDS", "tavily,duckduckgo").split(",") if name.strip()]
+SEARCH_RESULTS_PER_QUERY = int(os.getenv("SEARCH_RESULTS_PER_QUERY", "2"))
+SEARCH_BACKEND_TIMEOUT = float(os.getenv("SEARCH_BACKEND_TIMEOUT", "10"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+SEARCH_CACHE_ENTRIES = int(os.getenv("SEARCH_CACHE_ENTRIES", "1024"))
+
+# Pages summarized per LLM request in deep research (1 disables batching), prompt budget (tokens)
+# and how long (seconds) a page waits for others to fill its batch
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "4"))
+SUMMARY_BATCH_TOKENS = int(os.getenv("SUMMARY_BATCH_TOKENS", "8000"))
+SUMMARY_BATCH_WAIT = float(os.getenv("SUMMARY_BATCH_WAIT", "3"))
+
+# Research memory: summaries and search results of earlier deep research in a thread, reused by
+# follow-up research for RESEARCH_MEMORY_TTL seconds. Earlier summaries with a TF-IDF similarity to the
+# new question of at least RESEARCH_MEMORY_MIN_SCORE are added to the report, up to RESEARCH_MEMORY_MAX_REUSED
+RESEARCH_MEMORY_ENABLED = os.getenv("RESEARCH_MEMORY_ENABLED", "true").lower() == "true"
+RESEARCH_MEMORY_TTL = float(os.getenv("RESEARCH_MEMORY_TTL", str(7 * 86400)))
+RESEARCH_MEMORY_MIN_SCORE = float(os.getenv("RESEARCH_MEMORY_MIN_SCORE", "0.1"))
+RESEARCH_MEMORY_MAX_REUSED = int(os.getenv("RESEARCH_MEMORY_MAX_REUSED", "8"))
+
+# Deep research pipeline: overall deadline, per-stage timeouts and concurrency
+DEEP_RESEARCH_DEADLINE = float(os.getenv("DEEP_RESEARCH_DEADLINE", "120"))
+RESEARCH_QUERY_TIMEOUT = float(os.getenv("RESEARCH_QUERY_TIMEOUT", "30"))
+RESEARCH_SEARCH_TIMEOUT = float(os.getenv("RESEARCH_SEARCH_TIMEOUT", "15"))
+RESEARCH_SCRAPE_TIMEOUT = float(os.getenv("RESEARCH_SCRAPE_TIMEOUT", "20"))
+RESEARCH_SUMMARY_TIMEOUT = float(os.getenv("RESEARCH_SUMMARY_TIMEOUT", "60"))
+RESEARCH_SEARCH_CONCURRENCY = int(os.getenv("RESEARCH_SEARCH_CONCURRENCY", "3"))
+RESEARCH_SCRAPE_CONCURRENCY = int(os.getenv("RESEARCH_SCRAPE_CONCURRENCY", "5"))
+RESEARCH_SUMMARY_CONCURRENCY = int(os.getenv("RESEARCH_SUMMARY_CONCURRENCY", "3"))
+
+# Bearer token required by /metrics and /health/graph; the routes are disabled when empty
+MONITORING_TOKEN = os.getenv("MONITORING_TOKEN", "")
+
+# Stream LLM tokens to the chat message as they are generated
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() == "true"
+
 ELEVENLABS_KEY = os.environ["ELEVENLABS_API_KEY"]
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -37,6 +136,20 @@ DATA_DIR = BASE_DIR / 'data'
 EXTRACTED_DATA = DATA_DIR / 'extracted_data'
 GENERATED_IMAGES = DATA_DIR / 'generated_images'
 GENERATED_VIDEOS = DATA_DIR / 'generated_videos'
+CACHE_DIR = DATA_DIR / 'cache'
+
+# LLM response cache: in-memory LRU in front of a size-bounded SQLite file
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+# TTL in seconds per tool namespace; 0 disables caching for that namespace
+LLM_CACHE_TTLS = {
+    "conversation": float(os.getenv("LLM_CACHE_TTL_CONVERSATION", "86400")),
+    "code": float(os.getenv("LLM_CACHE_TTL_CODE", "86400")),
+    "research_queries": float(os.getenv("LLM_CACHE_TTL_RESEARCH_QUERIES", "21600")),
+    "page_summary": float(os.getenv("LLM_CACHE_TTL_PAGE_SUMMARY", "86400")),
+    "research_report": float(os.getenv("LLM_CACHE_TTL_RESEARCH_REPORT", "21600")),
+}
 
 # Usage in services:
 # from utils.config import GENERATED_IMAGES
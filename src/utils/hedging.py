@@ -0,0 +1,111 @@
+import asyncio
+import math
+import time
+
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional
+from langchain_core.runnables import Runnable, RunnableConfig
+from .config import (
+    HEDGING_ENABLED,
+    HEDGE_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_DEFAULT_DELAY,
+    HEDGE_MAX_RATIO,
+    HEDGE_WINDOW,
+)
+from .metrics import increment, served_from_cache
+
+
+class HedgeStats:
+    """Recent primary latencies and hedge decisions of one tool."""
+    def __init__(self, window: int):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.hedged: Deque[bool] = deque(maxlen=window)
+
+    def delay(self) -> float:
+        """Seconds to wait for the primary before hedging: the configured latency percentile."""
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, math.ceil(len(ordered) * HEDGE_PERCENTILE / 100) - 1)
+        return ordered[index]
+
+    def can_hedge(self) -> bool:
+        """Keeps hedged requests under `HEDGE_MAX_RATIO` of the recent requests."""
+        return sum(self.hedged) + 1 <= HEDGE_MAX_RATIO * (len(self.hedged) + 1)
+
+
+_stats: Dict[str, HedgeStats] = defaultdict(lambda: HedgeStats(HEDGE_WINDOW))
+
+
+class HedgedModel(Runnable):
+    """
+    Chat model call that is hedged to a secondary provider when the primary is slow.
+
+    The primary is called first. If it has not answered within the tool's recent
+    latency percentile, or fails before that, the same request is sent to the
+    secondary; the first successful answer wins and the other request is cancelled. Hedging is off
+    unless `HEDGING_ENABLED` is set, and is capped by a hedge-rate budget.
+    """
+    def __init__(self, tool: str, primary: Runnable, secondary: Runnable):
+        self.tool = tool
+        self.primary = primary
+        self.secondary = secondary
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        def params(model: Runnable) -> Dict[str, Any]:
+            return getattr(getattr(model, "bound", model), "_identifying_params", {})
+        return {"tool": self.tool, "primary": params(self.primary), "secondary": params(self.secondary)}
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return self.primary.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        if not HEDGING_ENABLED:
+            return await self.primary.ainvoke(input, config, **kwargs)
+
+        stats = _stats[self.tool]
+        increment("hedge_requests_total", tool=self.tool)
+        start = time.perf_counter()
+
+        def record_latency(task: asyncio.Task) -> None:
+            # A primary cancelled after losing the race took at least this long; recording
+            # it as such keeps slow requests in the percentile instead of biasing it low.
+            # Cache hits say nothing about the provider latency and would shrink the delay
+            if task.cancelled() or (task.exception() is None and not served_from_cache(task.result())):
+                stats.latencies.append(time.perf_counter() - start)
+
+        primary = asyncio.ensure_future(self.primary.ainvoke(input, config, **kwargs))
+        primary.add_done_callback(record_latency)
+        tasks = {primary: "primary"}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=stats.delay())
+            failed = bool(done) and primary.exception() is not None
+            if (done and not failed) or not stats.can_hedge():
+                stats.hedged.append(False)
+                return await primary
+
+            stats.hedged.append(True)
+            if failed:
+                # The primary failed before the hedge delay: fail over instead of waiting
+                increment("hedge_failovers_total", tool=self.tool)
+            else:
+                increment("hedges_total", tool=self.tool)
+            secondary = asyncio.ensure_future(self.secondary.ainvoke(input, config, **kwargs))
+            tasks[secondary] = "secondary"
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        increment("hedge_wins_total", tool=self.tool, winner=tasks[task])
+                        return task.result()
+                    print(f"\nHedged {tasks[task]} request for {self.tool} failed: {task.exception()}\n")
+            # Both failed: surface the primary error
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
@@ -1,34 +1,140 @@
+import ast
 import json
+import re
+
+from typing import Any, List, Optional
 from .llm_setup import get_gemini_llm
+from .rate_limiter import Priority
+from .metrics import increment
+
+CODE_FENCE = re.compile(r"```[\w-]*\s*\n?(.*?)```", re.DOTALL)
+SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"', "‘": "'", "’": "'"})
+TRAILING_COMMA = re.compile(r",\s*([\]}])")
+# "- item", "* item", "• item", "1. item", "2) item"
+LIST_ITEM = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.+?)\s*$")
+PYTHON_LITERALS = {"true": "True", "false": "False", "null": "None"}
+
+def _balanced_span(text: str) -> Optional[str]:
+    """Returns the first complete JSON array or object of `text`, skipping brackets inside strings."""
+    start = next((i for i, char in enumerate(text) if char in "[{"), None)
+    if start is None:
+        return None
+    depth, quote, escaped = 0, None, False
+    for i in range(start, len(text)):
+        char = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "[{":
+            depth += 1
+        elif char in "]}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+def _python_literal(candidate: str) -> Any:
+    """Parses JSON-like text with single quotes or trailing commas as a Python literal."""
+    tokens = re.split(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""", candidate)
+    # Only replace JSON literals outside of strings
+    for i in range(0, len(tokens), 2):
+        tokens[i] = re.sub(r"\b(true|false|null)\b", lambda match: PYTHON_LITERALS[match.group(1)], tokens[i])
+    return ast.literal_eval("".join(tokens))
+
+def parse_list_items(text: str) -> List[str]:
+    """Returns the items of a bulleted or numbered list, without markers or quotes."""
+    items = []
+    for line in text.splitlines():
+        match = LIST_ITEM.match(line)
+        if match:
+            item = match.group(1).strip().rstrip(",").strip().strip("\"'`")
+            if item:
+                items.append(item)
+    return items
+
+def parse_json_tolerant(text: str) -> Optional[Any]:
+    """
+    Parses the JSON in an LLM response without calling another model.
+
+    Tolerates code fences, text around the JSON, smart quotes, single quotes
+    and trailing commas, and falls back to the items of a bulleted or numbered
+    list. Returns None when nothing can be recovered.
+    """
+    text = text.strip()
+    try:
+        value = json.loads(text)
+        increment("json_parse_total", method="json")
+        return value
+    except json.JSONDecodeError:
+        pass
+
+    fence = CODE_FENCE.search(text)
+    body = (fence.group(1) if fence else text).translate(SMART_QUOTES)
+    candidate = _balanced_span(body)
+    if candidate:
+        for parse in (json.loads, lambda value: json.loads(TRAILING_COMMA.sub(r"\1", value)), _python_literal):
+            try:
+                value = parse(candidate)
+                increment("json_parse_total", method="tolerant")
+                return value
+            except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+                continue
+
+    items = parse_list_items(body)
+    if items:
+        increment("json_parse_total", method="list")
+        return items
+
+    increment("json_parse_total", method="failed")
+    return None
+
+async def _repair_with_llm(text: str, instruction: str, caller: str, priority: Priority) -> list:
+    """Asks Gemini to fix the JSON; only used when the local parser recovers nothing."""
+    try:
+        gemini_llm = await get_gemini_llm(priority=priority)
+        fixed_json = await gemini_llm.ainvoke(f"{instruction}: {text}")
+        value = parse_json_tolerant(fixed_json.content)
+        if not isinstance(value, list):
+            raise ValueError(f"Expected a JSON list, got: {fixed_json.content!r}")
+        increment("json_llm_repairs_total", caller=caller, outcome="ok")
+        return value
+    except Exception as fix_error:
+        increment("json_llm_repairs_total", caller=caller, outcome="failed")
+        print(f"Failed to fix JSON: {fix_error}")
+        return []
 
 async def json_loads(text):
-	"""Safely loads JSON from a string, attempting to fix common issues."""
-	try:
-		start = text.find('[')
-		end = text.find(']')
-		if start != -1 and end != -1:
-			json_str = text[start:end+1]
-			return json.loads(json_str)
-		return json.loads(text)
-	except json.JSONDecodeError as e:
-		print(f"Initial JSON parse failed: {e}")
-		try:
-			gemini_llm = await get_gemini_llm()
-			fixed_json = await gemini_llm.ainvoke(f'Fix this JSON and return a list of search queries strictly in the following format ["query 1", "query 2", "query 3"]: {text}')
-			return json.loads(fixed_json.content.strip())
-		except Exception as fix_error:
-			print(f"Failed to fix JSON: {fix_error}")
-			return []
-    
+	"""Safely loads a JSON list of search queries from a string, attempting to fix common issues."""
+	value = parse_json_tolerant(text)
+	if isinstance(value, list):
+		return [query for query in value if isinstance(query, str) and query.strip()]
+	if isinstance(value, dict):
+		# e.g. {"queries": [...]}
+		lists = [item for item in value.values() if isinstance(item, list)]
+		if lists:
+			return [query for query in lists[0] if isinstance(query, str) and query.strip()]
+	print(f"Initial JSON parse failed: {text!r}")
+	return await _repair_with_llm(
+		text,
+		'Fix this JSON and return a list of search queries strictly in the following format ["query 1", "query 2", "query 3"]',
+		caller="search_queries",
+		priority=Priority.BACKGROUND,
+	)
+
 async def safe_json_loads(text):
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError as e:
-        print(f"Initial JSON parse failed: {e}")
-        try:
-            gemini_llm = await get_gemini_llm()
-            fixed_json = await gemini_llm.ainvoke(f'Fix this JSON and return only the corrected format ["context_of_the_request", "url_from_input"]: {text}')
-            return json.loads(fixed_json.content.strip())
-        except Exception as fix_error:
-            print(f"Failed to fix JSON: {fix_error}")
-            return []
\ No newline at end of file
+    value = parse_json_tolerant(text)
+    if isinstance(value, list):
+        return value
+    print(f"Initial JSON parse failed: {text!r}")
+    return await _repair_with_llm(
+        text,
+        'Fix this JSON and return only the corrected format ["context_of_the_request", "url_from_input"]',
+        caller="context_and_url",
+        priority=Priority.INTERACTIVE,
+    )
@@ -0,0 +1,271 @@
+import threading
+import time
+
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from .metrics import increment
+from .rate_limiter import BucketRateLimiter, key_fingerprint
+
+# HTTP statuses that mean "this key is throttled or the provider is struggling, try another key"
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class PooledKey:
+    """An API key in a pool, with its load and health state."""
+    name: str
+    value: str
+    weight: float = 1.0
+    outstanding: int = 0
+    failures: int = 0
+    cooldown_until: float = 0.0
+
+    @property
+    def fingerprint(self) -> str:
+        return key_fingerprint(self.value)
+
+
+class KeyPool:
+    """
+    Spreads requests across the API keys of a provider.
+
+    Each request goes to the healthy key with the fewest outstanding requests
+    relative to its weight. A key that answers with 429 or 5xx is put in
+    cooldown, doubling on each consecutive failure up to `max_cooldown`.
+    When every key is cooling down, the one that recovers first is used.
+    """
+    def __init__(
+        self,
+        provider: str,
+        keys: Iterable[PooledKey],
+        base_cooldown: float = 5.0,
+        max_cooldown: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.provider = provider
+        # Several config entries may hold the same key; pool each key once
+        self.keys: List[PooledKey] = list({key.value: key for key in keys if key.value}.values())
+        if not self.keys:
+            raise ValueError(f"No API keys configured for {provider}")
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def acquire(self, exclude: Iterable[str] = ()) -> PooledKey:
+        """Picks a key for one request and counts it as outstanding."""
+        excluded = set(exclude)
+        with self._lock:
+            now = self._clock()
+            candidates = [key for key in self.keys if key.name not in excluded] or self.keys
+            healthy = [key for key in candidates if key.cooldown_until <= now]
+            if healthy:
+                key = min(healthy, key=lambda k: k.outstanding / k.weight)
+            else:
+                key = min(candidates, key=lambda k: k.cooldown_until)
+            key.outstanding += 1
+            return key
+
+    def release(self, key: PooledKey, error: Optional[BaseException] = None) -> None:
+        """Marks a request as finished and updates the key health."""
+        with self._lock:
+            key.outstanding -= 1
+            if error is not None and is_retryable(error):
+                key.failures += 1
+                cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (key.failures - 1))
+                key.cooldown_until = self._clock() + cooldown
+                outcome = "throttled"
+                print(f"\n{self.provider} key {key.name} in cooldown for {cooldown:.0f}s: {error}\n")
+            elif error is not None:
+                outcome = "error"
+            else:
+                key.failures = 0
+                outcome = "success"
+        increment("key_pool_requests_total", provider=self.provider, key=key.fingerprint, outcome=outcome)
+
+def status_code(error: BaseException) -> Optional[int]:
+    """Finds the HTTP status of a provider error, looking through chained exceptions."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        for attribute in ("status_code", "code", "status"):
+            value = getattr(error, attribute, None)
+            if isinstance(value, int):
+                return value
+        response = getattr(error, "response", None)
+        if isinstance(getattr(response, "status_code", None), int):
+            return response.status_code
+        error = error.__cause__ or error.__context__
+    return None
+
+def is_retryable(error: BaseException) -> bool:
+    """True when the error is a throttling or server error another key may not get."""
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message
+
+
+class PooledChatModel(BaseChatModel):
+    """
+    Chat model that sends each call to one of several per-key models.
+
+    The models must be the same class and model name, differing only by API
+    key. Calls that fail with 429/5xx fail over to the next key; streamed
+    calls only fail over before the first chunk is yielded.
+    """
+    pool: Any
+    models: Dict[str, BaseChatModel]
+    model_name: str
+
+    @property
+    def _llm_type(self) -> str:
+        return f"pooled-{self.pool.provider}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"provider": self.pool.provider, "model_name": self.model_name}
+
+    def bind_tools(self, tools, **kwargs):
+        # Tool schemas are formatted by the provider class, the same for every key
+        binding = next(iter(self.models.values())).bind_tools(tools, **kwargs)
+        return self.bind(**binding.kwargs)
+
+    def _failover(self, key: PooledKey, error: Exception, tried: set) -> None:
+        """Records a failed attempt and re-raises unless another key should be tried."""
+        self.pool.release(key, error)
+        tried.add(key.name)
+        if not is_retryable(error) or len(tried) >= len(self.models):
+            raise error
+        increment("key_pool_failovers_total", provider=self.pool.provider)
+        print(f"\nFailing over from {self.pool.provider} key {key.name}: {error}\n")
+
+    @staticmethod
+    def _charge_tokens(model: BaseChatModel, messages: Iterable[Optional[BaseMessage]]) -> None:
+        """Charges the reported token usage to the tokens-per-minute budget of the key."""
+        if not isinstance(model.rate_limiter, BucketRateLimiter):
+            return
+        tokens = sum(
+            (getattr(message, "usage_metadata", None) or {}).get("total_tokens", 0)
+            for message in messages
+        )
+        model.rate_limiter.bucket.record_tokens(tokens)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tried = set()
+        while True:
+            key = self.pool.acquire(exclude=tried)
+            model = self.models[key.name]
+            try:
+                if model.rate_limiter:
+                    model.rate_limiter.acquire(blocking=True)
+                result = model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                self._failover(key, e, tried)
+                continue
+            except BaseException:
+                # Cancelled: the request is no longer outstanding, but the key is healthy
+                self.pool.release(key)
+                raise
+            self.pool.release(key)
+            self._charge_tokens(model, [generation.message for generation in result.generations])
+            return result
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tried = set()
+        while True:
+            key = self.pool.acquire(exclude=tried)
+            model = self.models[key.name]
+            try:
+                if model.rate_limiter:
+                    await model.rate_limiter.aacquire(blocking=True)
+                result = await model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                self._failover(key, e, tried)
+                continue
+            except BaseException:
+                # Cancelled: the request is no longer outstanding, but the key is healthy
+                self.pool.release(key)
+                raise
+            self.pool.release(key)
+            self._charge_tokens(model, [generation.message for generation in result.generations])
+            return result
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        tried = set()
+        while True:
+            key = self.pool.acquire(exclude=tried)
+            model = self.models[key.name]
+            chunks = []
+            try:
+                if model.rate_limiter:
+                    model.rate_limiter.acquire(blocking=True)
+                for chunk in model._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    chunks.append(chunk.message)
+                    yield chunk
+            except Exception as e:
+                if chunks:
+                    self.pool.release(key, e)
+                    raise
+                self._failover(key, e, tried)
+                continue
+            except BaseException:
+                self.pool.release(key)
+                raise
+            self.pool.release(key)
+            self._charge_tokens(model, chunks)
+            return
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tried = set()
+        while True:
+            key = self.pool.acquire(exclude=tried)
+            model = self.models[key.name]
+            chunks = []
+            try:
+                if model.rate_limiter:
+                    await model.rate_limiter.aacquire(blocking=True)
+                async for chunk in model._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    chunks.append(chunk.message)
+                    yield chunk
+            except Exception as e:
+                if chunks:
+                    self.pool.release(key, e)
+                    raise
+                self._failover(key, e, tried)
+                continue
+            except BaseException:
+                self.pool.release(key)
+                raise
+            self.pool.release(key)
+            self._charge_tokens(model, chunks)
+            return
@@ -0,0 +1,237 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from .config import (
+    CACHE_DIR,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MEMORY_ENTRIES,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_TTLS,
+)
+from .metrics import CACHE_HIT, increment
+
+def _normalize(value: Any) -> Any:
+    """Collapses whitespace in every string of a serialized prompt."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    return value
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalizes a serialized chat prompt so that formatting-only differences share an entry."""
+    try:
+        return json.dumps(_normalize(json.loads(prompt)), sort_keys=True, ensure_ascii=False)
+    except ValueError:
+        return " ".join(prompt.split())
+
+def cache_key(prompt: str, llm_string: str, namespace: str = "") -> str:
+    """
+    Content address of an LLM call: model and generation params, plus the normalized prompt.
+
+    The namespace is part of the key, so each namespace keeps its own entries and TTL.
+    """
+    return hashlib.sha256(f"{namespace}\x00{llm_string}\x00{normalize_prompt(prompt)}".encode()).hexdigest()
+
+
+class TieredCacheStore:
+    """
+    Two-tier key/value store with per-entry expiry.
+
+    A bounded in-memory LRU sits in front of a SQLite file, whose total size
+    is bounded by evicting the least recently used rows.
+    """
+    def __init__(self, path: Path, max_memory_entries: int, max_disk_bytes: int):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)")
+        self._db.commit()
+
+    def get_memory(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return value
+
+    def put_memory(self, key: str, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_disk(self, key: str) -> Optional[Tuple[str, float]]:
+        """Returns the serialized value and its expiry, or None when missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return row[0], row[1]
+
+    def put_disk(self, key: str, value: str, expires_at: float) -> None:
+        size = len(value.encode())
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, expires_at, time.time()),
+            )
+            self._evict_disk()
+            self._db.commit()
+
+    def _evict_disk(self) -> None:
+        self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM llm_cache WHERE key = ?", evicted)
+        increment("llm_cache_evictions_total", value=len(evicted), tier="disk")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM llm_cache")
+            self._db.commit()
+
+
+def _mark_cache_hit(value: RETURN_VAL_TYPE) -> RETURN_VAL_TYPE:
+    """Copies of cached generations flagged as cache hits, so metrics can tell them from API calls."""
+    marked = []
+    for generation in value:
+        update = {"generation_info": {**(generation.generation_info or {}), CACHE_HIT: True}}
+        message = getattr(generation, "message", None)
+        if message is not None:
+            update["message"] = message.model_copy(
+                update={"response_metadata": {**message.response_metadata, CACHE_HIT: True}}
+            )
+        marked.append(generation.model_copy(update=update))
+    return marked
+
+
+class LLMCache(BaseCache):
+    """
+    LangChain cache for one tool namespace, backed by the shared `TieredCacheStore`.
+
+    Entries live for the namespace TTL. Hits and misses are counted per
+    namespace and tier in the `llm_cache_requests_total` metric.
+    """
+    def __init__(self, namespace: str, ttl: float, store: TieredCacheStore):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.store = store
+
+    def _lookup_disk(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        entry = self.store.get_disk(key)
+        if entry is None:
+            increment("llm_cache_requests_total", namespace=self.namespace, result="miss")
+            return None
+        value = loads(entry[0])
+        # Promote to memory so the next lookup skips SQLite
+        self.store.put_memory(key, value, entry[1])
+        increment("llm_cache_requests_total", namespace=self.namespace, result="hit", tier="disk")
+        return _mark_cache_hit(value)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string, self.namespace)
+        value = self.store.get_memory(key)
+        if value is not None:
+            increment("llm_cache_requests_total", namespace=self.namespace, result="hit", tier="memory")
+            return _mark_cache_hit(value)
+        return self._lookup_disk(key)
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string, self.namespace)
+        value = self.store.get_memory(key)
+        if value is not None:
+            increment("llm_cache_requests_total", namespace=self.namespace, result="hit", tier="memory")
+            return _mark_cache_hit(value)
+        return await asyncio.to_thread(self._lookup_disk, key)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string, self.namespace)
+        expires_at = time.time() + self.ttl
+        self.store.put_memory(key, return_val, expires_at)
+        try:
+            self.store.put_disk(key, dumps(list(return_val)), expires_at)
+        except Exception as e:
+            print(f"Could not persist LLM cache entry for {self.namespace}: {e}")
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        await asyncio.to_thread(self.update, prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+
+
+_store: Optional[TieredCacheStore] = None
+_caches: Dict[str, LLMCache] = {}
+_caches_lock = threading.Lock()
+
+def get_llm_cache(namespace: str) -> Optional[LLMCache]:
+    """
+    Returns the response cache of a tool namespace, or None when caching is off for it.
+
+    Namespaces without a configured TTL, or with a TTL of 0, are not cached.
+    """
+    global _store
+
+    ttl = LLM_CACHE_TTLS.get(namespace, 0)
+    if not LLM_CACHE_ENABLED or ttl <= 0:
+        return None
+
+    with _caches_lock:
+        if _store is None:
+            _store = TieredCacheStore(
+                CACHE_DIR / "llm_cache.sqlite",
+                max_memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+                max_disk_bytes=LLM_CACHE_MAX_BYTES,
+            )
+        if namespace not in _caches:
+            _caches[namespace] = LLMCache(namespace, ttl, _store)
+        return _caches[namespace]
@@ -1,3 +1,9 @@
+import asyncio
+import functools
+import hashlib
+import time
+
+from typing import Any, Dict, Optional
 from .config import (
     GEMINI_KEY,
     GEMINI_KEY_V2,
@@ -12,90 +18,216 @@ from .config import (
     OPENROUTER_CODER,
     OPENROUTER_URL,
 )
-from langchain_core.rate_limiters import InMemoryRateLimiter
+from .config import (
+    GEMINI_REQUEST_TIMEOUT,
+    GEMINI_EXTRA_KEYS,
+    OPENROUTER_EXTRA_KEYS,
+    KEY_COOLDOWN_SECONDS,
+    KEY_MAX_COOLDOWN_SECONDS,
+)
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.load import dumps
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from google import genai
 from google.genai import types
 from google.genai.types import Tool, GenerateContentConfig
+from .rate_limiter import Priority, get_bucket, get_rate_limiter
+from .key_pool import KeyPool, PooledKey, PooledChatModel, is_retryable
+from .llm_cache import get_llm_cache
+from .singleflight import SingleFlight
+from .model_registry import ModelRegistry
+from .metrics import LLMMetricsCallbackHandler, increment, observe
+
+# Tag for the LLM calls whose tokens are streamed to the chat message
+STREAM_TAG = "stream_to_ui"
+
+# Concurrent identical LLM calls share one request
+llm_flight = SingleFlight("llm")
+
+# Chat models are built once per process and settings, and reused by every call
+model_registry = ModelRegistry()
+
+gemini_key_pool = KeyPool(
+    "gemini",
+    [
+        PooledKey("GEMINI_API_KEY", GEMINI_KEY),
+        PooledKey("GEMINI_API_KEY_V2", GEMINI_KEY_V2),
+        *(PooledKey(f"GEMINI_API_KEYS[{i}]", key) for i, key in enumerate(GEMINI_EXTRA_KEYS)),
+    ],
+    base_cooldown=KEY_COOLDOWN_SECONDS,
+    max_cooldown=KEY_MAX_COOLDOWN_SECONDS,
+)
 
-rate_limiter = InMemoryRateLimiter(
-    requests_per_second=0.1,  # <-- Super slow! We can only make a request once every 10 seconds!!
-    check_every_n_seconds=0.1,  # Wake up every 100 ms to check whether allowed to make a request,
-    max_bucket_size=10,  # Controls the maximum burst size.
+openrouter_key_pool = KeyPool(
+    "openrouter",
+    [
+        PooledKey("OPENROUTER_API_KEY", OPENROUTER_KEY),
+        PooledKey("OPENROUTER_API_KEY_V2", OPENROUTER_KEY_V2),
+        *(PooledKey(f"OPENROUTER_API_KEYS[{i}]", key) for i, key in enumerate(OPENROUTER_EXTRA_KEYS)),
+    ],
+    base_cooldown=KEY_COOLDOWN_SECONDS,
+    max_cooldown=KEY_MAX_COOLDOWN_SECONDS,
 )
 
-async def get_gemini_llm() -> ChatGoogleGenerativeAI:
+# Methods of the Google client that retry 503s on their own by default
+GEMINI_CLIENT_METHODS = ("generate_content", "stream_generate_content")
+
+def _single_attempt(client: Any) -> Any:
+    """Turns off the default retry of the Google client methods."""
+    if client is not None and not getattr(client, "_single_attempt", False):
+        for name in GEMINI_CLIENT_METHODS:
+            setattr(client, name, functools.partial(getattr(client, name), retry=None))
+        client._single_attempt = True
+    return client
+
+
+class SingleAttemptGemini(ChatGoogleGenerativeAI):
     """
-    Initializes the Gemini LLM with the API key and model settings.
+    Gemini chat model that sends one request per call.
+
+    LangChain retries 429 and 503 errors with exponential backoff, and the
+    Google client retries 503s for up to 10 minutes. Both would keep waiting
+    on a throttled key, while `PooledChatModel` fails over to another key.
     """
-    llm = ChatGoogleGenerativeAI(
-        model=GEMINI_MODEL,
-        rate_limiter=rate_limiter,
-        google_api_key=GEMINI_KEY,
-    )
-    # print(f"\nGemini LLM type: {type(llm)}\n")
-    return llm
+    def __init__(self, **kwargs: Any):
+        super().__init__(**{**kwargs, "max_retries": 0})
+        _single_attempt(self.client)
 
-async def get_gemini_llm_v2() -> ChatGoogleGenerativeAI:
+    @property
+    def async_client(self):
+        return _single_attempt(super().async_client)
+
+
+def gemini_key_model(model: str, api_key: str, **kwargs) -> ChatGoogleGenerativeAI:
+    """Gemini chat model of one pooled key; the pool handles retries and failover."""
+    return SingleAttemptGemini(model=model, google_api_key=api_key, **kwargs)
+
+def openrouter_key_model(model: str, api_key: str, **kwargs) -> ChatOpenAI:
+    """OpenRouter chat model of one pooled key; SDK retries, which honor retry-after, are off so the pool fails over."""
+    kwargs.setdefault("base_url", OPENROUTER_URL)
+    return ChatOpenAI(model=model, api_key=api_key, max_retries=0, **kwargs)
+
+def _pooled_gemini(model: str, priority: Priority, cache: Optional[str] = None) -> PooledChatModel:
     """
-    Initializes the Gemini LLM V2 with the API key and model settings.
+    Returns the Gemini chat model that spreads its calls over the Gemini key pool.
+
+    `cache` is the response cache namespace; None means responses are not cached.
+    The model is built once per model, priority and cache namespace (see `model_registry`).
     """
-    llm = ChatGoogleGenerativeAI(
-        model=GEMINI_MODEL,
-        rate_limiter=rate_limiter,
-        google_api_key=GEMINI_KEY_V2,
-    )
-    # print(f"\nGemini LLM V2 type: {type(llm)}\n")
+    def build() -> PooledChatModel:
+        return PooledChatModel(
+            pool=gemini_key_pool,
+            model_name=model,
+            cache=(get_llm_cache(cache) if cache else None) or False,
+            callbacks=[LLMMetricsCallbackHandler("gemini", model)],
+            models={
+                key.name: gemini_key_model(
+                    model, key.value, rate_limiter=get_rate_limiter("gemini", key.value, model, priority)
+                )
+                for key in gemini_key_pool.keys
+            },
+        )
+
+    settings = (model, priority, cache, [(key.name, key.value) for key in gemini_key_pool.keys])
+    return model_registry.get(("gemini", model, priority, cache), settings, build)
+
+def _pooled_openrouter(model: str, priority: Priority, cache: Optional[str] = None) -> PooledChatModel:
+    """
+    Returns the OpenRouter chat model that spreads its calls over the OpenRouter key pool.
+
+    `cache` is the response cache namespace; None means responses are not cached.
+    The model is built once per model, priority and cache namespace (see `model_registry`).
+    """
+    def build() -> PooledChatModel:
+        return PooledChatModel(
+            pool=openrouter_key_pool,
+            model_name=model,
+            cache=(get_llm_cache(cache) if cache else None) or False,
+            callbacks=[LLMMetricsCallbackHandler("openrouter", model)],
+            models={
+                key.name: openrouter_key_model(
+                    model, key.value, rate_limiter=get_rate_limiter("openrouter", key.value, model, priority)
+                )
+                for key in openrouter_key_pool.keys
+            },
+        )
+
+    settings = (model, priority, cache, OPENROUTER_URL, [(key.name, key.value) for key in openrouter_key_pool.keys])
+    return model_registry.get(("openrouter", model, priority, cache), settings, build)
+
+def refresh_models() -> None:
+    """
+    Drops every built chat model, so the next calls rebuild them.
+
+    Needed after changing settings that are not part of a model's
+    fingerprint, e.g. rate limits or the response cache configuration.
+    """
+    model_registry.clear()
+
+async def get_gemini_llm(priority: Priority = Priority.INTERACTIVE, cache: Optional[str] = None) -> PooledChatModel:
+    """
+    Initializes the Gemini LLM with the Gemini key pool and model settings.
+    """
+    llm = _pooled_gemini(GEMINI_MODEL, priority, cache)
+    # print(f"\nGemini LLM type: {type(llm)}\n")
     return llm
 
-async def get_openrouter_llm() -> ChatOpenAI:
+async def get_openrouter_llm(priority: Priority = Priority.INTERACTIVE, cache: Optional[str] = None) -> PooledChatModel:
     """
     Initializes and returns an OpenRouter LLM instance with configured settings.
     """
-    llm = ChatOpenAI(
-        model=OPENROUTER_MODEL,
-        rate_limiter=rate_limiter,
-        api_key=OPENROUTER_KEY,
-        base_url=OPENROUTER_URL,
-    )
+    llm = _pooled_openrouter(OPENROUTER_MODEL, priority, cache)
     # print(f"\nOpenrouter LLM type: {type(llm)}\n")
     return llm
 
-async def get_llm_coder() -> ChatOpenAI:
+async def get_llm_coder(priority: Priority = Priority.INTERACTIVE, cache: Optional[str] = None) -> PooledChatModel:
     """
     Initializes and returns an OpenRouter LLM coder instance with configured settings.
     """
-    llm = ChatOpenAI(
-        model=OPENROUTER_CODER,
-        rate_limiter=rate_limiter,
-        api_key=OPENROUTER_KEY_V2,
-        base_url=OPENROUTER_URL,
-    )
+    llm = _pooled_openrouter(OPENROUTER_CODER, priority, cache)
     # print(f"\nOpenrouter LLM type: {type(llm)}\n")
     return llm
 
-async def get_gemini_image_generation() -> ChatGoogleGenerativeAI:
+async def get_gemini_image_generation(priority: Priority = Priority.INTERACTIVE) -> PooledChatModel:
     """
-    Initializes the Gemini image generation model with the API key and model settings.
+    Initializes the Gemini image generation model with the Gemini key pool and model settings.
+
+    Image generation is not deterministic, so its responses are never cached.
     """
-    llm = ChatGoogleGenerativeAI(
-        model=GEMINI_IMAGE_MODEL,
-        rate_limiter=rate_limiter,
-        google_api_key=GEMINI_KEY,
-    )
+    llm = _pooled_gemini(GEMINI_IMAGE_MODEL, priority)
     # print(f"\nGemini image generation type: {type(llm)}\n")
     return llm
 
+def _llm_call_key(model: Runnable, input: LanguageModelInput, kwargs: Dict[str, Any]) -> str:
+    """Identifies an LLM call by model class and params, bound kwargs (e.g. tools) and input."""
+    bound = getattr(model, "bound", model)
+    identity = {
+        "type": type(bound).__name__,
+        "params": getattr(bound, "_identifying_params", {}),
+        "bound_kwargs": getattr(model, "kwargs", {}),
+        "kwargs": kwargs,
+        "input": input,
+    }
+    return hashlib.sha256(dumps(identity).encode()).hexdigest()
+
+async def coalesced_ainvoke(model: Runnable, input: LanguageModelInput, **kwargs: Any):
+    """
+    Invokes `model`, sharing the request with concurrent identical invocations.
+
+    Only the first caller streams tokens; the others receive the final message.
+    """
+    key = _llm_call_key(model, input, kwargs)
+    return await llm_flight.do(key, lambda: model.ainvoke(input, **kwargs))
+
 async def get_gemini_url_context(contents: str):
     """"Scrapes the content of a URL using Google Gemini's UrlContext tool."""
-    client = await get_gemini_client()
-
     tools = []
     tools.append(Tool(url_context=types.UrlContext))
     tools.append(Tool(google_search=types.GoogleSearch()))
 
-    gemini_client = client.models.generate_content(
+    gemini_client = await generate_gemini_content(
         model=GEMINI_2_5_MODEL,
         contents=contents,
         config=GenerateContentConfig(
@@ -106,18 +238,20 @@ async def get_gemini_url_context(contents: str):
     # print(f"\nGemini url with context type: {type(gemini_client)}\n")
     return gemini_client
 
-async def get_gemini_llm_for_youtube(url: str, context: str):
+async def get_gemini_llm_for_youtube(url: str, context: str, start_seconds: Optional[int] = None):
     """
     Initializes the Gemini LLM for YouTube with the API key and model settings.
-    """
-    client = await get_gemini_client()
 
-    llm = client.models.generate_content(
+    `start_seconds` makes Gemini start the video at that offset (the `t` parameter of the link).
+    """
+    video_metadata = types.VideoMetadata(start_offset=f"{start_seconds}s") if start_seconds else None
+    llm = await generate_gemini_content(
         model=GEMINI_2_5_MODEL,
         contents=types.Content(
             parts=[
                 types.Part(
-                    file_data=types.FileData(file_uri=url)
+                    file_data=types.FileData(file_uri=url),
+                    video_metadata=video_metadata
                 ),
                 types.Part(text=context)
             ]
@@ -126,7 +260,73 @@ async def get_gemini_llm_for_youtube(url: str, context: str):
     # print(f"\nGemini LLM for YouTube type: {type(llm)}\n")
     return llm
 
-async def get_gemini_client():
-    """Initializes and returns a Google Generative AI client with API key."""
-    client = genai.Client(api_key=GEMINI_KEY)
-    return client
\ No newline at end of file
+async def generate_gemini_content(
+    model: str,
+    contents,
+    config: Optional[GenerateContentConfig] = None,
+    priority: Priority = Priority.INTERACTIVE,
+    timeout: float = GEMINI_REQUEST_TIMEOUT,
+) -> types.GenerateContentResponse:
+    """
+    Calls `generate_content` on the async Gemini client without blocking the event loop.
+
+    The call goes through the Gemini key pool and rate limiter, fails over to
+    another key on 429/5xx and is cancelled after `timeout` seconds.
+    """
+    labels = {"provider": "gemini", "model": model}
+    tried = set()
+    while True:
+        key = gemini_key_pool.acquire(exclude=tried)
+        try:
+            await get_bucket("gemini", key.value, model).aacquire(priority)
+            client = await get_gemini_client(key)
+            start = time.perf_counter()
+            response = await asyncio.wait_for(
+                client.aio.models.generate_content(model=model, contents=contents, config=config),
+                timeout=timeout,
+            )
+        except Exception as e:
+            increment("llm_calls_total", status="error", **labels)
+            gemini_key_pool.release(key, e)
+            tried.add(key.name)
+            if not is_retryable(e) or len(tried) >= len(gemini_key_pool.keys):
+                raise
+            print(f"\nFailing over from gemini key {key.name}: {e}\n")
+            continue
+        except BaseException:
+            gemini_key_pool.release(key)
+            raise
+        gemini_key_pool.release(key)
+        observe("llm_latency_seconds", time.perf_counter() - start, **labels)
+        increment("llm_calls_total", status="success", **labels)
+        if response.usage_metadata:
+            increment("llm_tokens_total", response.usage_metadata.prompt_token_count or 0, direction="input", **labels)
+            increment("llm_tokens_total", response.usage_metadata.candidates_token_count or 0, direction="output", **labels)
+        return response
+
+_gemini_clients: Dict[str, genai.Client] = {}
+
+async def get_gemini_client(key: Optional[PooledKey] = None) -> genai.Client:
+    """
+    Returns the shared Google Generative AI client of an API key.
+
+    Clients are created once per key and reuse their HTTP connections;
+    without a key, the least busy key of the Gemini pool is used.
+    """
+    if key is None:
+        key = gemini_key_pool.acquire()
+        gemini_key_pool.release(key)
+
+    if key.name not in _gemini_clients:
+        _gemini_clients[key.name] = genai.Client(
+            api_key=key.value,
+            http_options=types.HttpOptions(timeout=int(GEMINI_REQUEST_TIMEOUT * 1000)),
+        )
+    return _gemini_clients[key.name]
+
+async def close_gemini_clients() -> None:
+    """Closes the HTTP connections of the shared Gemini clients."""
+    while _gemini_clients:
+        _, client = _gemini_clients.popitem()
+        await client.aio.aclose()
+        client.close()
@@ -0,0 +1,179 @@
+import bisect
+import functools
+import threading
+import time
+
+from collections import defaultdict
+from typing import Any, Dict, Optional, Sequence, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# A label set is stored as a sorted tuple of (name, value) pairs so it can be a dict key
+LabelSet = Tuple[Tuple[str, str], ...]
+
+# Key set by the LLM cache in the generation info and response metadata of the answers it serves
+CACHE_HIT = "cache_hit"
+
+# Upper bounds (in seconds) used by latency histograms
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[LabelSet, float]] = defaultdict(lambda: defaultdict(float))
+_histograms: Dict[str, Dict[LabelSet, "Histogram"]] = defaultdict(dict)
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket upper bounds, as used by Prometheus."""
+    __slots__ = ['buckets', 'counts', 'sum', 'count']
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list:
+        """Returns the number of observations less than or equal to each bucket bound."""
+        total, cumulative = 0, []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+def _label_set(labels: dict) -> LabelSet:
+    """Normalizes keyword labels into a hashable, ordered label set."""
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def increment(name: str, value: float = 1, **labels) -> None:
+    """Increments the counter `name` for the given labels."""
+    with _lock:
+        _counters[name][_label_set(labels)] += value
+
+def observe(name: str, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels) -> None:
+    """Records `value` in the histogram `name` for the given labels."""
+    with _lock:
+        series = _histograms[name]
+        key = _label_set(labels)
+        if key not in series:
+            series[key] = Histogram(buckets)
+        series[key].observe(value)
+
+def get_counter(name: str, **labels) -> float:
+    """Returns the current value of a counter, or 0 if it was never incremented."""
+    with _lock:
+        return _counters.get(name, {}).get(_label_set(labels), 0)
+
+def get_histogram(name: str, **labels) -> Optional[Histogram]:
+    """Returns the histogram for the given labels, or None if nothing was observed."""
+    with _lock:
+        return _histograms.get(name, {}).get(_label_set(labels))
+
+def get_metrics() -> Dict[str, Dict[LabelSet, float]]:
+    """Returns a snapshot of all counters."""
+    with _lock:
+        return {name: dict(values) for name, values in _counters.items()}
+
+def _format_labels(labels: LabelSet, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in pairs
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+def render_prometheus() -> str:
+    """Renders every counter and histogram in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for name in sorted(_counters):
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(_counters[name].items()):
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name in sorted(_histograms):
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(_histograms[name].items()):
+                for bound, count in zip(histogram.buckets, histogram.cumulative_counts()):
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', str(bound)),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+def timed(metric: str, **labels):
+    """
+    Decorator for async functions that records `{metric}_latency_seconds`
+    and `{metric}_calls_total` by status (success / error).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = "error"
+            try:
+                result = await fn(*args, **kwargs)
+                status = "success"
+                return result
+            finally:
+                observe(f"{metric}_latency_seconds", time.perf_counter() - start, **labels)
+                increment(f"{metric}_calls_total", status=status, **labels)
+        wrapper.instrumented = True
+        return wrapper
+    return decorator
+
+def instrument_tool(tool):
+    """Wraps the coroutine of a LangChain tool with `tool` latency and call metrics, once."""
+    if tool.coroutine is not None and not getattr(tool.coroutine, "instrumented", False):
+        tool.coroutine = timed("tool", tool=tool.name)(tool.coroutine)
+    return tool
+
+
+def served_from_cache(message: Any) -> bool:
+    """True when a chat model answer came from the LLM cache rather than the API."""
+    return bool((getattr(message, "response_metadata", None) or {}).get(CACHE_HIT))
+
+
+class LLMMetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Records latency, token usage and errors of chat model calls per provider and model.
+
+    Answers served from the LLM cache are only counted as `status="cached"`
+    calls: they cost no tokens and their latency is not the provider's.
+    """
+    run_inline = True
+
+    def __init__(self, provider: str, model: str):
+        self.labels = {"provider": provider, "model": model}
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        start = self._started.pop(run_id, None)
+        generations = [generation for batch in response.generations for generation in batch]
+        if generations and all((generation.generation_info or {}).get(CACHE_HIT) for generation in generations):
+            increment("llm_calls_total", status="cached", **self.labels)
+            return
+        if start is not None:
+            observe("llm_latency_seconds", time.perf_counter() - start, **self.labels)
+        increment("llm_calls_total", status="success", **self.labels)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                increment("llm_tokens_total", usage.get("input_tokens", 0), direction="input", **self.labels)
+                increment("llm_tokens_total", usage.get("output_tokens", 0), direction="output", **self.labels)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        start = self._started.pop(run_id, None)
+        if start is not None:
+            observe("llm_latency_seconds", time.perf_counter() - start, **self.labels)
+        increment("llm_calls_total", status="error", **self.labels)
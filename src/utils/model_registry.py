@@ -0,0 +1,48 @@
+import hashlib
+import threading
+
+from typing import Any, Callable, Dict, Hashable, Tuple, TypeVar
+from .metrics import increment
+
+T = TypeVar("T")
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of LLM clients and tool-bound models.
+
+    Each entry is built once and then reused, so the HTTP clients inside it
+    (and their open connections) are too. An entry also stores a fingerprint
+    of the settings it was built from (model name, API keys, bound tools...),
+    and is rebuilt when the caller passes different settings. Lookups are
+    counted in `model_registry_requests_total` as hit, build or refresh.
+    """
+    def __init__(self):
+        self._entries: Dict[Hashable, Tuple[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(settings: Any) -> str:
+        # Hashed so API keys in the settings are not kept in plain text
+        return hashlib.sha256(repr(settings).encode()).hexdigest()
+
+    def get(self, key: Hashable, settings: Any, build: Callable[[], T]) -> T:
+        """Returns the entry of `key`, building it with `build()` if missing or built from other settings."""
+        fingerprint = self.fingerprint(settings)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                increment("model_registry_requests_total", result="hit")
+                return entry[1]
+            value = build()
+            self._entries[key] = (fingerprint, value)
+        increment("model_registry_requests_total", result="build" if entry is None else "refresh")
+        return value
+
+    def clear(self) -> None:
+        """Drops every entry, so the next lookups rebuild them from the current settings."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
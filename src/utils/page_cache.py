@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from .config import (
+    CACHE_DIR,
+    PAGE_CACHE_ENABLED,
+    PAGE_CACHE_TTL,
+    PAGE_CACHE_MAX_BYTES,
+)
+from .metrics import increment, get_counter
+
+# Query parameters that only track the visitor and never change the page content
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "ref_src"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a URL so that trivially different spellings share a cache entry.
+
+    Lowercases the scheme and host, drops default ports, fragments and tracking
+    parameters, sorts the query string and removes a trailing slash from the path.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+@dataclass
+class CachedPage:
+    """Extracted text of a page, with the validators needed to revalidate it."""
+    url: str
+    text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers of a conditional GET that returns 304 if the page did not change."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """
+    SQLite cache of scraped page text keyed by normalized URL.
+
+    Text is stored zlib-compressed. Expired entries are kept so they can be
+    revalidated with a conditional GET, and the total compressed size is
+    bounded by evicting the least recently used pages.
+    """
+    def __init__(self, path: Path, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS page_cache (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                text BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS page_cache_accessed_at ON page_cache (accessed_at)")
+        self._db.commit()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(normalize_url(url).encode()).hexdigest()
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Returns the cached page, fresh or stale, or None if it was never cached."""
+        key = self._key(url)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, text, etag, last_modified, expires_at FROM page_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE page_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return CachedPage(row[0], zlib.decompress(row[1]).decode(), row[2], row[3], row[4])
+
+    def put(self, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        compressed = zlib.compress(text.encode())
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                """INSERT OR REPLACE INTO page_cache
+                (key, url, text, etag, last_modified, size, expires_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (self._key(url), url, compressed, etag, last_modified, len(compressed), now + self.ttl, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def refresh(self, url: str) -> None:
+        """Extends the lifetime of a page after a 304 Not Modified."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE page_cache SET expires_at = ?, accessed_at = ? WHERE key = ?",
+                (time.time() + self.ttl, time.time(), self._key(url)),
+            )
+            self._db.commit()
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM page_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM page_cache ORDER BY accessed_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM page_cache WHERE key = ?", evicted)
+        increment("page_cache_evictions_total", value=len(evicted))
+
+    def urls(self) -> List[str]:
+        """Returns the URLs of all cached pages."""
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT url FROM page_cache").fetchall()]
+
+    async def aget(self, url: str) -> Optional[CachedPage]:
+        return await asyncio.to_thread(self.get, url)
+
+    async def aput(self, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        try:
+            await asyncio.to_thread(self.put, url, text, etag, last_modified)
+        except Exception as e:
+            print(f"Could not persist page cache entry for {url}: {e}")
+
+    async def arefresh(self, url: str) -> None:
+        await asyncio.to_thread(self.refresh, url)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM page_cache")
+            self._db.commit()
+
+
+def hit_ratio() -> float:
+    """
+    Share of page lookups served without downloading the page again.
+
+    Only completed lookups count: fresh hits and 304 revalidations are hits,
+    pages downloaded and extracted are misses. Lookups whose fetch failed are
+    counted apart in `page_cache_fetch_errors_total`.
+    """
+    hits = get_counter("page_cache_requests_total", result="hit") + get_counter("page_cache_requests_total", result="revalidated")
+    total = hits + get_counter("page_cache_requests_total", result="miss") + get_counter("page_cache_requests_total", result="stale")
+    return hits / total if total else 0.0
+
+
+_cache: Optional[PageCache] = None
+_cache_lock = threading.Lock()
+
+def get_page_cache() -> Optional[PageCache]:
+    """Returns the shared page cache, or None when page caching is off."""
+    global _cache
+
+    if not PAGE_CACHE_ENABLED or PAGE_CACHE_TTL <= 0:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache(CACHE_DIR / "page_cache.sqlite", ttl=PAGE_CACHE_TTL, max_bytes=PAGE_CACHE_MAX_BYTES)
+        return _cache
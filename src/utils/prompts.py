@@ -54,6 +54,41 @@ def generate_webpage_summary_template():
 #   if the question cannot be answered using the text, simply summarize the text. Include all factual information, numbers, stats, etc.
 # """
 
+def generate_batch_summary_template():
+	return """Below are {count} web pages, each starting with a [[SOURCE n]] marker and the question to answer from it.
+
+	{sources}
+
+	-------------------
+
+	For each source, using only its text, answer in short its question.
+	If the question cannot be answered using the text, simply summarize the text.
+	Include all factual information, numbers, stats, etc.
+
+	Reply with exactly {count} sections, in order. Start each section with its marker
+	alone on a line, e.g. [[SOURCE 1]], followed by the answer for that source.
+	Do not add anything before the first marker.
+
+	Respond in the same language the questions are written in.
+	"""
+
+def generate_history_summary_template():
+	return """Summary of the conversation so far:
+	{summary}
+
+	-------------------
+
+	New messages:
+	{conversation}
+
+	-------------------
+
+	Update the summary with the new messages, in at most {max_words} words.
+	Keep the user's goals, preferences, decisions, names, numbers, URLs and open questions.
+	Skip greetings and details that later messages made irrelevant.
+	Reply with the summary only, in the same language as the conversation.
+	"""
+
 def generate_search_queries_prompt():
     return '''Generate exactly 3 Google search queries to search online that form an objective opinion from the following task: "{question}".
             Include specific details such as locations, names, etc.
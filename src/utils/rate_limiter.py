@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import threading
+import time
+
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from langchain_core.rate_limiters import BaseRateLimiter
+from .config import (
+    GEMINI_REQUESTS_PER_SECOND,
+    GEMINI_MAX_BURST,
+    GEMINI_TOKENS_PER_MINUTE,
+    OPENROUTER_REQUESTS_PER_SECOND,
+    OPENROUTER_MAX_BURST,
+    OPENROUTER_TOKENS_PER_MINUTE,
+)
+from .metrics import increment, observe
+
+# (requests per second, max burst, tokens per minute) for each provider
+PROVIDER_LIMITS = {
+    "gemini": (GEMINI_REQUESTS_PER_SECOND, GEMINI_MAX_BURST, GEMINI_TOKENS_PER_MINUTE),
+    "openrouter": (OPENROUTER_REQUESTS_PER_SECOND, OPENROUTER_MAX_BURST, OPENROUTER_TOKENS_PER_MINUTE),
+}
+
+
+class Priority(IntEnum):
+    """Order in which queued requests get a slot; lower values go first."""
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BACKGROUND = 2
+
+
+class TokenBucket:
+    """
+    Token bucket with a priority wait queue and an optional tokens-per-minute budget.
+
+    Each request takes one slot from the bucket, which refills at
+    `requests_per_second` up to `max_bucket_size`. When `tokens_per_minute` is
+    set, requests also wait while the LLM token budget, fed by `record_tokens`,
+    is exhausted. Waiters are served strictly by priority, then arrival order.
+
+    `clock` and `sleep` can be replaced by a fake clock in tests.
+    """
+    def __init__(
+        self,
+        requests_per_second: float,
+        max_bucket_size: float = 1,
+        tokens_per_minute: Optional[int] = None,
+        check_every_n_seconds: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+        labels: Optional[Dict[str, str]] = None,
+    ):
+        self.requests_per_second = requests_per_second
+        self.max_bucket_size = max_bucket_size
+        self.tokens_per_minute = tokens_per_minute
+        self.check_every_n_seconds = check_every_n_seconds
+        self.labels = labels or {}
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._available = float(max_bucket_size)
+        self._tokens_available = float(tokens_per_minute or 0)
+        self._last = clock()
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = max(0.0, now - self._last)
+        self._last = now
+        self._available = min(self.max_bucket_size, self._available + elapsed * self.requests_per_second)
+        if self.tokens_per_minute:
+            self._tokens_available = min(
+                self.tokens_per_minute,
+                self._tokens_available + elapsed * self.tokens_per_minute / 60,
+            )
+
+    def _can_consume(self) -> bool:
+        if self._available < 1:
+            return False
+        return not self.tokens_per_minute or self._tokens_available > 0
+
+    def _enqueue(self, priority: Priority) -> Tuple[int, int]:
+        entry = (int(priority), next(self._sequence))
+        with self._lock:
+            heapq.heappush(self._waiters, entry)
+        return entry
+
+    def _dequeue(self, entry: Tuple[int, int]) -> None:
+        with self._lock:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+
+    def _try_consume(self, entry: Tuple[int, int]) -> bool:
+        """Takes a slot if `entry` is at the head of the queue and the bucket allows it."""
+        with self._lock:
+            self._refill()
+            if self._waiters[0] != entry or not self._can_consume():
+                return False
+            heapq.heappop(self._waiters)
+            self._available -= 1
+            return True
+
+    def try_acquire(self) -> bool:
+        """Takes a slot without waiting, only when nobody is queued."""
+        with self._lock:
+            self._refill()
+            if self._waiters or not self._can_consume():
+                return False
+            self._available -= 1
+            return True
+
+    def _record_wait(self, waited: float, priority: Priority) -> None:
+        observe("rate_limiter_wait_seconds", waited, priority=priority.name.lower(), **self.labels)
+        increment("rate_limiter_requests_total", priority=priority.name.lower(), **self.labels)
+
+    async def aacquire(self, priority: Priority = Priority.DEFAULT) -> float:
+        """Waits for a slot and returns the time spent waiting, in seconds."""
+        start = self._clock()
+        entry = self._enqueue(priority)
+        try:
+            while not self._try_consume(entry):
+                await self._sleep(self.check_every_n_seconds)
+        except BaseException:
+            # Cancelled while queued: give the place to the next waiter
+            self._dequeue(entry)
+            raise
+        waited = self._clock() - start
+        self._record_wait(waited, priority)
+        return waited
+
+    def acquire(self, priority: Priority = Priority.DEFAULT) -> float:
+        """Blocking variant of `aacquire` for synchronous callers."""
+        start = self._clock()
+        entry = self._enqueue(priority)
+        try:
+            while not self._try_consume(entry):
+                time.sleep(self.check_every_n_seconds)
+        except BaseException:
+            self._dequeue(entry)
+            raise
+        waited = self._clock() - start
+        self._record_wait(waited, priority)
+        return waited
+
+    def record_tokens(self, tokens: int) -> None:
+        """Charges LLM tokens against the tokens-per-minute budget."""
+        if not self.tokens_per_minute:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens_available -= tokens
+
+
+class BucketRateLimiter(BaseRateLimiter):
+    """LangChain rate limiter that takes slots from a shared `TokenBucket` at a fixed priority."""
+    def __init__(self, bucket: TokenBucket, priority: Priority = Priority.DEFAULT):
+        self.bucket = bucket
+        self.priority = priority
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        if not blocking:
+            return self.bucket.try_acquire()
+        self.bucket.acquire(self.priority)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        if not blocking:
+            return self.bucket.try_acquire()
+        await self.bucket.aacquire(self.priority)
+        return True
+
+
+_buckets: Dict[Tuple[str, str, str], TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+def key_fingerprint(api_key: str) -> str:
+    """Short, non-reversible identifier of an API key, safe to use in logs and metrics."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:8]
+
+def get_bucket(provider: str, api_key: str, model: str) -> TokenBucket:
+    """Returns the process-wide bucket for a provider, API key and model."""
+    key = (provider, key_fingerprint(api_key), model)
+    with _buckets_lock:
+        if key not in _buckets:
+            requests_per_second, max_burst, tokens_per_minute = PROVIDER_LIMITS[provider]
+            _buckets[key] = TokenBucket(
+                requests_per_second=requests_per_second,
+                max_bucket_size=max_burst,
+                tokens_per_minute=tokens_per_minute,
+                labels={"provider": key[0], "key": key[1], "model": key[2]},
+            )
+        return _buckets[key]
+
+def get_rate_limiter(provider: str, api_key: str, model: str, priority: Priority = Priority.DEFAULT) -> BucketRateLimiter:
+    """Returns a LangChain rate limiter on the bucket of a provider, API key and model."""
+    return BucketRateLimiter(get_bucket(provider, api_key, model), priority)
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+from .config import (
+    CACHE_DIR,
+    RESEARCH_MEMORY_ENABLED,
+    RESEARCH_MEMORY_TTL,
+)
+from .metrics import increment
+
+
+@dataclass
+class ResearchNote:
+    """Summary of one page content from an earlier research run, with all its source URLs."""
+    sources: List[str]
+    question: str
+    summary: str
+
+
+def _query_key(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class ResearchMemory:
+    """
+    SQLite store of what deep research found in each chat thread.
+
+    Keeps the URLs returned for each search query and the summary of each
+    page, indexed by thread and canonical URL, so follow-up research in the
+    same thread only searches and scrapes what it has not seen yet. Entries
+    older than `ttl` seconds are pruned.
+    """
+    def __init__(self, path: Path, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.executescript(
+            """CREATE TABLE IF NOT EXISTS research_queries (
+                thread_id TEXT NOT NULL,
+                query TEXT NOT NULL,
+                urls TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (thread_id, query)
+            );
+            CREATE TABLE IF NOT EXISTS research_summaries (
+                thread_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                question TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (thread_id, url)
+            );
+            CREATE INDEX IF NOT EXISTS research_summaries_created_at ON research_summaries (created_at);
+            CREATE INDEX IF NOT EXISTS research_queries_created_at ON research_queries (created_at);"""
+        )
+        self._db.commit()
+
+    def query_urls(self, thread_id: str, query: str) -> Optional[List[str]]:
+        """Returns the URLs found earlier in the thread for the same search query."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT urls FROM research_queries WHERE thread_id = ? AND query = ? AND created_at > ?",
+                (thread_id, _query_key(query), time.time() - self.ttl),
+            ).fetchone()
+        increment("research_memory_requests_total", kind="query", result="hit" if row else "miss")
+        return json.loads(row[0]) if row else None
+
+    def note_for(self, thread_id: str, url: str) -> Optional[ResearchNote]:
+        """Returns the earlier summary of a page, looked up by its canonical URL."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sources, question, summary FROM research_summaries "
+                "WHERE thread_id = ? AND url = ? AND created_at > ?",
+                (thread_id, url, time.time() - self.ttl),
+            ).fetchone()
+        increment("research_memory_requests_total", kind="summary", result="hit" if row else "miss")
+        return ResearchNote(json.loads(row[0]), row[1], row[2]) if row else None
+
+    def notes(self, thread_id: str) -> List[ResearchNote]:
+        """Returns every distinct page summary of the thread, newest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT sources, question, summary FROM research_summaries "
+                "WHERE thread_id = ? AND created_at > ? ORDER BY created_at DESC",
+                (thread_id, time.time() - self.ttl),
+            ).fetchall()
+        notes: Dict[str, ResearchNote] = {}
+        for sources, question, summary in rows:
+            notes.setdefault(summary, ResearchNote(json.loads(sources), question, summary))
+        return list(notes.values())
+
+    def save_query(self, thread_id: str, query: str, urls: List[str]) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO research_queries (thread_id, query, urls, created_at) VALUES (?, ?, ?, ?)",
+                (thread_id, _query_key(query), json.dumps(urls), time.time()),
+            )
+            self._db.commit()
+
+    def save_note(self, thread_id: str, canonical_urls: List[str], note: ResearchNote) -> None:
+        """Stores a page summary under the canonical URL of each of its sources."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO research_summaries "
+                "(thread_id, url, sources, question, summary, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(thread_id, url, json.dumps(note.sources), note.question, note.summary, now) for url in canonical_urls],
+            )
+            self._db.execute("DELETE FROM research_summaries WHERE created_at <= ?", (now - self.ttl,))
+            self._db.execute("DELETE FROM research_queries WHERE created_at <= ?", (now - self.ttl,))
+            self._db.commit()
+
+    async def anotes(self, thread_id: str) -> List[ResearchNote]:
+        return await asyncio.to_thread(self.notes, thread_id)
+
+    async def aquery_urls(self, thread_id: str, query: str) -> Optional[List[str]]:
+        return await asyncio.to_thread(self.query_urls, thread_id, query)
+
+    async def anote_for(self, thread_id: str, url: str) -> Optional[ResearchNote]:
+        return await asyncio.to_thread(self.note_for, thread_id, url)
+
+    async def asave_query(self, thread_id: str, query: str, urls: List[str]) -> None:
+        await asyncio.to_thread(self.save_query, thread_id, query, urls)
+
+    async def asave_note(self, thread_id: str, canonical_urls: List[str], note: ResearchNote) -> None:
+        await asyncio.to_thread(self.save_note, thread_id, canonical_urls, note)
+
+
+_memory: Optional[ResearchMemory] = None
+_memory_lock = threading.Lock()
+
+def get_research_memory() -> Optional[ResearchMemory]:
+    """Returns the shared research memory, or None when it is turned off."""
+    global _memory
+
+    if not RESEARCH_MEMORY_ENABLED:
+        return None
+
+    with _memory_lock:
+        if _memory is None:
+            _memory = ResearchMemory(CACHE_DIR / "research_memory.sqlite", ttl=RESEARCH_MEMORY_TTL)
+        return _memory
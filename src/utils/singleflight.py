@@ -0,0 +1,53 @@
+import asyncio
+
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+from .metrics import increment
+
+T = TypeVar("T")
+
+
+class _Call:
+    """An in-flight call shared by every waiter with the same key."""
+    __slots__ = ['task', 'waiters']
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one underlying task.
+
+    The first caller for a key starts the task; callers that arrive while it
+    is running await the same task. A waiter that is cancelled leaves without
+    affecting the others, and the task is only cancelled when the last waiter
+    goes away. Coalesced calls are counted in `singleflight_deduplicated_total`.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Runs `fn()` unless a call with the same key is in flight, and returns its result."""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            increment("singleflight_deduplicated_total", group=self.name)
+
+        call.waiters += 1
+        try:
+            # Shield the shared task so one cancelled waiter does not cancel it for the rest
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # The last waiter went away: nobody needs the result anymore
+                call.task.cancel()
+                self._forget(key, call)
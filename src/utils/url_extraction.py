@@ -0,0 +1,93 @@
+import re
+
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# URLs inside free text; trailing punctuation is trimmed separately
+URL_PATTERN = re.compile(r"https?://[^\s<>\"'`]+", re.IGNORECASE)
+TRAILING_PUNCTUATION = ".,;:!?>\"'"
+# Closing brackets are part of URLs such as /wiki/Python_(programming_language)
+# unless they close a bracket opened before the URL
+BRACKETS = {")": "(", "]": "[", "}": "{"}
+YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+YOUTUBE_HOSTS = {"youtube.com", "m.youtube.com", "music.youtube.com", "youtube-nocookie.com"}
+# Path prefixes that are followed by the video id, e.g. /shorts/<id>
+YOUTUBE_ID_PATHS = ("shorts", "embed", "live", "v", "e")
+# Start time of the `t` parameter: 90, 90s, 1m30s, 1h2m3s
+YOUTUBE_TIME = re.compile(r"^(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s?)?$")
+
+def _trim_url(url: str) -> str:
+    """Removes the punctuation of the surrounding sentence from the end of a URL."""
+    while url:
+        last = url[-1]
+        if last in TRAILING_PUNCTUATION:
+            url = url[:-1]
+        elif last in BRACKETS and url.count(last) > url.count(BRACKETS[last]):
+            url = url[:-1]
+        else:
+            break
+    return url
+
+def find_urls(text: str) -> List[str]:
+    """Returns the URLs of a text in order, without trailing punctuation."""
+    return [_trim_url(match.group(0)) for match in URL_PATTERN.finditer(text)]
+
+def split_context_and_urls(text: str) -> Tuple[str, List[str]]:
+    """Splits a message into its URLs and the instructions around them."""
+    urls = find_urls(text)
+    context = URL_PATTERN.sub(" ", text)
+    return " ".join(context.split()).strip(" :,-"), urls
+
+def extract_context_and_url(text: str) -> List[str]:
+    """
+    Extracts the context and the first URL of a message.
+
+    Returns `[context, url]`, `[url]` for a message that is only a URL, or
+    `[message]` when there is no URL.
+    """
+    context, urls = split_context_and_urls(text)
+    if not urls:
+        return [text.strip()]
+    return [context, urls[0]] if context else [urls[0]]
+
+def youtube_video_id(url: str) -> Optional[str]:
+    """
+    Returns the video id of a YouTube URL, or None for any other URL.
+
+    Handles watch, youtu.be, shorts, embed and live links on the www, mobile,
+    music and no-cookie domains.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    host = host[4:] if host.startswith("www.") else host
+    segments = [segment for segment in parts.path.split("/") if segment]
+
+    video_id = None
+    if host == "youtu.be" and segments:
+        video_id = segments[0]
+    elif host in YOUTUBE_HOSTS:
+        if segments[:1] == ["watch"]:
+            video_id = parse_qs(parts.query).get("v", [None])[0]
+        elif len(segments) >= 2 and segments[0] in YOUTUBE_ID_PATHS:
+            video_id = segments[1]
+    return video_id if video_id and YOUTUBE_ID.match(video_id) else None
+
+def youtube_start_seconds(url: str) -> Optional[int]:
+    """Returns the start time of the `t` (or `start`) parameter of a YouTube URL, in seconds."""
+    query = parse_qs(urlsplit(url).query)
+    value = (query.get("t") or query.get("start") or [""])[0]
+    match = YOUTUBE_TIME.match(value)
+    if not value or not match:
+        return None
+    hours, minutes, seconds = (int(group or 0) for group in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+def normalize_youtube_url(url: str) -> Optional[str]:
+    """
+    Returns the canonical watch URL of a YouTube video, or None if `url` is not one.
+
+    Tracking parameters such as `si` are dropped; use `youtube_start_seconds`
+    for the start time.
+    """
+    video_id = youtube_video_id(url)
+    return f"https://www.youtube.com/watch?v={video_id}" if video_id else None
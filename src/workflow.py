@@ -1,65 +1,103 @@
 import chainlit as cl
 import json
 
-from typing import Dict
-from langchain_core.messages import HumanMessage
+from typing import Dict, Optional
+from langchain_core.messages import BaseMessage, HumanMessage
+from langgraph.graph.state import CompiledStateGraph
 from src.services.file_processing import handle_file_processing
-from src.core.graph_builder import build_graph
+from src.core.graph_builder import get_graph
 from src.services.pdf_processing import content_as_pdf
+from src.utils.config import STREAM_RESPONSES
+from src.utils.llm_setup import STREAM_TAG
 
 
 async def run_agent_workflow(user_message: cl.Message):
     """Run the agent workflow based on the user message"""
-    async with build_graph() as app:
+    app = await get_graph()
 
-        # Prepare the config with thread_id
-        config = {
-            "configurable": {
-                "thread_id": cl.context.session.thread_id
-            }
+    # Prepare the config with thread_id
+    config = {
+        "configurable": {
+            "thread_id": cl.context.session.thread_id
         }
+    }
 
-        if user_message.command:
-            pass
-
-        if user_message.elements:
-            result = await handle_file_processing(user_message)
-            print(f"\n{result}\n")
-            await cl.Message(content=result, elements=[]).send()
-
-        else:
-            # Get the last user message
-            user_msg = [HumanMessage(content=user_message.content)]
-
-            result = await app.ainvoke({"messages": user_msg}, config=config)
-
-            print(f"\n{result}\n")
-
-            if result["messages"][-1].name == "generate_image":
-                image_element = cl.Image(name="Generated Image", path=result["messages"][-1].content)
-                await cl.Message(content="Here's the generated image!", elements=[image_element]).send()
-
-            elif result["messages"][-1].name == "deep_research_report":
-                search_results = result["messages"][-1].content
-                
-                if len(search_results) > 100:
-                    pdf_path = await content_as_pdf(content=search_results)
-                    pdf_element = cl.Pdf(name="Research Report", path=str(pdf_path))
-                    await cl.Message(content=search_results, elements=[pdf_element]).send()
-                
-                else:
-                    await cl.Message(content=search_results, elements=[]).send()
-            
-            elif result["messages"][-1].name == "youtube_transcribe":
-                content = json.loads(result["messages"][-1].content)
-                youtube = cl.Video(name="YouTube Video", url=content[1])
-                await cl.Message(content=content[0], elements=[youtube]).send()
-
-            # elif result["messages"][-1].name == "generate_video":
-            #     video_path = result["messages"][-1].content
-            #     video = cl.Video(name="Generated Video", path=str(video_path))
-            #     await cl.Message(content="Here's the generated video!", elements=[video]).send()
-            
-            else:
-                await cl.Message(content=result["messages"][-1].content, elements=[]).send()
+    if user_message.elements:
+        result = await handle_file_processing(user_message)
+        print(f"\n{result}\n")
+        await cl.Message(content=result, elements=[]).send()
 
+    else:
+        # Get the last user message
+        user_msg = [HumanMessage(content=user_message.content)]
+
+        # The command selected in the UI lets the router skip the supervisor LLM
+        inputs = {"messages": user_msg, "command": user_message.command}
+
+        if STREAM_RESPONSES:
+            await stream_agent_workflow(app, inputs, config)
+            return
+
+        result = await app.ainvoke(inputs, config=config)
+
+        print(f"\n{result}\n")
+
+        await send_final_message(result["messages"][-1])
+
+async def stream_agent_workflow(app: CompiledStateGraph, inputs: Dict, config: Dict) -> None:
+    """
+    Runs the graph and streams tokens from the tagged LLM calls into a single message.
+
+    Only chat models tagged with `STREAM_TAG` (the supervisor and the tool LLMs that
+    write the final answer) are streamed; intermediate calls such as query
+    generation or page summaries stay hidden. Once the run ends, the streamed
+    message is finalized with the last graph message and its attachments.
+    """
+    message = cl.Message(content="")
+
+    async for event in app.astream_events(inputs, config=config, version="v2"):
+        if event["event"] != "on_chat_model_stream" or STREAM_TAG not in event.get("tags", []):
+            continue
+
+        token = event["data"]["chunk"].content
+        if isinstance(token, str):
+            await message.stream_token(token)
+
+    state = await app.aget_state(config)
+    print(f"\n{state.values}\n")
+
+    await send_final_message(state.values["messages"][-1], message=message)
+
+async def send_final_message(last_message: BaseMessage, message: Optional[cl.Message] = None) -> None:
+    """
+    Sends the final answer of a graph run, attaching images, PDFs and videos.
+
+    When `message` was already streamed to the UI, it is finalized in place
+    instead of sending a new one.
+    """
+    message = message or cl.Message(content="")
+    content = last_message.content
+    elements = []
+
+    if last_message.name == "generate_image":
+        elements = [cl.Image(name="Generated Image", path=content)]
+        content = "Here's the generated image!"
+
+    elif last_message.name == "deep_research_report":
+        if len(content) > 100:
+            pdf_path = await content_as_pdf(content=content)
+            elements = [cl.Pdf(name="Research Report", path=str(pdf_path))]
+
+    elif last_message.name == "youtube_transcribe":
+        youtube_content = json.loads(content)
+        elements = [cl.Video(name="YouTube Video", url=youtube_content[1])]
+        content = youtube_content[0]
+
+    # elif last_message.name == "generate_video":
+    #     video_path = last_message.content
+    #     elements = [cl.Video(name="Generated Video", path=str(video_path))]
+    #     content = "Here's the generated video!"
+
+    message.content = content
+    message.elements = elements
+    await message.send()
@@ -0,0 +1,9 @@
+import os
+import re
+
+from pathlib import Path
+
+# `src.utils.config` reads these variables at import; the tests never reach the real services
+CONFIG = Path(__file__).resolve().parent.parent / "src" / "utils" / "config.py"
+for name in re.findall(r'os\.environ\["(\w+)"\]', CONFIG.read_text(encoding="utf-8")):
+    os.environ.setdefault(name, "postgresql://test@localhost/test" if "DATABASE" in name or "URL" in name else "test")
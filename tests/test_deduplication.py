@@ -0,0 +1,51 @@
+import random
+
+from src.services.deduplication import NearDuplicateIndex, canonical_url, hamming_distance, simhash
+
+
+def article(seed: int, words: int = 400) -> str:
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(2000)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+def test_canonical_url_ignores_scheme_www_and_tracking():
+    assert canonical_url("http://www.Example.com/news/?utm_source=x&id=3#top") == "example.com/news?id=3"
+    assert canonical_url("https://example.com/news?id=3") == "example.com/news?id=3"
+    assert canonical_url("https://example.com/news?id=4") != "example.com/news?id=3"
+
+def test_simhash_is_stable_and_ignores_case_and_punctuation():
+    text = article(1)
+
+    assert simhash(text) == simhash(text)
+    assert simhash(text.upper().replace(" ", ", ")) == simhash(text)
+
+def test_small_edits_change_few_bits_and_other_pages_many():
+    text = article(1)
+    edited = "Mirror of the story. " + text
+
+    assert hamming_distance(simhash(text), simhash(edited)) <= 3
+    assert hamming_distance(simhash(text), simhash(article(2))) > 16
+
+def test_index_groups_near_duplicates_with_the_first_page():
+    index = NearDuplicateIndex(similarity=0.95)
+    original = article(1)
+
+    assert index.add(original) is None
+    assert index.add(article(2)) is None
+    assert index.add("Mirror of the story. " + original) == 0
+    assert len(index) == 2
+
+def test_similarity_threshold_sets_the_allowed_bit_distance():
+    assert NearDuplicateIndex(similarity=1.0).max_distance == 0
+    assert NearDuplicateIndex(similarity=0.95).max_distance == 3
+    assert NearDuplicateIndex(similarity=0.9).max_distance == 6
+
+def test_exact_threshold_only_groups_identical_fingerprints():
+    index = NearDuplicateIndex(similarity=1.0)
+    text = article(1)
+    edited = "Mirror of the story. " + text
+
+    index.add(text)
+
+    assert index.add(text) == 0
+    assert index.add(edited) is None
@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from src.agents import deep_search
+from src.utils.metrics import get_counter
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Replaces the network stages with fakes; each page is summarized as its URL."""
+    searched = []
+
+    async def web_search_fanout(query):
+        searched.append(query)
+        return [f"https://example.com/{len(searched)}"]
+
+    async def scrape_link_async(url):
+        return f"Content of {url} " * 50
+
+    async def summarize_pages(pages):
+        return [f"Summary of {page['url']}" for page in pages]
+
+    monkeypatch.setattr(deep_search, "web_search_fanout", web_search_fanout)
+    monkeypatch.setattr(deep_search, "scrape_link_async", scrape_link_async)
+    monkeypatch.setattr(deep_search, "summarize_pages", summarize_pages)
+    monkeypatch.setattr(deep_search, "SUMMARY_BATCH_WAIT", 0)
+    return searched
+
+async def run(question: str, budget: float):
+    deadline = asyncio.get_running_loop().time() + budget
+    return await deep_search.process_search_questions(question, deadline)
+
+def test_failed_query_generation_searches_the_question(monkeypatch, pipeline):
+    async def generate_search_queries(question):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(deep_search, "generate_search_queries", generate_search_queries)
+    failures = get_counter("research_stage_failures_total", stage="queries")
+
+    summaries = asyncio.run(run("solid-state batteries", 5))
+
+    assert pipeline == ["solid-state batteries"]
+    assert summaries == ["URL: https://example.com/1\n\nSummary: Summary of https://example.com/1"]
+    assert get_counter("research_stage_failures_total", stage="queries") == failures + 1
+
+def test_query_generation_timeout_searches_the_question(monkeypatch, pipeline):
+    async def generate_search_queries(question):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(deep_search, "generate_search_queries", generate_search_queries)
+    monkeypatch.setattr(deep_search, "RESEARCH_QUERY_TIMEOUT", 0.05)
+
+    summaries = asyncio.run(run("solid-state batteries", 5))
+
+    assert pipeline == ["solid-state batteries"]
+    assert len(summaries) == 1
+
+def test_work_past_the_deadline_is_dropped_and_awaited(monkeypatch, pipeline):
+    cancelled = []
+
+    async def generate_search_queries(question):
+        return ["fast", "slow"]
+
+    async def scrape_link_async(url):
+        if url.endswith("/2"):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+        return f"Content of {url} " * 50
+
+    monkeypatch.setattr(deep_search, "generate_search_queries", generate_search_queries)
+    monkeypatch.setattr(deep_search, "scrape_link_async", scrape_link_async)
+    dropped = get_counter("research_dropped_total", stage="scrape")
+
+    summaries = asyncio.run(run("question", 0.3))
+
+    assert summaries == ["URL: https://example.com/1\n\nSummary: Summary of https://example.com/1"]
+    assert cancelled == ["https://example.com/2"]
+    assert get_counter("research_dropped_total", stage="scrape") == dropped + 1
+
+def test_nothing_is_dropped_when_the_pipeline_finishes_in_time(monkeypatch, pipeline):
+    async def generate_search_queries(question):
+        return ["one", "two"]
+
+    monkeypatch.setattr(deep_search, "generate_search_queries", generate_search_queries)
+    dropped = sum(get_counter("research_dropped_total", stage=stage) for stage in ("search", "scrape", "summarize"))
+
+    summaries = asyncio.run(run("question", 5))
+
+    assert len(summaries) == 2
+    assert sum(get_counter("research_dropped_total", stage=stage) for stage in ("search", "scrape", "summarize")) == dropped
+
+def test_batch_summary_markers_tolerate_case_and_markdown():
+    reply = (
+        "Here are the summaries.\n"
+        "**[[SOURCE 1]]**\nFirst summary.\n\n"
+        "### [[Source 2]]: Second summary,\nover two lines.\n"
+        "[[source 3]]\n\n"
+    )
+
+    assert deep_search.parse_batch_summary(reply, 3) == {
+        0: "First summary.",
+        1: "Second summary,\nover two lines.",
+    }
+
+def test_batch_summary_with_mismatched_sections_is_rejected():
+    assert deep_search.parse_batch_summary("[[SOURCE 1]]\nOne\n[[SOURCE 3]]\nThree", 2) == {}
+    assert deep_search.parse_batch_summary("[[SOURCE 1]]\nOne\n[[SOURCE 1]]\nAgain", 2) == {}
+    assert deep_search.parse_batch_summary("[[SOURCE 1]]\nOne", 2) == {}
+    assert deep_search.parse_batch_summary("A reply without markers", 2) == {}
+
+def test_mismatched_batch_reply_falls_back_to_one_summary_per_page(monkeypatch):
+    class Reply:
+        content = "[[SOURCE 1]]\nOne\n[[SOURCE 2]]\nTwo\n[[SOURCE 3]]\nA page that was never sent"
+
+    async def fake_llm(**kwargs):
+        return None
+
+    async def coalesced_ainvoke(model, prompt):
+        return Reply()
+
+    async def summarize_page(page):
+        return f"Alone: {page['url']}"
+
+    monkeypatch.setattr(deep_search, "get_gemini_llm", fake_llm)
+    monkeypatch.setattr(deep_search, "get_openrouter_llm", fake_llm)
+    monkeypatch.setattr(deep_search, "coalesced_ainvoke", coalesced_ainvoke)
+    monkeypatch.setattr(deep_search, "summarize_page", summarize_page)
+    pages = [{"question": "q", "url": f"https://example.com/{i}", "text": "Some text."} for i in (1, 2)]
+
+    summaries = asyncio.run(deep_search.summarize_pages(pages))
+
+    assert summaries == ["Alone: https://example.com/1", "Alone: https://example.com/2"]
+
+def test_benchmark_model_answers_the_batch_prompt_with_every_section(monkeypatch):
+    from benchmarks.deep_research import FakeChatModel
+
+    async def fake_llm(**kwargs):
+        return FakeChatModel(latency=0, output_tokens=20)
+
+    async def summarize_page(page):
+        raise AssertionError(f"{page['url']} fell back to a single summary")
+
+    monkeypatch.setattr(deep_search, "get_gemini_llm", fake_llm)
+    monkeypatch.setattr(deep_search, "get_openrouter_llm", fake_llm)
+    monkeypatch.setattr(deep_search, "summarize_page", summarize_page)
+    pages = [{"question": "q", "url": f"https://example.com/{i}", "text": "Some text."} for i in (1, 2, 3)]
+    before = get_counter("summary_batches_total", outcome="complete")
+
+    summaries = asyncio.run(deep_search.summarize_pages(pages))
+
+    assert all(summaries)
+    assert get_counter("summary_batches_total", outcome="complete") == before + 1
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+from types import SimpleNamespace
+from typing import Awaitable
+
+from src.services import html_extraction
+from src.services.html_extraction import aextract_main_content, extract_main_content
+from src.services.passage_ranking import aselect_passages, select_passages
+from src.utils import llm_setup
+
+PROBE_INTERVAL = 0.01
+# A blocking call in any of these paths stalls the loop for ~0.5 s or more
+MAX_LAG = 0.15
+
+
+async def max_loop_lag(work: Awaitable) -> float:
+    """Runs `work` next to a probe that measures how late `asyncio.sleep(0.01)` wakes up."""
+    loop = asyncio.get_running_loop()
+    lags = []
+    done = asyncio.Event()
+
+    async def probe() -> None:
+        while not done.is_set():
+            start = loop.time()
+            await asyncio.sleep(PROBE_INTERVAL)
+            lags.append(loop.time() - start - PROBE_INTERVAL)
+
+    task = asyncio.ensure_future(probe())
+    await asyncio.sleep(0)
+    try:
+        await work
+    finally:
+        done.set()
+        await task
+    return max(lags)
+
+def big_page(paragraphs: int = 60000) -> bytes:
+    body = "".join(
+        f"<p>Paragraph {i} about batteries, solar storage and grid investment in {1990 + i % 30}.</p>"
+        for i in range(paragraphs)
+    )
+    return f"<html><body><nav><a href='/'>Home</a></nav><article>{body}</article></body></html>".encode()
+
+
+class SlowGeminiClient:
+    """Fake genai client: the sync API blocks the thread, the async API only awaits."""
+    def __init__(self, delay: float):
+        async def agenerate(**kwargs):
+            await asyncio.sleep(delay)
+            return SimpleNamespace(text="transcript", usage_metadata=None)
+
+        def generate(**kwargs):
+            time.sleep(delay)
+            return SimpleNamespace(text="transcript", usage_metadata=None)
+
+        self.models = SimpleNamespace(generate_content=generate)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=agenerate))
+
+
+def test_slow_gemini_call_does_not_block_the_loop(monkeypatch):
+    async def get_client(key=None):
+        return SlowGeminiClient(delay=0.5)
+    monkeypatch.setattr(llm_setup, "get_gemini_client", get_client)
+
+    async def main() -> float:
+        call = llm_setup.generate_gemini_content(model="fake-model", contents="hello", timeout=5)
+        return await max_loop_lag(call)
+
+    assert asyncio.run(main()) < MAX_LAG
+
+def test_html_extraction_runs_off_the_loop():
+    html = big_page()
+    start = time.perf_counter()
+    extract_main_content(html)
+    # The test only means something if extraction is slow enough to be noticed
+    assert time.perf_counter() - start > MAX_LAG
+
+    async def main() -> float:
+        return await max_loop_lag(aextract_main_content(html))
+
+    try:
+        assert asyncio.run(main()) < MAX_LAG
+    finally:
+        html_extraction.close_extraction_pool()
+
+def test_passage_ranking_runs_off_the_loop():
+    text = extract_main_content(big_page())
+    start = time.perf_counter()
+    select_passages(text, "solar storage investment")
+    assert time.perf_counter() - start > MAX_LAG
+
+    async def main() -> float:
+        return await max_loop_lag(aselect_passages(text, "solar storage investment"))
+
+    assert asyncio.run(main()) < MAX_LAG
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from src.utils import hedging
+from src.utils.hedging import HedgedModel
+from src.utils.metrics import CACHE_HIT
+
+
+@pytest.fixture(autouse=True)
+def hedging_on(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(hedging, "HEDGE_DEFAULT_DELAY", 0.05)
+    monkeypatch.setattr(hedging, "HEDGE_MAX_RATIO", 1.0)
+
+
+def model(answer: str, delay: float = 0.0, error: Exception = None) -> RunnableLambda:
+    calls = []
+
+    async def call(input):
+        calls.append(input)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return answer
+
+    runnable = RunnableLambda(call)
+    runnable.calls = calls
+    return runnable
+
+def test_fast_primary_is_not_hedged():
+    secondary = model("secondary")
+    hedged = HedgedModel("test-fast", model("primary"), secondary)
+
+    assert asyncio.run(hedged.ainvoke("hi")) == "primary"
+    assert secondary.calls == []
+    assert list(hedging._stats["test-fast"].hedged) == [False]
+    assert len(hedging._stats["test-fast"].latencies) == 1
+
+def test_slow_primary_is_hedged_and_its_censored_latency_recorded():
+    hedged = HedgedModel("test-slow", model("primary", delay=1), model("secondary"))
+
+    async def main():
+        answer = await hedged.ainvoke("hi")
+        # Let the cancelled primary run its done callback
+        await asyncio.sleep(0)
+        return answer
+
+    assert asyncio.run(main()) == "secondary"
+    stats = hedging._stats["test-slow"]
+    assert list(stats.hedged) == [True]
+    # The cancelled primary counts with at least the time it had been running
+    assert len(stats.latencies) == 1 and stats.latencies[0] >= 0.05
+
+def test_primary_failing_before_the_delay_fails_over():
+    secondary = model("secondary")
+    hedged = HedgedModel("test-failover", model("primary", error=RuntimeError("503")), secondary)
+
+    assert asyncio.run(hedged.ainvoke("hi")) == "secondary"
+    assert secondary.calls == ["hi"]
+    # Failed calls say nothing about latency
+    assert len(hedging._stats["test-failover"].latencies) == 0
+
+def test_failover_respects_the_hedge_budget(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGE_MAX_RATIO", 0.0)
+    secondary = model("secondary")
+    hedged = HedgedModel("test-budget", model("primary", error=RuntimeError("503")), secondary)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(hedged.ainvoke("hi"))
+    assert secondary.calls == []
+
+def test_primary_error_is_raised_when_both_fail():
+    hedged = HedgedModel(
+        "test-both",
+        model("primary", error=RuntimeError("primary down")),
+        model("secondary", error=RuntimeError("secondary down")),
+    )
+    with pytest.raises(RuntimeError, match="primary down"):
+        asyncio.run(hedged.ainvoke("hi"))
+
+def test_cache_hits_are_not_recorded_as_primary_latency():
+    cached = AIMessage(content="cached", response_metadata={CACHE_HIT: True})
+    hedged = HedgedModel("test-cached", RunnableLambda(lambda input: cached), model("secondary"))
+
+    assert asyncio.run(hedged.ainvoke("hi")) == cached
+    assert len(hedging._stats["test-cached"].latencies) == 0
+    assert list(hedging._stats["test-cached"].hedged) == [False]
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from src.utils import helpers
+from src.utils.helpers import parse_json_tolerant
+from src.utils.metrics import get_counter
+
+
+@pytest.mark.parametrize("text, value", [
+    ('["a", "b"]', ["a", "b"]),
+    ('```json\n["a", "b"]\n```', ["a", "b"]),
+    ('```\n{"queries": ["a"]}\n```', {"queries": ["a"]}),
+    ('Here are the queries: ["a", "b"]. Hope this helps!', ["a", "b"]),
+    ("[“smart quotes”, “b”]", ["smart quotes", "b"]),
+    ("['single', 'quotes']", ["single", "quotes"]),
+    ('["a", "b",]', ["a", "b"]),
+    ('{"done": true, "next": null, "items": ["true", "null"],}', {"done": True, "next": None, "items": ["true", "null"]}),
+    ('["a [bracket] inside", "b"] and [another list]', ["a [bracket] inside", "b"]),
+    ("Queries:\n1. first query\n2) second query\n- \"third query\"", ["first query", "second query", "third query"]),
+])
+def test_parse_json_tolerant_recovers_common_llm_output(text, value):
+    assert parse_json_tolerant(text) == value
+
+def test_parse_json_tolerant_gives_up_without_json():
+    failed = get_counter("json_parse_total", method="failed")
+
+    assert parse_json_tolerant("I could not come up with any queries.") is None
+    assert parse_json_tolerant('["unterminated", "list"') is None
+    assert get_counter("json_parse_total", method="failed") == failed + 2
+
+def test_json_loads_keeps_non_empty_queries_without_calling_the_llm(monkeypatch):
+    async def no_llm(*args, **kwargs):
+        raise AssertionError("the LLM repair should not run")
+
+    monkeypatch.setattr(helpers, "_repair_with_llm", no_llm)
+
+    assert asyncio.run(helpers.json_loads('{"queries": ["a", "", 3, "b"]}')) == ["a", "b"]
+
+def test_unparseable_json_is_repaired_by_the_llm(monkeypatch):
+    class Reply:
+        content = '```json\n["fixed query"]\n```'
+
+    class FakeModel:
+        async def ainvoke(self, prompt):
+            return Reply()
+
+    async def get_gemini_llm(**kwargs):
+        return FakeModel()
+
+    monkeypatch.setattr(helpers, "get_gemini_llm", get_gemini_llm)
+    repaired = get_counter("json_llm_repairs_total", caller="search_queries", outcome="ok")
+
+    assert asyncio.run(helpers.json_loads("no json at all")) == ["fixed query"]
+    assert get_counter("json_llm_repairs_total", caller="search_queries", outcome="ok") == repaired + 1
@@ -0,0 +1,181 @@
+import asyncio
+import types
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+
+from src.core import history, supervisor
+from src.core.history import manage_history, split_turns, trim_to_budget
+from src.utils.metrics import get_counter
+
+CONFIG = {"configurable": {"thread_id": "thread-1"}}
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_KEEP_TURNS", 2)
+    monkeypatch.setattr(history, "HISTORY_MAX_TURNS", 3)
+    monkeypatch.setattr(history, "HISTORY_TOKEN_BUDGET", 100_000)
+    monkeypatch.setattr(history, "HISTORY_TOOL_OUTPUT_TOKENS", 50)
+    history._pending_folds.clear()
+    yield
+    history._pending_folds.clear()
+
+def turn(index: int, output: str = "short answer") -> list:
+    return [
+        HumanMessage(content=f"question {index}", id=f"human-{index}"),
+        AIMessage(content="", id=f"call-{index}", tool_calls=[{"name": "scrape_link", "args": {"user_message": "x"}, "id": f"tool-{index}"}]),
+        ToolMessage(content=output, name="scrape_link", tool_call_id=f"tool-{index}", id=f"output-{index}"),
+    ]
+
+def conversation(turns: int) -> list:
+    return [message for index in range(turns) for message in turn(index)]
+
+def test_split_turns_starts_a_turn_at_each_user_message():
+    assert [len(t) for t in split_turns(conversation(3))] == [3, 3, 3]
+
+def test_large_earlier_tool_outputs_are_stubbed_keeping_their_id():
+    messages = turn(0, "page text " * 200) + turn(1, "page text " * 200)
+
+    update = asyncio.run(manage_history({"messages": messages}, CONFIG))
+
+    [stub] = update["messages"]
+    assert stub.id == "output-0" and stub.tool_call_id == "tool-0"
+    assert stub.content.startswith("[Output of scrape_link from an earlier turn")
+    assert "summary" not in update
+
+def fake_summarizer(monkeypatch, error: Exception = None):
+    """Replaces the summarizer with one that waits for `release` and records the folded message ids."""
+    summarizer = types.SimpleNamespace(calls=[], release=None)
+
+    async def summarize_turns(summary, turns):
+        summarizer.calls.append((summary, [message.id for t in turns for message in t]))
+        await summarizer.release.wait()
+        if error:
+            raise error
+        return f"Summary of {len(summarizer.calls)} folds."
+
+    monkeypatch.setattr(history, "summarize_turns", summarize_turns)
+    return summarizer
+
+FIRST_TWO_TURNS = [f"{kind}-{i}" for i in (0, 1) for kind in ("human", "call", "output")]
+
+def test_fold_runs_in_the_background_and_applies_on_a_later_turn(monkeypatch):
+    summarizer = fake_summarizer(monkeypatch)
+
+    async def main():
+        summarizer.release = asyncio.Event()
+        first = await manage_history({"messages": conversation(5), "summary": "Old summary."}, CONFIG)
+        # Still summarizing: the next turn keeps the old summary and all its turns
+        second = await manage_history({"messages": conversation(6), "summary": "Old summary."}, CONFIG)
+        summarizer.release.set()
+        await asyncio.sleep(0.01)
+        third = await manage_history({"messages": conversation(7), "summary": "Old summary."}, CONFIG)
+        return first, second, third
+
+    first, second, third = asyncio.run(main())
+
+    assert first == {} and second == {}
+    assert summarizer.calls[0] == ("Old summary.", FIRST_TWO_TURNS)
+    assert third["summary"] == "Summary of 1 folds."
+    assert [m.id for m in third["messages"] if isinstance(m, RemoveMessage)] == FIRST_TWO_TURNS
+
+def test_failed_fold_keeps_the_turns_and_the_previous_summary(monkeypatch):
+    summarizer = fake_summarizer(monkeypatch, error=RuntimeError("quota exceeded"))
+
+    async def main():
+        summarizer.release = asyncio.Event()
+        summarizer.release.set()
+        await manage_history({"messages": conversation(5), "summary": "Old summary."}, CONFIG)
+        await asyncio.sleep(0.01)
+        return await manage_history({"messages": conversation(6), "summary": "Old summary."}, CONFIG)
+
+    update = asyncio.run(main())
+
+    assert update == {}
+    # The fold is tried again on the next turn
+    assert len(summarizer.calls) == 2
+
+def test_fold_is_dropped_when_its_turns_are_gone(monkeypatch):
+    summarizer = fake_summarizer(monkeypatch)
+
+    async def main():
+        summarizer.release = asyncio.Event()
+        summarizer.release.set()
+        await manage_history({"messages": conversation(5)}, CONFIG)
+        await asyncio.sleep(0.01)
+        # e.g. the thread was edited while the summary was being written
+        return await manage_history({"messages": conversation(6)[3:]}, CONFIG)
+
+    update = asyncio.run(main())
+
+    assert "summary" not in update
+    assert not any(isinstance(message, RemoveMessage) for message in update.get("messages", []))
+
+def test_trim_keeps_the_most_recent_turns_within_the_budget(monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_TOKEN_BUDGET", 250)
+    # About 100 tokens per turn
+    messages = [message for index in range(5) for message in turn(index, "x" * 400)]
+    before = get_counter("history_turns_trimmed_total")
+
+    trimmed = trim_to_budget(messages)
+
+    assert [message.id for message in trimmed[::3]] == ["human-2", "human-3", "human-4"]
+    assert get_counter("history_turns_trimmed_total") == before + 2
+    # The summary counts towards the budget
+    assert [message.id for message in trim_to_budget(messages, "y" * 400)[::3]] == ["human-3", "human-4"]
+    assert trim_to_budget(messages[:6]) == messages[:6]
+
+def test_trim_always_keeps_the_current_turn(monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_TOKEN_BUDGET", 5)
+    messages = turn(0) + turn(1, "x" * 400)
+
+    assert trim_to_budget(messages) == messages[3:]
+    assert trim_to_budget([]) == []
+
+def test_supervisor_gets_a_trimmed_history_while_the_fold_is_pending(monkeypatch):
+    summarizer = fake_summarizer(monkeypatch)
+    monkeypatch.setattr(history, "HISTORY_TOKEN_BUDGET", 250)
+    sent = []
+
+    class Model:
+        async def ainvoke(self, messages):
+            sent.append(messages)
+            return AIMessage(content="answer")
+
+    async def get_model_with_tools():
+        return Model()
+
+    monkeypatch.setattr(supervisor, "get_model_with_tools", get_model_with_tools)
+    state = {"messages": [message for index in range(6) for message in turn(index, "x" * 400)], "summary": "Old summary."}
+
+    async def main():
+        summarizer.release = asyncio.Event()
+        await manage_history(state, CONFIG)
+        assert "thread-1" in history._pending_folds
+        await supervisor.supervisor_agent(state)
+        summarizer.release.set()
+
+    asyncio.run(main())
+
+    summary, *messages = sent[0]
+    assert summary.content.endswith("Old summary.")
+    assert [message.id for message in messages[::3]] == ["human-3", "human-4", "human-5"]
+
+def test_folds_not_applied_within_the_ttl_are_dropped(monkeypatch):
+    summarizer = fake_summarizer(monkeypatch)
+
+    async def main():
+        summarizer.release = asyncio.Event()
+        await manage_history({"messages": conversation(5)}, CONFIG)
+        stale = history._pending_folds["thread-1"]
+        monkeypatch.setattr(history, "PENDING_FOLD_TTL", -1)
+        # Any later turn, here of another thread, drops it
+        await manage_history({"messages": conversation(1)}, {"configurable": {"thread_id": "thread-2"}})
+        await asyncio.sleep(0)
+        return stale
+
+    stale = asyncio.run(main())
+
+    assert "thread-1" not in history._pending_folds
+    assert stale.task.cancelled()
@@ -0,0 +1,89 @@
+import asyncio
+
+from pathlib import Path
+from src.services import html_extraction
+from src.services.html_extraction import aextract_main_content, extract_main_content
+
+ARTICLE = " ".join(["Solid-state batteries use a ceramic electrolyte instead of a liquid one."] * 5)
+
+PAGE = f"""
+<html>
+<head><title>Batteries</title><script>track()</script><style>p {{ color: red }}</style></head>
+<body>
+  <nav><ul><li><a href="/">Home</a></li><li><a href="/news">News</a></li></ul></nav>
+  <div class="cookie-banner">We use cookies to improve your experience.</div>
+  <article>
+    <h1>Solid-state batteries</h1>
+    <p>{ARTICLE}</p>
+    <p>Read the <a href="/papers/1">original paper</a> or run <code>pip install cells</code>.</p>
+    <ul><li>Safer</li><li>Denser<ul><li>By about <strong>50%</strong></li></ul></li></ul>
+    <pre>capacity = 4.2 * 1000</pre>
+    <table><tr><th>Cell</th><th>Wh/kg</th></tr><tr><td>Li-ion</td><td>250</td></tr></table>
+  </article>
+  <aside>Related: the best phones of the year</aside>
+  <footer>Copyright 2024</footer>
+</body>
+</html>
+""".encode()
+
+FIXTURES = Path(__file__).parents[1] / "benchmarks" / "fixtures" / "html"
+
+
+def test_main_content_is_rendered_as_markdown():
+    text = extract_main_content(PAGE, "utf-8", "https://example.com/science/batteries")
+
+    assert text.split("\n\n") == [
+        "# Solid-state batteries",
+        ARTICLE,
+        "Read the [original paper](https://example.com/papers/1) or run `pip install cells`.",
+        "- Safer",
+        "- Denser",
+        "  - By about **50%**",
+        "```\ncapacity = 4.2 * 1000\n```",
+        "| Cell | Wh/kg |",
+        "| Li-ion | 250 |",
+    ]
+
+def test_boilerplate_is_stripped():
+    text = extract_main_content(PAGE, "utf-8")
+
+    for boilerplate in ("track()", "color: red", "Home", "cookies", "best phones", "Copyright"):
+        assert boilerplate not in text
+
+def test_links_stay_relative_without_the_page_url():
+    assert "[original paper]" not in extract_main_content(PAGE, "utf-8")
+
+def test_page_without_article_uses_the_densest_paragraph_parent():
+    page = f"""<html><body>
+      <div class="header">Site name</div>
+      <div id="content"><p>{ARTICLE}</p><p>Second paragraph.</p></div>
+      <div><p>Short note.</p></div>
+    </body></html>""".encode()
+
+    assert extract_main_content(page) == f"{ARTICLE}\n\nSecond paragraph."
+
+def test_empty_page_gives_no_text():
+    assert extract_main_content(b"  ") == ""
+
+def test_worker_pool_is_started_lazily_without_fork(monkeypatch):
+    monkeypatch.setattr(html_extraction, "EXTRACTION_WORKERS", 1)
+    html_extraction.close_extraction_pool()
+    assert html_extraction._pool is None
+
+    try:
+        text = asyncio.run(aextract_main_content(PAGE, "utf-8", "https://example.com/"))
+        start_method = html_extraction._pool._mp_context.get_start_method()
+    finally:
+        html_extraction.close_extraction_pool()
+
+    assert text == extract_main_content(PAGE, "utf-8", "https://example.com/")
+    assert start_method in ("forkserver", "spawn")
+
+def test_saved_pages_keep_the_content_and_drop_the_site_navigation():
+    pages = sorted(FIXTURES.glob("*.html"))
+    assert pages
+
+    for path in pages:
+        text = extract_main_content(path.read_bytes())
+        assert len(text) > 4000, path.name
+    assert "About this documentation" not in extract_main_content((FIXTURES / "nodejs-path.html").read_bytes())
@@ -0,0 +1,269 @@
+import asyncio
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, List, Optional
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.utils.key_pool import KeyPool, PooledChatModel, PooledKey
+from src.utils.llm_setup import gemini_key_model, openrouter_key_model
+from src.utils.rate_limiter import BucketRateLimiter, TokenBucket
+
+
+class ProviderError(Exception):
+    """Provider error carrying an HTTP status, like the OpenAI and Google SDK errors."""
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FakeEndpoint(BaseChatModel):
+    """Chat model of one API key: raises the queued errors first, then answers."""
+    name: str
+    errors: List[Any] = []
+    calls: int = 0
+    total_tokens: int = 10
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-endpoint"
+
+    def _message(self) -> AIMessage:
+        usage = {"input_tokens": self.total_tokens - 1, "output_tokens": 1, "total_tokens": self.total_tokens}
+        return AIMessage(content=f"answer from {self.name}", usage_metadata=usage)
+
+    def _next_error(self) -> Optional[Exception]:
+        self.calls += 1
+        return self.errors.pop(0) if self.errors else None
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        error = self._next_error()
+        if error:
+            raise error
+        return ChatResult(generations=[ChatGeneration(message=self._message())])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return self._generate(messages)
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        error = self._next_error()
+        if error == "after-first-chunk":
+            yield ChatGenerationChunk(message=AIMessageChunk(content="partial "))
+            raise ProviderError(503)
+        if error:
+            raise error
+        for word in ("answer ", "from ", self.name):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_pool(clock: FakeClock, *endpoints: FakeEndpoint) -> PooledChatModel:
+    pool = KeyPool(
+        "fake",
+        [PooledKey(endpoint.name, f"secret-{endpoint.name}") for endpoint in endpoints],
+        base_cooldown=5,
+        max_cooldown=20,
+        clock=clock,
+    )
+    return PooledChatModel(pool=pool, model_name="fake-model", models={endpoint.name: endpoint for endpoint in endpoints})
+
+def key(model: PooledChatModel, name: str) -> PooledKey:
+    return next(key for key in model.pool.keys if key.name == name)
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retryable_error_fails_over_to_the_next_key(status):
+    clock = FakeClock()
+    first = FakeEndpoint(name="first", errors=[ProviderError(status)])
+    second = FakeEndpoint(name="second")
+    model = make_pool(clock, first, second)
+
+    message = asyncio.run(model.ainvoke("hello"))
+
+    assert message.content == "answer from second"
+    assert (first.calls, second.calls) == (1, 1)
+    assert key(model, "first").cooldown_until == clock.now + 5
+    assert key(model, "second").cooldown_until == 0
+    assert all(pooled.outstanding == 0 for pooled in model.pool.keys)
+
+def test_key_in_cooldown_is_skipped_until_it_recovers():
+    clock = FakeClock()
+    first = FakeEndpoint(name="first", errors=[ProviderError(429)])
+    second = FakeEndpoint(name="second")
+    model = make_pool(clock, first, second)
+
+    model.invoke("hello")
+    model.invoke("hello")
+    assert (first.calls, second.calls) == (1, 2)
+
+    clock.now += 5
+    assert model.invoke("hello").content == "answer from first"
+
+def test_cooldown_doubles_on_consecutive_failures_up_to_the_maximum():
+    clock = FakeClock()
+    model = make_pool(clock, FakeEndpoint(name="only"))
+    pooled = key(model, "only")
+
+    cooldowns = []
+    for _ in range(4):
+        model.pool.acquire()
+        model.pool.release(pooled, ProviderError(429))
+        cooldowns.append(pooled.cooldown_until - clock.now)
+    assert cooldowns == [5, 10, 20, 20]
+
+    # A success resets the backoff
+    model.pool.acquire()
+    model.pool.release(pooled)
+    model.pool.acquire()
+    model.pool.release(pooled, ProviderError(503))
+    assert pooled.cooldown_until - clock.now == 5
+
+def test_non_retryable_error_is_raised_without_failover():
+    clock = FakeClock()
+    first = FakeEndpoint(name="first", errors=[ProviderError(400)])
+    second = FakeEndpoint(name="second")
+    model = make_pool(clock, first, second)
+
+    with pytest.raises(ProviderError):
+        model.invoke("hello")
+    assert second.calls == 0
+    assert key(model, "first").cooldown_until == 0
+
+def test_error_is_raised_once_every_key_failed():
+    clock = FakeClock()
+    first = FakeEndpoint(name="first", errors=[ProviderError(429)])
+    second = FakeEndpoint(name="second", errors=[ProviderError(503)])
+    model = make_pool(clock, first, second)
+
+    with pytest.raises(ProviderError) as error:
+        asyncio.run(model.ainvoke("hello"))
+    assert error.value.status_code == 503
+    assert (first.calls, second.calls) == (1, 1)
+
+def test_stream_fails_over_only_before_the_first_chunk():
+    clock = FakeClock()
+    first = FakeEndpoint(name="first", errors=[ProviderError(429)])
+    second = FakeEndpoint(name="second")
+    model = make_pool(clock, first, second)
+
+    async def collect() -> str:
+        return "".join([chunk.content async for chunk in model.astream("hello")])
+
+    assert asyncio.run(collect()) == "answer from second"
+
+    # Once a chunk reached the caller, switching keys would duplicate output
+    clock.now += 100
+    first.errors = ["after-first-chunk"]
+    with pytest.raises(ProviderError):
+        asyncio.run(collect())
+    assert second.calls == 1
+
+def test_reported_tokens_are_charged_to_the_key_budget():
+    clock = FakeClock()
+    bucket = TokenBucket(requests_per_second=100, max_bucket_size=100, tokens_per_minute=1000, clock=clock)
+    endpoint = FakeEndpoint(name="only", total_tokens=250, rate_limiter=BucketRateLimiter(bucket))
+    model = make_pool(clock, endpoint)
+
+    asyncio.run(model.ainvoke("hello"))
+    model.invoke("hello")
+
+    assert bucket._tokens_available == 500
+
+
+class ProviderHandler(BaseHTTPRequestHandler):
+    """
+    Local Gemini (REST) and OpenAI-compatible endpoint.
+
+    Keys starting with "exhausted" get a 429 and keys starting with "down" a
+    503 with a retry-after, like a throttled or overloaded provider.
+    """
+    requests: List[str] = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        key = self.headers.get("x-goog-api-key") or self.headers.get("Authorization", "").removeprefix("Bearer ")
+        self.requests.append(key)
+        headers = {}
+        if key.startswith("exhausted"):
+            status, body = 429, {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}}
+        elif key.startswith("down"):
+            status, body = 503, {"error": {"code": 503, "message": "The model is overloaded", "status": "UNAVAILABLE"}}
+            headers["Retry-After"] = "5"
+        elif "chat/completions" in self.path:
+            status, body = 200, {
+                "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "test-model",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": f"answer with {key}"}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+            }
+        else:
+            status, body = 200, {
+                "candidates": [{"content": {"parts": [{"text": f"answer with {key}"}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+                "usageMetadata": {"promptTokenCount": 3, "candidatesTokenCount": 2, "totalTokenCount": 5},
+            }
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in {**headers, "Content-Type": "application/json", "Content-Length": str(len(data))}.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def provider_url():
+    ProviderHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ProviderHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+def http_pool(*values: str) -> KeyPool:
+    return KeyPool("test", [PooledKey(value, value) for value in values], clock=FakeClock())
+
+@pytest.mark.parametrize("bad_key", ["exhausted-key", "down-key"])
+def test_gemini_sdk_errors_fail_over_without_sdk_retries(provider_url, bad_key):
+    pool = http_pool(bad_key, "good-key")
+    model = PooledChatModel(pool=pool, model_name="gemini-test", models={
+        key.name: gemini_key_model("gemini-test", key.value, transport="rest", client_options={"api_endpoint": provider_url})
+        for key in pool.keys
+    })
+
+    start = time.perf_counter()
+    answer = model.invoke("hello")
+
+    assert answer.content == "answer with good-key"
+    # One request per key: the throttled key was not retried by the SDK
+    assert ProviderHandler.requests == [bad_key, "good-key"]
+    assert time.perf_counter() - start < 1
+    assert pool.keys[0].failures == 1 and pool.keys[0].cooldown_until > 0
+
+@pytest.mark.parametrize("bad_key", ["exhausted-key", "down-key"])
+def test_openai_sdk_errors_fail_over_without_sdk_retries(provider_url, bad_key):
+    pool = http_pool(bad_key, "good-key")
+    model = PooledChatModel(pool=pool, model_name="test-model", models={
+        key.name: openrouter_key_model("test-model", key.value, base_url=f"{provider_url}/v1")
+        for key in pool.keys
+    })
+
+    start = time.perf_counter()
+    answer = asyncio.run(model.ainvoke("hello"))
+
+    assert answer.content == "answer with good-key"
+    # The retry-after of the 503 is not waited for
+    assert ProviderHandler.requests == [bad_key, "good-key"]
+    assert time.perf_counter() - start < 1
+    assert pool.keys[0].failures == 1
@@ -0,0 +1,72 @@
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.utils.llm_cache import LLMCache, TieredCacheStore, cache_key
+from src.utils.metrics import LLMMetricsCallbackHandler, get_counter, get_histogram, served_from_cache
+
+LLM = "fake-model"
+
+
+def answer(text: str) -> list:
+    return [ChatGeneration(message=AIMessage(content=text))]
+
+def test_formatting_only_differences_share_a_key():
+    assert cache_key("What  is\n the answer?", LLM) == cache_key("What is the answer?", LLM)
+    assert cache_key("What is the answer?", LLM) != cache_key("What is the question?", LLM)
+
+def test_namespaces_do_not_share_entries(tmp_path):
+    store = TieredCacheStore(tmp_path / "cache.sqlite", max_memory_entries=8, max_disk_bytes=10**6)
+    conversation = LLMCache("conversation", ttl=86400, store=store)
+    queries = LLMCache("research_queries", ttl=0.05, store=store)
+
+    conversation.update("hello", LLM, answer("long lived"))
+    assert queries.lookup("hello", LLM) is None
+
+    queries.update("hello", LLM, answer("short lived"))
+    time.sleep(0.1)
+    # The short TTL of one namespace does not expire, nor get served by, the other
+    assert queries.lookup("hello", LLM) is None
+    assert conversation.lookup("hello", LLM)[0].message.content == "long lived"
+
+def test_disk_entries_survive_a_new_store(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    LLMCache("code", ttl=60, store=TieredCacheStore(path, 8, 10**6)).update("sort a list", LLM, answer("sorted()"))
+
+    cache = LLMCache("code", ttl=60, store=TieredCacheStore(path, 8, 10**6))
+    assert cache.lookup("sort a list", LLM)[0].message.content == "sorted()"
+
+class CountingModel(BaseChatModel):
+    """Chat model that answers with its call count and reports token usage."""
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        usage = {"input_tokens": 7, "output_tokens": 3, "total_tokens": 10}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"answer {self.calls}", usage_metadata=usage))])
+
+def test_cache_hits_are_not_counted_as_paid_calls(tmp_path):
+    labels = {"provider": "test", "model": "counting-cache"}
+    cache = LLMCache("metrics", ttl=60, store=TieredCacheStore(tmp_path / "cache.sqlite", 8, 10**6))
+    model = CountingModel(cache=cache, callbacks=[LLMMetricsCallbackHandler(**labels)])
+
+    first = model.invoke("hello")
+    tokens = get_counter("llm_tokens_total", direction="input", **labels)
+    latencies = get_histogram("llm_latency_seconds", **labels).count
+    second = model.invoke("hello")
+
+    assert second.content == first.content == "answer 1"
+    assert not served_from_cache(first) and served_from_cache(second)
+    assert get_counter("llm_calls_total", status="success", **labels) == 1
+    assert get_counter("llm_calls_total", status="cached", **labels) == 1
+    assert get_counter("llm_tokens_total", direction="input", **labels) == tokens == 7
+    assert get_histogram("llm_latency_seconds", **labels).count == latencies == 1
+    # The stored entry is not flagged, only the copies served from it
+    [(_, stored)] = cache.store._memory.values()
+    assert not served_from_cache(stored[0].message)
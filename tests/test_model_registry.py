@@ -0,0 +1,61 @@
+from src.utils.model_registry import ModelRegistry
+from src.utils.metrics import get_counter
+
+
+def builder():
+    built = []
+
+    def build():
+        built.append(object())
+        return built[-1]
+
+    build.built = built
+    return build
+
+def test_entry_is_built_once_for_the_same_settings():
+    registry, build = ModelRegistry(), builder()
+    hits = get_counter("model_registry_requests_total", result="hit")
+
+    first = registry.get("gemini", {"model": "flash", "key": "k1"}, build)
+    second = registry.get("gemini", {"model": "flash", "key": "k1"}, build)
+
+    assert first is second
+    assert len(build.built) == 1
+    assert get_counter("model_registry_requests_total", result="hit") == hits + 1
+
+def test_changed_settings_rebuild_the_entry():
+    registry, build = ModelRegistry(), builder()
+    refreshes = get_counter("model_registry_requests_total", result="refresh")
+
+    first = registry.get("gemini", {"model": "flash", "key": "k1"}, build)
+    rotated = registry.get("gemini", {"model": "flash", "key": "k2"}, build)
+
+    assert rotated is not first
+    assert registry.get("gemini", {"model": "flash", "key": "k2"}, build) is rotated
+    assert len(registry) == 1
+    assert get_counter("model_registry_requests_total", result="refresh") == refreshes + 1
+
+def test_keys_are_cached_separately():
+    registry, build = ModelRegistry(), builder()
+
+    interactive = registry.get(("gemini", "interactive"), "settings", build)
+    background = registry.get(("gemini", "background"), "settings", build)
+
+    assert interactive is not background
+    assert len(registry) == 2
+
+def test_fingerprint_is_stable_and_hides_the_settings():
+    fingerprint = ModelRegistry.fingerprint(("flash", "secret-api-key"))
+
+    assert fingerprint == ModelRegistry.fingerprint(("flash", "secret-api-key"))
+    assert fingerprint != ModelRegistry.fingerprint(("flash", "other-api-key"))
+    assert "secret" not in fingerprint
+
+def test_clear_rebuilds_every_entry():
+    registry, build = ModelRegistry(), builder()
+    first = registry.get("gemini", "settings", build)
+
+    registry.clear()
+
+    assert len(registry) == 0
+    assert registry.get("gemini", "settings", build) is not first
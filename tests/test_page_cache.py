@@ -0,0 +1,121 @@
+import asyncio
+import os
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.services import search_and_scrape
+from src.utils.metrics import get_counter
+from src.utils.page_cache import PageCache, hit_ratio, normalize_url
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PageCache(tmp_path / "page_cache.sqlite", ttl=60, max_bytes=1_000_000)
+
+def expire(cache: PageCache, url: str) -> None:
+    cache._db.execute("UPDATE page_cache SET expires_at = 0 WHERE key = ?", (cache._key(url),))
+    cache._db.commit()
+
+def test_normalize_url_ignores_trivial_differences():
+    assert normalize_url("HTTPS://Example.com:443/docs/?b=2&utm_source=x&a=1#top") == "https://example.com/docs?a=1&b=2"
+
+def test_page_is_fresh_then_stale_with_conditional_headers(cache):
+    cache.put("https://example.com/a", "text", etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    assert cache.get("https://example.com/a/").fresh
+
+    expire(cache, "https://example.com/a")
+    page = cache.get("https://example.com/a")
+    assert not page.fresh
+    assert page.text == "text"
+    assert page.conditional_headers() == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+
+def test_refresh_makes_a_stale_page_fresh(cache):
+    cache.put("https://example.com/a", "text", etag='"v1"')
+    expire(cache, "https://example.com/a")
+
+    cache.refresh("https://example.com/a")
+
+    assert cache.get("https://example.com/a").fresh
+
+def test_least_recently_used_pages_are_evicted(tmp_path):
+    cache = PageCache(tmp_path / "page_cache.sqlite", ttl=60, max_bytes=150)
+    cache.put("https://example.com/old", os.urandom(60).hex())
+    cache.put("https://example.com/new", os.urandom(60).hex())
+
+    assert cache.urls() == ["https://example.com/new"]
+
+
+def scrape(cache: PageCache, monkeypatch, handler, seed=None):
+    """Scrapes a local page served by `handler`, after `seed(url)` prepares the cache."""
+    monkeypatch.setattr(search_and_scrape, "get_page_cache", lambda: cache)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/page", handler)
+        async with TestServer(app) as server:
+            url = str(server.make_url("/page"))
+            if seed:
+                seed(url)
+            try:
+                return url, await search_and_scrape.scrape_link_async(url)
+            finally:
+                await search_and_scrape.close_scrape_session()
+    return asyncio.run(main())
+
+def test_stale_page_is_revalidated_with_a_conditional_get(cache, monkeypatch):
+    received = []
+
+    async def not_modified(request):
+        received.append(request.headers.get("If-None-Match"))
+        return web.Response(status=304)
+
+    def stale_entry(url):
+        cache.put(url, "cached text", etag='"v1"')
+        expire(cache, url)
+
+    revalidated = get_counter("page_cache_requests_total", result="revalidated")
+
+    url, text = scrape(cache, monkeypatch, not_modified, seed=stale_entry)
+
+    assert text == "cached text"
+    assert received == ['"v1"']
+    assert cache.get(url).fresh
+    assert get_counter("page_cache_requests_total", result="revalidated") == revalidated + 1
+
+@pytest.mark.parametrize("status", [500, 503, 404])
+def test_stale_page_is_served_when_the_origin_fails(cache, monkeypatch, status):
+    async def failing_origin(request):
+        return web.Response(status=status)
+
+    def stale_entry(url):
+        cache.put(url, "cached text")
+        expire(cache, url)
+
+    errors = get_counter("page_cache_fetch_errors_total", lookup="stale")
+    served = get_counter("page_cache_requests_total", result="stale_served")
+
+    _, text = scrape(cache, monkeypatch, failing_origin, seed=stale_entry)
+
+    assert text == "cached text"
+    assert get_counter("page_cache_fetch_errors_total", lookup="stale") == errors + 1
+    assert get_counter("page_cache_requests_total", result="stale_served") == served + 1
+
+def test_failed_fetch_is_counted_apart_from_completed_lookups(cache, monkeypatch):
+    async def server_error(request):
+        return web.Response(status=500)
+
+    ratio = hit_ratio()
+    errors = get_counter("page_cache_fetch_errors_total", lookup="miss")
+    misses = get_counter("page_cache_requests_total", result="miss")
+
+    _, text = scrape(cache, monkeypatch, server_error)
+
+    assert text == f"{search_and_scrape.SCRAPE_FAILED_PREFIX}. Status code: 500"
+    assert get_counter("page_cache_fetch_errors_total", lookup="miss") == errors + 1
+    assert get_counter("page_cache_requests_total", result="miss") == misses
+    assert hit_ratio() == ratio
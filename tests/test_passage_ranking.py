@@ -0,0 +1,52 @@
+from benchmarks import passage_ranking as benchmark
+from src.services.passage_ranking import estimate_tokens, rank_passages, select_passages, split_passages
+
+FILLER = "The committee met on Tuesday to review the annual budget of the parks department."
+RELEVANT = "Solid-state batteries replace the liquid electrolyte with a ceramic electrolyte."
+
+
+def test_split_passages_keeps_sentences_whole():
+    passages = split_passages("One two three. Four five six. Seven eight.", max_words=6)
+
+    assert passages == ["One two three. Four five six.", "Seven eight."]
+
+def test_split_passages_cuts_sentences_longer_than_the_limit():
+    menu = " ".join(f"item{i}" for i in range(10))
+
+    assert split_passages(menu, max_words=4) == ["item0 item1 item2 item3", "item4 item5 item6 item7", "item8 item9"]
+
+def test_rank_passages_scores_query_matches_first():
+    scores = rank_passages([FILLER, RELEVANT, "Electrolyte leaks are rare."], "ceramic electrolyte batteries")
+
+    assert scores[1] > scores[2] > scores[0] == 0
+
+def test_rank_passages_without_words_scores_zero():
+    assert rank_passages(["...", "!!!"], "query") == [0.0, 0.0]
+
+def test_select_passages_returns_short_texts_unchanged():
+    assert select_passages(RELEVANT, "batteries", max_tokens=1000) == RELEVANT
+
+def test_select_passages_keeps_relevant_passages_in_page_order():
+    # Lines of PASSAGE_WORDS words, so each line is one passage
+    filler = ("parks budget committee meeting " * 20).strip()
+    first, second = ("ceramic electrolyte battery cells " * 20).strip(), ("safer ceramic electrolyte design " * 20).strip()
+    text = "\n".join([filler] * 5 + [first] + [filler] * 5 + [second])
+
+    selected = select_passages(text, "ceramic electrolyte", max_tokens=350)
+
+    assert selected == f"{first}\n\n{second}"
+
+def test_select_passages_without_query_matches_keeps_page_order():
+    text = "\n".join(f"Paragraph {i} about {'gardening ' * 10}" for i in range(20))
+
+    selected = select_passages(text, "quantum", max_tokens=50)
+
+    assert text.startswith(selected.split("\n\n")[0])
+    assert estimate_tokens(selected) <= 50
+
+def test_saved_pages_keep_the_facts_their_query_needs():
+    for name, text, query, facts in benchmark._corpus_pages(benchmark.FIXTURES_DIR):
+        selected = select_passages(text, query, max_tokens=800)
+
+        assert estimate_tokens(selected) <= 800, name
+        assert benchmark._facts_kept(selected, facts) == len(facts), name
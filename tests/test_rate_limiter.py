@@ -0,0 +1,95 @@
+import asyncio
+
+from src.utils.rate_limiter import Priority, TokenBucket
+
+
+class FakeClock:
+    """Clock that only moves when a waiter sleeps."""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+def make_bucket(clock: FakeClock, **kwargs) -> TokenBucket:
+    return TokenBucket(clock=clock, sleep=clock.sleep, **kwargs)
+
+def test_bucket_refills_up_to_max_size():
+    clock = FakeClock()
+    bucket = make_bucket(clock, requests_per_second=1, max_bucket_size=2)
+
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+    clock.now += 1
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+    clock.now += 100
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+def test_waiters_are_served_by_priority_then_arrival():
+    clock = FakeClock()
+    bucket = make_bucket(clock, requests_per_second=1, max_bucket_size=1, check_every_n_seconds=0.5)
+    assert bucket.try_acquire()
+    served = []
+
+    async def request(name: str, priority: Priority) -> None:
+        await bucket.aacquire(priority)
+        served.append(name)
+
+    async def main() -> None:
+        await asyncio.gather(
+            request("background", Priority.BACKGROUND),
+            request("default-1", Priority.DEFAULT),
+            request("interactive", Priority.INTERACTIVE),
+            request("default-2", Priority.DEFAULT),
+        )
+
+    asyncio.run(main())
+    assert served == ["interactive", "default-1", "default-2", "background"]
+
+def test_aacquire_reports_the_fake_wait():
+    clock = FakeClock()
+    bucket = make_bucket(clock, requests_per_second=2, max_bucket_size=1, check_every_n_seconds=0.1)
+    assert bucket.try_acquire()
+
+    waited = asyncio.run(bucket.aacquire())
+    assert 0.4 <= waited <= 0.6
+
+def test_recorded_tokens_are_debited_from_the_minute_budget():
+    clock = FakeClock()
+    bucket = make_bucket(clock, requests_per_second=100, max_bucket_size=100, tokens_per_minute=600)
+
+    assert bucket.try_acquire()
+    bucket.record_tokens(900)
+    # 300 tokens over budget, refilled at 10 tokens per second
+    assert not bucket.try_acquire()
+    clock.now += 29
+    assert not bucket.try_acquire()
+    clock.now += 2
+    assert bucket.try_acquire()
+
+def test_cancelled_waiter_leaves_the_queue():
+    clock = FakeClock()
+    bucket = make_bucket(clock, requests_per_second=1, max_bucket_size=1)
+    assert bucket.try_acquire()
+
+    async def main() -> None:
+        waiter = asyncio.ensure_future(bucket.aacquire(Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        clock.now += 1
+        # Nobody is queued any more, so the refilled slot is free
+        assert bucket.try_acquire()
+
+    asyncio.run(main())
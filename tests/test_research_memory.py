@@ -0,0 +1,67 @@
+import types
+
+import pytest
+
+from src.utils import research_memory
+from src.utils.research_memory import ResearchMemory, ResearchNote
+
+TTL = 3600
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(research_memory, "time", types.SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+@pytest.fixture
+def memory(tmp_path, clock):
+    return ResearchMemory(tmp_path / "research_memory.sqlite", ttl=TTL)
+
+NOTE = ResearchNote(["https://www.example.com/a", "https://mirror.com/a"], "battery chemistry", "Ceramic electrolytes.")
+
+
+def test_query_urls_are_remembered_per_thread(memory):
+    memory.save_query("thread-1", "Solid  State Batteries", ["https://example.com/a"])
+
+    assert memory.query_urls("thread-1", "solid state batteries") == ["https://example.com/a"]
+    assert memory.query_urls("thread-2", "solid state batteries") is None
+
+def test_note_is_found_under_each_canonical_source(memory):
+    memory.save_note("thread-1", ["example.com/a", "mirror.com/a"], NOTE)
+
+    assert memory.note_for("thread-1", "example.com/a") == NOTE
+    assert memory.note_for("thread-1", "mirror.com/a") == NOTE
+    assert memory.notes("thread-1") == [NOTE]
+
+def test_entries_expire_after_the_ttl(memory, clock):
+    memory.save_query("thread-1", "query", ["https://example.com/a"])
+    memory.save_note("thread-1", ["example.com/a"], NOTE)
+
+    clock.now += TTL - 1
+    assert memory.query_urls("thread-1", "query") == ["https://example.com/a"]
+    assert memory.note_for("thread-1", "example.com/a") == NOTE
+
+    clock.now += 1
+    assert memory.query_urls("thread-1", "query") is None
+    assert memory.note_for("thread-1", "example.com/a") is None
+    assert memory.notes("thread-1") == []
+
+def test_expired_rows_are_pruned_on_save(memory, clock):
+    memory.save_query("thread-1", "old query", ["https://example.com/old"])
+    memory.save_note("thread-1", ["example.com/old"], NOTE)
+
+    clock.now += TTL
+    memory.save_note("thread-1", ["example.com/new"], NOTE)
+
+    assert memory._db.execute("SELECT url FROM research_summaries").fetchall() == [("example.com/new",)]
+    assert memory._db.execute("SELECT COUNT(*) FROM research_queries").fetchone() == (0,)
+
+def test_notes_are_newest_first(memory, clock):
+    older = ResearchNote(["https://a.com"], "q", "Older summary.")
+    newer = ResearchNote(["https://b.com"], "q", "Newer summary.")
+    memory.save_note("thread-1", ["a.com"], older)
+    clock.now += 10
+    memory.save_note("thread-1", ["b.com"], newer)
+
+    assert memory.notes("thread-1") == [newer, older]
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.core.router import COMMAND_TOOLS, route_after_router, route_message, router_agent
+from src.utils.metrics import get_counter
+
+
+@pytest.mark.parametrize("command, tool", [
+    ("Picture", "generate_image"),
+    ("Scrape", "scrape_link"),
+    ("Search", "deep_research_report"),
+    ("Chat", "code_generation"),
+    ("YouTube", "youtube_transcribe"),
+])
+def test_commands_map_to_their_tool(command, tool):
+    assert COMMAND_TOOLS[command] == tool
+    assert route_message("anything at all", command) == (tool, "command")
+
+@pytest.mark.parametrize("content, decision", [
+    ("https://youtu.be/dQw4w9WgXcQ", ("youtube_transcribe", "rules")),
+    ("  https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=30  ", ("youtube_transcribe", "rules")),
+    ("https://example.com/article", ("scrape_link", "rules")),
+    ("https://www.youtube.com/@channel", ("scrape_link", "rules")),
+    ("Summarize https://example.com/article", None),
+    ("What is said at https://youtu.be/dQw4w9WgXcQ?", None),
+    ("https://example.com/a https://example.com/b", None),
+    ("What is the capital of Australia?", None),
+    ("", None),
+])
+def test_only_unambiguous_messages_skip_the_supervisor(content, decision):
+    assert route_message(content) == decision
+
+def test_unknown_command_falls_through_to_the_rules():
+    assert route_message("https://example.com", "Unknown") == ("scrape_link", "rules")
+
+def test_router_emits_a_synthetic_tool_call():
+    routed = get_counter("router_decisions_total", route="rules", tool="scrape_link")
+    saved = get_counter("supervisor_llm_calls_saved_total")
+    state = {"messages": [HumanMessage(content="https://example.com/article")], "command": None}
+
+    update = asyncio.run(router_agent(state))
+
+    [message] = update["messages"]
+    [tool_call] = message.tool_calls
+    assert isinstance(message, AIMessage) and message.content == ""
+    assert tool_call["name"] == "scrape_link"
+    assert tool_call["args"] == {"user_message": "https://example.com/article"}
+    assert tool_call["id"].startswith("call_")
+    assert route_after_router({"messages": state["messages"] + [message]}) == "tools"
+    assert get_counter("router_decisions_total", route="rules", tool="scrape_link") == routed + 1
+    assert get_counter("supervisor_llm_calls_saved_total") == saved + 1
+
+def test_ambiguous_message_goes_to_the_supervisor():
+    supervised = get_counter("router_decisions_total", route="supervisor")
+    saved = get_counter("supervisor_llm_calls_saved_total")
+    state = {"messages": [HumanMessage(content="Compare https://a.com and https://b.com")], "command": None}
+
+    assert asyncio.run(router_agent(state)) == {}
+    assert route_after_router(state) == "supervisor"
+    assert get_counter("router_decisions_total", route="supervisor") == supervised + 1
+    assert get_counter("supervisor_llm_calls_saved_total") == saved
@@ -0,0 +1,27 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.ui import routes
+
+
+def make_client(monkeypatch, token: str) -> TestClient:
+    monkeypatch.setattr(routes, "MONITORING_TOKEN", token)
+    app = FastAPI()
+    routes.register_routes(app)
+    return TestClient(app)
+
+def test_routes_are_disabled_without_a_token(monkeypatch):
+    client = make_client(monkeypatch, "")
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/health/graph").status_code == 404
+
+def test_routes_require_the_bearer_token(monkeypatch):
+    client = make_client(monkeypatch, "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    # No graph was initialized, so the checkpointer is reported unavailable
+    assert client.get("/health/graph", headers={"Authorization": "Bearer s3cret"}).status_code == 503
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.services import search_and_scrape
+from src.services.search_and_scrape import SCRAPE_FAILED_PREFIX, read_limited
+from src.utils.metrics import get_counter
+
+
+@pytest.fixture(autouse=True)
+def no_page_cache(monkeypatch):
+    monkeypatch.setattr(search_and_scrape, "get_page_cache", lambda: None)
+
+def make_app(peers: list) -> web.Application:
+    async def endless(request):
+        # Streams until the client stops reading
+        response = web.StreamResponse(headers={"Content-Type": "text/html"})
+        await response.prepare(request)
+        while True:
+            await response.write(b"<p>" + b"x" * 8192 + b"</p>")
+
+    async def stalled(request):
+        # Sends the headers, then nothing
+        response = web.StreamResponse(headers={"Content-Type": request.query.get("type", "text/html")})
+        await response.prepare(request)
+        await asyncio.sleep(30)
+        return response
+
+    async def small(request):
+        peers.append(request.transport.get_extra_info("peername"))
+        return web.Response(text="<p>hello</p>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/endless", endless)
+    app.router.add_get("/stalled", stalled)
+    app.router.add_get("/small", small)
+    return app
+
+def serve(test):
+    """Runs `test(server)` against a local test server, closing the scraping session afterwards."""
+    async def main():
+        peers = []
+        async with TestServer(make_app(peers)) as server:
+            server.peers = peers
+            try:
+                return await test(server)
+            finally:
+                await search_and_scrape.close_scrape_session()
+    return asyncio.run(main())
+
+def test_read_limited_stops_at_the_byte_cap():
+    truncated = get_counter("scrape_truncated_total")
+
+    async def test(server):
+        async with search_and_scrape.get_scrape_session().get(server.make_url("/endless")) as response:
+            return await read_limited(response, max_bytes=100_000)
+
+    body = serve(test)
+
+    assert len(body) == 100_000
+    assert get_counter("scrape_truncated_total") == truncated + 1
+
+def read_timeouts() -> float:
+    # Older aiohttp versions raise ServerTimeoutError, newer ones its SocketTimeoutError subclass
+    return sum(
+        get_counter("stage_errors_total", stage="scrape_link_async", reason=reason)
+        for reason in ("SocketTimeoutError", "ServerTimeoutError")
+    )
+
+def test_stalled_body_trips_the_read_timeout(monkeypatch):
+    monkeypatch.setattr(search_and_scrape, "SCRAPE_READ_TIMEOUT", 0.2)
+    timeouts = read_timeouts()
+
+    async def test(server):
+        start = time.perf_counter()
+        result = await search_and_scrape.scrape_link_async(str(server.make_url("/stalled")))
+        return result, time.perf_counter() - start
+
+    result, elapsed = serve(test)
+
+    assert result.startswith(SCRAPE_FAILED_PREFIX)
+    assert elapsed < 5
+    assert read_timeouts() == timeouts + 1
+
+def test_non_html_response_is_skipped_without_reading_the_body():
+    downloaded = get_counter("bytes_transferred_total", stage="scrape_link_async")
+
+    async def test(server):
+        start = time.perf_counter()
+        # The body never arrives, so reading it would hang until the read timeout
+        result = await search_and_scrape.scrape_link_async(str(server.make_url("/stalled").with_query(type="application/pdf")))
+        return result, time.perf_counter() - start
+
+    result, elapsed = serve(test)
+
+    assert result == f"{SCRAPE_FAILED_PREFIX}. Unsupported content type: application/pdf"
+    assert elapsed < 1
+    assert get_counter("bytes_transferred_total", stage="scrape_link_async") == downloaded
+
+def test_scraping_session_is_shared_and_reuses_connections():
+    async def test(server):
+        session = search_and_scrape.get_scrape_session()
+        for _ in range(3):
+            async with session.get(server.make_url("/small")) as response:
+                await response.read()
+        return session is search_and_scrape.get_scrape_session(), server.peers
+
+    same_session, peers = serve(test)
+
+    assert same_session
+    assert len(peers) == 3 and len(set(peers)) == 1
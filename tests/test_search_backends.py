@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+import time
+
+from src.services.search_backends import FanoutSearch, SearchBackend, SearchResultCache
+from src.utils.metrics import get_counter
+
+
+class FakeBackend(SearchBackend):
+    def __init__(self, name: str, urls=(), delay: float = 0.0, error: Exception = None):
+        self.name = name
+        self.urls = list(urls)
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def search(self, query: str, num_results: int):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.urls[:num_results]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_backends_must_implement_search():
+    class IncompleteBackend(SearchBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        IncompleteBackend()
+
+def test_cache_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = SearchResultCache(ttl=60, max_entries=10, clock=clock)
+    cache.put("Solid state  batteries", 5, ["https://a.com"])
+
+    assert cache.get("solid state batteries", 5) == ["https://a.com"]
+    assert cache.get("solid state batteries", 10) is None
+    clock.now = 60
+    assert cache.get("solid state batteries", 5) is None
+
+def test_cache_evicts_the_least_recently_used_query():
+    cache = SearchResultCache(ttl=60, max_entries=2, clock=FakeClock())
+    cache.put("a", 5, ["https://a.com"])
+    cache.put("b", 5, ["https://b.com"])
+    cache.get("a", 5)
+    cache.put("c", 5, ["https://c.com"])
+
+    assert cache.get("a", 5) == ["https://a.com"]
+    assert cache.get("b", 5) is None
+
+def test_fanout_merges_backends_without_duplicate_pages():
+    fanout = FanoutSearch([
+        FakeBackend("one", ["https://a.com/x", "http://www.b.com/y"]),
+        FakeBackend("two", ["https://b.com/y", "https://c.com/z"], delay=0.01),
+    ])
+
+    urls = asyncio.run(fanout.search("query", 3))
+
+    assert urls == ["https://a.com/x", "http://www.b.com/y", "https://c.com/z"]
+
+def test_fanout_returns_without_waiting_for_slow_backends():
+    slow = FakeBackend("slow", ["https://slow.com"], delay=5)
+    fanout = FanoutSearch([FakeBackend("fast", ["https://a.com", "https://b.com"]), slow])
+
+    start = time.perf_counter()
+    urls = asyncio.run(fanout.search("query", 2))
+
+    assert urls == ["https://a.com", "https://b.com"]
+    assert time.perf_counter() - start < 1
+
+def test_failed_and_timed_out_backends_fall_back_to_the_others():
+    timeouts = get_counter("search_backend_requests_total", backend="hanging", outcome="timeout")
+    fanout = FanoutSearch(
+        [
+            FakeBackend("broken", error=RuntimeError("quota exceeded")),
+            FakeBackend("hanging", ["https://late.com"], delay=5),
+            FakeBackend("working", ["https://a.com"], delay=0.01),
+        ],
+        timeout=0.1,
+    )
+
+    urls = asyncio.run(fanout.search("query", 5))
+
+    assert urls == ["https://a.com"]
+    assert get_counter("search_backend_requests_total", backend="hanging", outcome="timeout") == timeouts + 1
+
+def test_fanout_results_are_cached_but_empty_results_are_not():
+    backend = FakeBackend("one", ["https://a.com"])
+    empty = FakeBackend("empty")
+    cache = SearchResultCache(ttl=60, max_entries=10, clock=FakeClock())
+
+    async def main():
+        fanout = FanoutSearch([backend], cache)
+        first = await fanout.search("query", 5)
+        second = await fanout.search("QUERY", 5)
+        await FanoutSearch([empty], cache).search("nothing", 5)
+        await FanoutSearch([empty], cache).search("nothing", 5)
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert first == second == ["https://a.com"]
+    assert backend.calls == 1
+    assert empty.calls == 2
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from src.utils.metrics import get_counter
+from src.utils.singleflight import SingleFlight
+
+
+def slow_call(calls: list, result="result", error: Exception = None, delay: float = 0.05):
+    async def fn():
+        calls.append("started")
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            calls.append("cancelled")
+            raise
+        if error:
+            raise error
+        return result
+    return fn
+
+def test_concurrent_calls_share_one_task():
+    flight, calls = SingleFlight("test-share"), []
+    deduplicated = get_counter("singleflight_deduplicated_total", group="test-share")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", slow_call(calls)) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["result"] * 3
+    assert calls == ["started"]
+    assert get_counter("singleflight_deduplicated_total", group="test-share") == deduplicated + 2
+    assert flight._calls == {}
+
+def test_different_keys_and_later_calls_are_not_shared():
+    flight, calls = SingleFlight("test-keys"), []
+    deduplicated = get_counter("singleflight_deduplicated_total", group="test-keys")
+
+    async def main():
+        await asyncio.gather(flight.do("a", slow_call(calls)), flight.do("b", slow_call(calls)))
+        await flight.do("a", slow_call(calls))
+
+    asyncio.run(main())
+
+    assert calls == ["started"] * 3
+    assert get_counter("singleflight_deduplicated_total", group="test-keys") == deduplicated
+
+def test_cancelled_waiter_leaves_the_others_the_result():
+    flight, calls = SingleFlight("test-cancel-one"), []
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("key", slow_call(calls)))
+        second = asyncio.ensure_future(flight.do("key", slow_call(calls)))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "result"
+    assert calls == ["started"]
+
+def test_last_cancelled_waiter_cancels_the_task_and_forgets_the_key():
+    flight, calls = SingleFlight("test-cancel-all"), []
+
+    async def main():
+        waiters = [asyncio.ensure_future(flight.do("key", slow_call(calls, delay=5))) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        forgotten = "key" not in flight._calls
+        # A new call starts a new task instead of joining the cancelled one
+        return forgotten, await flight.do("key", slow_call(calls, result="fresh"))
+
+    forgotten, result = asyncio.run(main())
+
+    assert forgotten
+    assert result == "fresh"
+    assert calls == ["started", "cancelled", "started"]
+
+def test_exception_reaches_every_waiter():
+    flight, calls = SingleFlight("test-error"), []
+
+    async def main():
+        return await asyncio.gather(
+            *(flight.do("key", slow_call(calls, error=ValueError("boom"))) for _ in range(2)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert calls == ["started"]
+    assert flight._calls == {}
@@ -0,0 +1,53 @@
+import asyncio
+import inspect
+import json
+from pathlib import Path
+
+from benchmarks import tool_descriptions as benchmark
+from src.agents import tool_descriptions
+from src.core.supervisor import get_agent_tools
+
+SAMPLES = Path(benchmark.__file__).with_name("routing_samples.jsonl")
+
+
+def test_routing_samples_cover_every_tool():
+    tools = {tool.name for tool in asyncio.run(get_agent_tools())}
+    labels = [sample["tool"] for sample in benchmark.read_jsonl(SAMPLES)]
+
+    assert set(labels) <= tools | {benchmark.NO_TOOL}
+    for name in tools:
+        assert labels.count(name) >= 2, f"no routing samples for {name}"
+
+def test_tools_keep_their_docstrings_until_a_routing_run_is_recorded():
+    tools = asyncio.run(get_agent_tools())
+
+    for tool in tools:
+        assert tool.description == inspect.getdoc(tool.coroutine).strip()
+        assert tool.args_schema is not tool_descriptions.UserMessageInput
+
+def test_every_tool_has_a_compact_description():
+    tools = asyncio.run(get_agent_tools())
+
+    assert set(tool_descriptions.DESCRIPTIONS) == {tool.name for tool in tools}
+    for tool in map(tool_descriptions.compact_tool, tools):
+        assert tool.description == tool_descriptions.DESCRIPTIONS[tool.name]
+        assert tool.args_schema is tool_descriptions.UserMessageInput
+
+def test_compact_schemas_are_smaller_than_the_docstring_ones():
+    verbose = asyncio.run(get_agent_tools())
+    compact = [tool_descriptions.compact_tool(tool) for tool in verbose]
+
+    assert sum(map(benchmark.schema_tokens, compact)) * 2 < sum(map(benchmark.schema_tokens, verbose))
+
+def test_replay_reports_recorded_routing_offline(tmp_path, capsys):
+    records = [
+        {"schemas": "docstring", "prompt": "Draw a cat", "expected": "generate_image", "tool": "generate_image"},
+        {"schemas": "docstring", "prompt": "Research batteries", "expected": "deep_research_report", "tool": "scrape_link"},
+        {"schemas": "compact", "prompt": "Draw a cat", "expected": "generate_image", "tool": "generate_image"},
+        {"schemas": "compact", "prompt": "Research batteries", "expected": "deep_research_report", "tool": "deep_research_report"},
+    ]
+    path = tmp_path / "routing_run.jsonl"
+    path.write_text("".join(json.dumps({**record, "input_tokens": 100, "latency": 0.5}) + "\n" for record in records))
+
+    assert benchmark.replay(path) == {"docstring": 0.5, "compact": 1.0}
+    assert "expected deep_research_report, got scrape_link: Research batteries" in capsys.readouterr().out
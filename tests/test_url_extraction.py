@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from src.agents import youtube_transcription
+from src.utils.url_extraction import (
+    extract_context_and_url,
+    find_urls,
+    normalize_youtube_url,
+    split_context_and_urls,
+    youtube_start_seconds,
+    youtube_video_id,
+)
+
+WIKI = "https://en.wikipedia.org/wiki/Python_(programming_language)"
+
+
+@pytest.mark.parametrize("text, urls", [
+    ("Read https://example.com/a.", ["https://example.com/a"]),
+    ("Is it true? https://example.com/a?b=1!", ["https://example.com/a?b=1"]),
+    (f"Summarize {WIKI}", [WIKI]),
+    (f"Summarize {WIKI}.", [WIKI]),
+    (f"Two pages ({WIKI}) and (https://example.com/x)", [WIKI, "https://example.com/x"]),
+    ("[https://example.com/list_[1]]", ["https://example.com/list_[1]"]),
+    ('"https://example.com/q", then <https://example.com/r>', ["https://example.com/q", "https://example.com/r"]),
+    ("No links here", []),
+])
+def test_find_urls_trims_sentence_punctuation_only(text, urls):
+    assert find_urls(text) == urls
+
+def test_split_context_and_urls():
+    assert split_context_and_urls("Compare https://a.com/x and https://b.com/y briefly") == (
+        "Compare and briefly", ["https://a.com/x", "https://b.com/y"]
+    )
+
+def test_extract_context_and_url():
+    assert extract_context_and_url("Summarize: https://a.com/x") == ["Summarize", "https://a.com/x"]
+    assert extract_context_and_url("  https://a.com/x  ") == ["https://a.com/x"]
+    assert extract_context_and_url("  Just a question  ") == ["Just a question"]
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42",
+    "https://youtu.be/dQw4w9WgXcQ?si=abc123",
+    "https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+    "https://music.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://www.youtube.com/embed/dQw4w9WgXcQ",
+    "https://www.youtube.com/live/dQw4w9WgXcQ",
+    "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+])
+def test_youtube_video_id(url):
+    assert youtube_video_id(url) == "dQw4w9WgXcQ"
+    assert normalize_youtube_url(url) == "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/@channel",
+    "https://www.youtube.com/watch?v=short",
+    "https://notyoutube.com/watch?v=dQw4w9WgXcQ",
+    "https://youtu.be/",
+])
+def test_non_video_urls_have_no_id(url):
+    assert youtube_video_id(url) is None
+    assert normalize_youtube_url(url) is None
+
+@pytest.mark.parametrize("query, seconds", [
+    ("t=90", 90), ("t=90s", 90), ("t=1m30s", 90), ("t=1h2m3s", 3723), ("start=15", 15), ("t=soon", None), ("", None),
+])
+def test_youtube_start_seconds(query, seconds):
+    assert youtube_start_seconds(f"https://www.youtube.com/watch?v=dQw4w9WgXcQ&{query}") == seconds
+
+def test_youtube_extraction_uses_rules_for_one_video(monkeypatch):
+    async def no_llm(message):
+        raise AssertionError("the LLM extraction should not run")
+
+    monkeypatch.setattr(youtube_transcription, "extract_context_and_url_with_llm", no_llm)
+
+    assert asyncio.run(youtube_transcription.extract_youtube_context_and_url(
+        "Key points of https://youtu.be/dQw4w9WgXcQ?t=10 and https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    )) == ("Key points of and", "https://youtu.be/dQw4w9WgXcQ?t=10")
+
+def test_youtube_extraction_asks_the_llm_when_ambiguous(monkeypatch):
+    async def llm(message):
+        return ["Summarize the second", "https://youtu.be/jNQXAC9IVRw"]
+
+    monkeypatch.setattr(youtube_transcription, "extract_context_and_url_with_llm", llm)
+
+    assert asyncio.run(youtube_transcription.extract_youtube_context_and_url(
+        "Summarize the second: https://youtu.be/dQw4w9WgXcQ https://youtu.be/jNQXAC9IVRw"
+    )) == ("Summarize the second", "https://youtu.be/jNQXAC9IVRw")